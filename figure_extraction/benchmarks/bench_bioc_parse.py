@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Compare whole-document BioC parsing with the streaming parser.
+
+Full-text BioC documents run to several MB, almost all of it body passages we
+never read. The fixtures are synthetic documents of that shape: a title, an
+abstract, a handful of figure passages and many paragraph passages. The
+legacy column reproduces the old ET.fromstring plus XPath implementation;
+the streaming column feeds the same bytes in 64 KiB chunks, as
+response.aiter_bytes() would.
+
+    python -m benchmarks.bench_bioc_parse [paragraphs ...]
+"""
+
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from src.extraction.bioc_client import BioCStreamParser
+
+CHUNK_SIZE = 64 * 1024
+FIGURES = 8
+PARAGRAPH = "Lorem ipsum dolor sit amet, TP53 and BRCA1 expression was measured in each sample. " * 10
+
+
+def make_fixture(paragraphs: int) -> bytes:
+    passages = ["<passage><infon key='type'>title</infon><offset>0</offset><text>Synthetic paper</text></passage>"]
+    passages.append("<passage><infon key='type'>abstract</infon><offset>0</offset><text>Abstract text.</text></passage>")
+    for index in range(paragraphs):
+        passages.append(
+            f"<passage><infon key='section_type'>RESULTS</infon><infon key='type'>paragraph</infon>"
+            f"<offset>{index}</offset><text>{PARAGRAPH}</text></passage>"
+        )
+        if index % max(1, paragraphs // FIGURES) == 0:
+            passages.append(
+                f"<passage><infon key='type'>figure</infon><infon key='url'>fig{index}.jpg</infon>"
+                f"<offset>{index}</offset><text>Figure caption {index}.</text></passage>"
+            )
+    return (
+        "<?xml version='1.0' encoding='UTF-8'?><collection><source>PMC</source><document><id>1</id>"
+        + "".join(passages)
+        + "</document></collection>"
+    ).encode("utf-8")
+
+
+def legacy_parse(xml_bytes: bytes):
+    root = ET.fromstring(xml_bytes)
+    document = root.find(".//document")
+    title_elem = document.find(".//passage[infon='title']/text")
+    abstract = " ".join(p.text for p in document.findall(".//passage[infon='abstract']/text") if p.text)
+    figures = []
+    for fig_elem in document.findall(".//passage[infon='figure']"):
+        caption_elem = fig_elem.find("text")
+        if caption_elem is not None and caption_elem.text:
+            url_elem = fig_elem.find("infon[@key='url']")
+            figures.append({
+                "figure_number": len(figures) + 1,
+                "caption": caption_elem.text,
+                "url": url_elem.text if url_elem is not None and url_elem.text else None
+            })
+    return {"title": title_elem.text if title_elem is not None else "", "abstract": abstract, "figures": figures}
+
+
+def streaming_parse(xml_bytes: bytes):
+    parser = BioCStreamParser()
+    for start in range(0, len(xml_bytes), CHUNK_SIZE):
+        parser.feed(xml_bytes[start:start + CHUNK_SIZE])
+    return parser.close()
+
+
+def profile(parse, xml_bytes: bytes, repeat: int = 5):
+    """Return the best wall time in ms and the peak traced memory in MB."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(xml_bytes)
+        best = min(best, time.perf_counter() - start)
+    
+    tracemalloc.start()
+    parse(xml_bytes)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak / (1024 * 1024)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [500, 2000, 8000]
+    print(f"{'doc MB':>8} {'legacy ms':>10} {'stream ms':>10} {'legacy MB':>10} {'stream MB':>10}")
+    for paragraphs in sizes:
+        xml_bytes = make_fixture(paragraphs)
+        assert legacy_parse(xml_bytes) == streaming_parse(xml_bytes)
+        
+        legacy_ms, legacy_mb = profile(legacy_parse, xml_bytes)
+        stream_ms, stream_mb = profile(streaming_parse, xml_bytes)
+        size_mb = len(xml_bytes) / (1024 * 1024)
+        print(f"{size_mb:>8.1f} {legacy_ms:>10.1f} {stream_ms:>10.1f} {legacy_mb:>10.1f} {stream_mb:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
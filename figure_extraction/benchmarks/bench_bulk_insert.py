@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Compare the per-row write path with the bulk write path.
+
+Each synthetic paper has 8 figures and 200 entities, the shape that used to
+cost about 200 commits per paper through create_figure/create_entity.
+
+    python -m benchmarks.bench_bulk_insert [papers]
+"""
+
+import sys
+import time
+import uuid
+
+from benchmarks.common import temp_database
+from src.storage import queries
+from src.storage.models import Entity, EntityType, Figure, Paper, ProcessingStatus
+
+FIGURES_PER_PAPER = 8
+ENTITIES_PER_FIGURE = 25
+
+
+def make_paper(index: int):
+    paper = Paper(id=f"PMC{index}", title=f"Paper {index}", abstract="Abstract", status=ProcessingStatus.COMPLETED)
+    figures = [
+        Figure(id=str(uuid.uuid4()), paper_id=paper.id, figure_number=number + 1, caption="Western blot of TP53")
+        for number in range(FIGURES_PER_PAPER)
+    ]
+    entities = [
+        Entity(
+            id=str(uuid.uuid4()),
+            figure_id=figure.id,
+            entity_text="TP53",
+            entity_type=EntityType.GENE,
+            start_position=position,
+            end_position=position + 4,
+            external_id="7157"
+        )
+        for figure in figures
+        for position in range(ENTITIES_PER_FIGURE)
+    ]
+    return paper, figures, entities
+
+
+def per_row_path(session, paper, figures, entities):
+    queries.create_paper(paper, session)
+    for figure in figures:
+        queries.create_figure(figure, session)
+    for entity in entities:
+        queries.create_entity(entity, session)
+
+
+def bulk_path(session, paper, figures, entities):
+    queries.upsert_paper_with_children(paper, figures, entities, session=session)
+
+
+def run(name, write, paper_count):
+    papers = [make_paper(index) for index in range(paper_count)]
+    rows = sum(1 + len(figures) + len(entities) for _, figures, entities in papers)
+    
+    with temp_database() as database:
+        session = database.get_session()
+        try:
+            start = time.perf_counter()
+            for paper, figures, entities in papers:
+                write(session, paper, figures, entities)
+            elapsed = time.perf_counter() - start
+        finally:
+            session.close()
+    
+    print(f"{name:>10}: {rows} rows in {elapsed:.2f}s = {rows / elapsed:,.0f} rows/s")
+
+
+def main():
+    paper_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print(f"Arrow bulk path: {'enabled' if queries.pyarrow is not None else 'disabled (pyarrow not installed)'}")
+    run("per-row", per_row_path, paper_count)
+    run("bulk", bulk_path, paper_count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Measure caption search latency over a large synthetic corpus.
+
+Captions are 20-40 words drawn from a 50k-word vocabulary with a skewed
+distribution, so the most common word appears in about one caption in eight;
+one caption in fifty starts with "Western blot of". Each figure gets two
+entities of different types. Latencies are end to end through
+queries.search_figures, including loading the matching figures.
+
+    python -m benchmarks.bench_caption_search [captions]
+"""
+
+import sys
+import time
+
+from sqlalchemy import text
+
+from benchmarks.common import measure, temp_database
+from src.storage import queries, caption_index
+from src.storage.models import EntityType
+
+FIGURES_PER_PAPER = 4
+VOCABULARY = 50000
+
+QUERIES = [
+    ("western blot", None),
+    ("western blot", [EntityType.GENE]),
+    ("w1", None),
+    ("w1 w40", None),
+    ("w40", [EntityType.DISEASE, EntityType.CHEMICAL]),
+    ("w2000", None),
+    ("w30000", None),
+]
+
+
+def populate_captions(database, captions: int):
+    entity_types = "['GENE', 'DISEASE', 'CHEMICAL', 'SPECIES', 'MUTATION', 'CELL_LINE']"
+    with database.engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO papers (id, title, abstract, processed_date, source, status) "
+            "SELECT 'PMC' || i, 'Paper ' || i, 'Abstract ' || i, now(), 'PMC', 'COMPLETED' "
+            "FROM range(:papers) t(i)"
+        ), {"papers": captions // FIGURES_PER_PAPER})
+        conn.execute(text(
+            "INSERT INTO figures (id, paper_id, figure_number, caption, url) "
+            "SELECT 'F' || (i // :per_paper) || '_' || (i % :per_paper), 'PMC' || (i // :per_paper), i % :per_paper + 1, "
+            "CASE WHEN i % 50 = 0 THEN 'Western blot of ' ELSE '' END || ("
+            "  SELECT string_agg('w' || CAST(floor(:vocabulary * pow(random(), 2)) AS INTEGER), ' ') "
+            "  FROM range(20 + i % 20) r(k) WHERE i >= 0"
+            "), NULL "
+            "FROM range(:captions) t(i)"
+        ), {"captions": captions, "per_paper": FIGURES_PER_PAPER, "vocabulary": VOCABULARY})
+        conn.execute(text(
+            "INSERT INTO entities (id, figure_id, entity_text, entity_type, start_position, end_position, external_id) "
+            "SELECT 'E' || i || '_' || k, 'F' || (i // :per_paper) || '_' || (i % :per_paper), 'ENT' || k, "
+            f"{entity_types}[((i + k * 3) % 6) + 1], 0, 5, NULL "
+            "FROM range(:captions) t(i), range(2) r(k)"
+        ), {"captions": captions, "per_paper": FIGURES_PER_PAPER})
+
+
+def main():
+    caption_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    
+    with temp_database() as database:
+        # search_figures reads through the module-level database
+        queries.db = database
+        caption_index.db = database
+        
+        start = time.perf_counter()
+        populate_captions(database, caption_count)
+        print(f"Generated {caption_count:,} captions in {time.perf_counter() - start:.1f}s")
+        
+        start = time.perf_counter()
+        counts = caption_index.rebuild_caption_index()
+        print(f"Indexed {counts['captions']:,} captions, {counts['terms']:,} terms in {time.perf_counter() - start:.1f}s")
+        
+        print(f"{'query':>32} {'hits':>6} {'p50 ms':>8} {'p95 ms':>8}")
+        for query, entity_types in QUERIES:
+            hits = len(queries.search_figures(query, entity_types, limit=20))
+            timings = measure(lambda: queries.search_figures(query, entity_types, limit=20), 20)
+            label = query if not entity_types else f"{query} +{'+'.join(t.value for t in entity_types)}"
+            print(f"{label:>32} {hits:>6} {timings['p50_ms']:>8.2f} {timings['p95_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
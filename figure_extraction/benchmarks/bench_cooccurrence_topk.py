@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Compare a top-K co-occurrence lookup against the maintained index with the
+same answer computed by self-joining the entity table at query time.
+
+Every synthetic entity appears in figures_per_paper x entities_per_figure
+figures of neighbouring papers, so each key is a moderately connected hub.
+The default corpus has 1M entities (25k papers x 4 figures x 10 entities).
+The join grows with the corpus; the index read only with the entity's partners.
+
+    python -m benchmarks.bench_cooccurrence_topk [papers]
+"""
+
+import sys
+import time
+
+from sqlalchemy import text
+
+from benchmarks.common import measure, populate_corpus, temp_database
+from src.storage import queries
+
+FIGURES_PER_PAPER = 4
+ENTITIES_PER_FIGURE = 10
+HUB_KEY = "gene:ent0"
+TOP_K = 10
+
+
+def main():
+    paper_count = int(sys.argv[1]) if len(sys.argv) > 1 else 25000
+    
+    with temp_database() as database:
+        queries.db = database
+        populate_corpus(database, paper_count, FIGURES_PER_PAPER, ENTITIES_PER_FIGURE)
+        
+        start = time.perf_counter()
+        pair_count = queries.rebuild_cooccurrences()
+        print(f"Built {pair_count:,} pairs in {time.perf_counter() - start:.2f}s")
+        
+        join_sql = text(f"""
+            WITH mentions AS (
+                SELECT e.figure_id, {queries.ENTITY_KEY_SQL} AS entity_key FROM entities e
+            )
+            SELECT b.entity_key, count(DISTINCT a.figure_id) AS cooccurrence_count
+            FROM mentions a
+            JOIN mentions b ON b.figure_id = a.figure_id AND b.entity_key <> a.entity_key
+            WHERE a.entity_key = :key
+            GROUP BY b.entity_key
+            ORDER BY cooccurrence_count DESC, b.entity_key
+            LIMIT :top_k
+        """)
+        
+        def join_lookup():
+            with database.engine.connect() as conn:
+                return conn.execute(join_sql, {"key": HUB_KEY, "top_k": TOP_K}).fetchall()
+        
+        def index_lookup():
+            return queries.get_cooccurrences(HUB_KEY, TOP_K)
+        
+        expected = [(row[0], row[1]) for row in join_lookup()]
+        actual = [(row.entity_key, row.cooccurrence_count) for row in index_lookup()]
+        assert expected == actual, (expected, actual)
+        
+        print(f"{'lookup':>12} {'p50 ms':>8} {'p95 ms':>8}")
+        for name, lookup, repeat in (("self-join", join_lookup, 5), ("index", index_lookup, 200)):
+            timings = measure(lookup, repeat)
+            print(f"{name:>12} {timings['p50_ms']:>8.2f} {timings['p95_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Compare export time and size across formats for the entity table.
+
+JSON, NDJSON and CSV are serialized row by row in Python; Parquet and Arrow
+are written by DuckDB without creating Python row objects. The default corpus
+has 1M entities (25k papers x 4 figures x 10 entities).
+
+    python -m benchmarks.bench_export_formats [papers]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.common import populate_corpus, temp_database
+from src.core.orchestrator import orchestrator
+from src.storage import queries
+
+FIGURES_PER_PAPER = 4
+ENTITIES_PER_FIGURE = 10
+FORMATS = ["json", "ndjson", "csv", "parquet", "arrow"]
+
+
+def path_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def main():
+    paper_count = int(sys.argv[1]) if len(sys.argv) > 1 else 25000
+    output_dir = tempfile.mkdtemp(prefix="figure_export_")
+    
+    try:
+        with temp_database() as database:
+            # The orchestrator reads through the module-level database
+            queries.db = database
+            populate_corpus(database, paper_count, FIGURES_PER_PAPER, ENTITIES_PER_FIGURE)
+            entity_count = paper_count * FIGURES_PER_PAPER * ENTITIES_PER_FIGURE
+            print(f"Exporting {entity_count:,} entities")
+            print(f"{'format':>22} {'seconds':>8} {'MB':>8}")
+            
+            runs = [(output_format, None) for output_format in FORMATS]
+            runs.append(("parquet", "entity_type"))
+            for output_format, partition_by in runs:
+                name = output_format if partition_by is None else f"{output_format} by {partition_by}"
+                output_path = os.path.join(output_dir, name.replace(" ", "_"))
+                
+                start = time.perf_counter()
+                orchestrator.export_data("entities", output_format, output_path, partition_by)
+                elapsed = time.perf_counter() - start
+                
+                size_mb = path_size(output_path) / (1024 * 1024)
+                print(f"{name:>22} {elapsed:>8.2f} {size_mb:>8.1f}")
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Benchmark single-figure lookups as the corpus grows.
+
+GET /figures/{figure_id} and /figures/{figure_id}/entities resolve the figure
+through queries.get_figure (primary key) and its entities through the
+entities.figure_id index, so latency should stay flat from 10k to 1M figures.
+
+    python -m benchmarks.bench_figure_lookup [max_figures]
+"""
+
+import random
+import sys
+
+from benchmarks.common import measure, populate_corpus, temp_database
+from src.storage import queries
+
+FIGURES_PER_PAPER = 10
+
+
+def run(corpus_sizes):
+    print(f"{'figures':>10} {'get_figure p50':>15} {'p95':>8} {'entities p50':>13} {'p95':>8}")
+    for figure_count in corpus_sizes:
+        paper_count = figure_count // FIGURES_PER_PAPER
+        with temp_database() as database:
+            populate_corpus(database, paper_count, FIGURES_PER_PAPER, entities_per_figure=2)
+            session = database.get_session()
+            try:
+                def random_figure_id():
+                    return f"F{random.randrange(paper_count)}_{random.randrange(FIGURES_PER_PAPER)}"
+                
+                figure_stats = measure(lambda: queries.get_figure(random_figure_id(), session))
+                entity_stats = measure(lambda: queries.get_entities_for_figure(random_figure_id(), session))
+            finally:
+                session.close()
+        
+        print(
+            f"{figure_count:>10} {figure_stats['p50_ms']:>15} {figure_stats['p95_ms']:>8} "
+            f"{entity_stats['p50_ms']:>13} {entity_stats['p95_ms']:>8}"
+        )
+
+
+def main():
+    max_figures = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    sizes = [size for size in (10_000, 100_000, 1_000_000) if size <= max_figures]
+    run(sizes)
+
+
+if __name__ == "__main__":
+    main()
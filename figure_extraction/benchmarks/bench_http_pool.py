@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Compare a fresh httpx.AsyncClient per request with the shared pooled client.
+
+A local keep-alive stub server stands in for BioC-PMC, so the numbers show the
+connection setup (and client construction) cost the pool avoids. Against the
+real HTTPS endpoints the TLS handshake makes the gap larger.
+
+    python -m benchmarks.bench_http_pool [requests]
+"""
+
+import asyncio
+import logging
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from src.core.http_client import create_http_client
+
+RESPONSE_BODY = b"<collection><document><passage><infon key='type'>title</infon><text>Stub</text></passage></document></collection>"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(RESPONSE_BODY)))
+        self.end_headers()
+        self.wfile.write(RESPONSE_BODY)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def fresh_client_request(url: str):
+    async with httpx.AsyncClient() as client:
+        response = await client.get(url, timeout=30.0)
+        response.raise_for_status()
+
+
+async def time_requests(request, count: int):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        await request()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), statistics.fmean(samples)
+
+
+async def run(count: int):
+    server = start_stub_server()
+    url = f"http://127.0.0.1:{server.server_address[1]}/retrieve?id=PMC1&format=xml"
+    
+    try:
+        fresh = await time_requests(lambda: fresh_client_request(url), count)
+        
+        pooled_client = create_http_client()
+        try:
+            pooled = await time_requests(lambda: pooled_client.get(url), count)
+        finally:
+            await pooled_client.aclose()
+    finally:
+        server.shutdown()
+    
+    print(f"{'client':>12} {'p50 ms':>8} {'mean ms':>8}")
+    print(f"{'per-request':>12} {fresh[0]:>8.2f} {fresh[1]:>8.2f}")
+    print(f"{'pooled':>12} {pooled[0]:>8.2f} {pooled[1]:>8.2f}")
+
+
+def main():
+    # Per-request INFO logs would dominate the timings
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    asyncio.run(run(count))
+
+
+if __name__ == "__main__":
+    main()
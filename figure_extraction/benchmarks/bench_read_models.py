@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Compare building response models from ORM objects with parse_obj against
+selecting explicit columns and building them with construct().
+
+The ORM path is the one the read helpers used before: load full ORM objects,
+then validate Model.parse_obj(orm.__dict__) row by row. The column path is
+what queries.list_papers and queries.list_entities do now. Both read the same
+rows; the default is 100k of each.
+
+    python -m benchmarks.bench_read_models [rows]
+"""
+
+import sys
+
+from benchmarks.common import measure, populate_corpus, temp_database
+from src.storage import queries
+from src.storage.database import PaperModel, EntityModel
+from src.storage.models import Paper, Entity
+
+FIGURES_PER_PAPER = 1
+ENTITIES_PER_FIGURE = 1
+
+
+def main():
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    
+    with temp_database() as database:
+        # The read helpers go through the module-level database
+        queries.db = database
+        populate_corpus(database, row_count, FIGURES_PER_PAPER, ENTITIES_PER_FIGURE)
+        
+        def orm_papers():
+            session = database.get_session()
+            try:
+                return [Paper.parse_obj(model.__dict__) for model in session.query(PaperModel).limit(row_count).all()]
+            finally:
+                session.close()
+        
+        def orm_entities():
+            session = database.get_session()
+            try:
+                query = session.query(EntityModel).order_by(EntityModel.id).limit(row_count)
+                return [Entity.parse_obj(model.__dict__) for model in query.all()]
+            finally:
+                session.close()
+        
+        runs = [
+            ("papers", "orm + parse_obj", orm_papers),
+            ("papers", "columns + construct", lambda: queries.list_papers(limit=row_count)),
+            ("entities", "orm + parse_obj", orm_entities),
+            ("entities", "columns + construct", lambda: queries.list_entities(limit=row_count)),
+        ]
+        
+        assert [paper.dict() for paper in orm_papers()] == [paper.dict() for paper in queries.list_papers(limit=row_count)]
+        assert [entity.dict() for entity in orm_entities()] == [entity.dict() for entity in queries.list_entities(limit=row_count)]
+        
+        print(f"Reading {row_count:,} rows")
+        print(f"{'table':>10} {'path':>22} {'p50 ms':>9} {'rows/s':>12}")
+        for table, name, read in runs:
+            timings = measure(read, 5)
+            print(f"{table:>10} {name:>22} {timings['p50_ms']:>9.1f} {row_count / timings['p50_ms'] * 1000:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
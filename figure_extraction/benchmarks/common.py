@@ -0,0 +1,83 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway DuckDB file so they never touch the
+configured database. Run them from the project root, e.g.:
+
+    python -m benchmarks.bench_figure_lookup
+"""
+
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List
+
+from sqlalchemy import text
+
+from src.config.settings import settings
+from src.storage.database import Database
+
+
+@contextmanager
+def temp_database() -> Iterator[Database]:
+    """Create an initialized Database in a temporary directory."""
+    temp_dir = tempfile.mkdtemp(prefix="figure_bench_")
+    original_path = settings.storage.duckdb_path
+    settings.storage.duckdb_path = str(Path(temp_dir) / "bench.duckdb")
+    try:
+        database = Database()
+        database.initialize()
+        yield database
+        database.engine.dispose()
+    finally:
+        settings.storage.duckdb_path = original_path
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def populate_corpus(database: Database, papers: int, figures_per_paper: int = 10, entities_per_figure: int = 0):
+    """
+    Fill the database with synthetic papers, figures and entities using set-based SQL.
+    
+    Figure IDs are 'F<paper>_<n>' and entity IDs 'E<paper>_<n>_<m>' so benchmarks can
+    address rows directly without reading them back first.
+    """
+    entity_types = "['GENE', 'DISEASE', 'CHEMICAL', 'SPECIES', 'MUTATION', 'CELL_LINE']"
+    with database.engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO papers (id, title, abstract, processed_date, source, status) "
+            "SELECT 'PMC' || i, 'Paper ' || i, 'Abstract ' || i, now(), 'PMC', 'COMPLETED' "
+            "FROM range(:papers) t(i)"
+        ), {"papers": papers})
+        conn.execute(text(
+            "INSERT INTO figures (id, paper_id, figure_number, caption, url) "
+            "SELECT 'F' || p.i || '_' || f.j, 'PMC' || p.i, f.j + 1, "
+            "'Figure ' || (f.j + 1) || '. Western blot of TP53 and BRCA1 in sample ' || p.i, NULL "
+            "FROM range(:papers) p(i), range(:figures) f(j)"
+        ), {"papers": papers, "figures": figures_per_paper})
+        if entities_per_figure:
+            conn.execute(text(
+                "INSERT INTO entities (id, figure_id, entity_text, entity_type, start_position, end_position, external_id) "
+                "SELECT 'E' || p.i || '_' || f.j || '_' || e.k, 'F' || p.i || '_' || f.j, "
+                "'ENT' || ((p.i + e.k) % 5000), "
+                f"{entity_types}[(e.k % 6) + 1], e.k * 10, e.k * 10 + 5, NULL "
+                "FROM range(:papers) p(i), range(:figures) f(j), range(:entities) e(k)"
+            ), {"papers": papers, "figures": figures_per_paper, "entities": entities_per_figure})
+
+
+def measure(fn: Callable[[], object], repeat: int = 200) -> Dict[str, float]:
+    """Run fn repeatedly and return latency percentiles in milliseconds."""
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+    }
@@ -2,7 +2,7 @@
 -- Used for analytical queries and data exports
 
 -- Papers dimension table
-CREATE TABLE papers (
+CREATE TABLE IF NOT EXISTS papers (
     paper_id VARCHAR PRIMARY KEY,
     title VARCHAR,
     abstract VARCHAR,
@@ -12,7 +12,7 @@ CREATE TABLE papers (
 );
 
 -- Figures dimension table
-CREATE TABLE figures (
+CREATE TABLE IF NOT EXISTS figures (
     figure_id VARCHAR PRIMARY KEY,
     paper_id VARCHAR,
     figure_number INTEGER,
@@ -21,7 +21,7 @@ CREATE TABLE figures (
 );
 
 -- Entities dimension table
-CREATE TABLE entities (
+CREATE TABLE IF NOT EXISTS entities (
     entity_id VARCHAR PRIMARY KEY,
     entity_text VARCHAR,
     entity_type VARCHAR,
@@ -29,7 +29,7 @@ CREATE TABLE entities (
 );
 
 -- Figure-entity fact table
-CREATE TABLE figure_entities (
+CREATE TABLE IF NOT EXISTS figure_entities (
     figure_id VARCHAR,
     entity_id VARCHAR,
     start_position INTEGER,
@@ -38,7 +38,7 @@ CREATE TABLE figure_entities (
 );
 
 -- Entity co-occurrence fact table
-CREATE TABLE entity_cooccurrences (
+CREATE TABLE IF NOT EXISTS entity_cooccurrences (
     figure_id VARCHAR,
     entity_id1 VARCHAR,
     entity_id2 VARCHAR,
@@ -49,7 +49,7 @@ CREATE TABLE entity_cooccurrences (
 );
 
 -- Paper-entity relationship table
-CREATE TABLE paper_entities (
+CREATE TABLE IF NOT EXISTS paper_entities (
     paper_id VARCHAR,
     entity_id VARCHAR,
     occurrence_count INTEGER,
@@ -57,7 +57,7 @@ CREATE TABLE paper_entities (
 );
 
 -- Entity statistics table
-CREATE TABLE entity_statistics (
+CREATE TABLE IF NOT EXISTS entity_statistics (
     entity_type VARCHAR PRIMARY KEY,
     entity_count INTEGER,
     figure_count INTEGER,
@@ -65,8 +65,15 @@ CREATE TABLE entity_statistics (
     top_entities VARCHAR  -- JSON array of top entities
 );
 
+-- ETL state: watermark of the last sync from the operational store
+CREATE TABLE IF NOT EXISTS etl_state (
+    name VARCHAR PRIMARY KEY,
+    watermark TIMESTAMP,
+    last_run_at TIMESTAMP
+);
+
 -- Create indexes for performance
-CREATE INDEX idx_figures_paper_id ON figures (paper_id);
-CREATE INDEX idx_figure_entities_entity_id ON figure_entities (entity_id);
-CREATE INDEX idx_entities_type ON entities (entity_type);
-CREATE INDEX idx_paper_entities_entity_id ON paper_entities (entity_id);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_figures_paper_id ON figures (paper_id);
+CREATE INDEX IF NOT EXISTS idx_figure_entities_entity_id ON figure_entities (entity_id);
+CREATE INDEX IF NOT EXISTS idx_entities_type ON entities (entity_type);
+CREATE INDEX IF NOT EXISTS idx_paper_entities_entity_id ON paper_entities (entity_id);
\ No newline at end of file
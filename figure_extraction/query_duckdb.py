@@ -31,7 +31,7 @@ def get_entity_distribution(conn):
 
 def get_top_entities_by_type(conn, entity_type, limit=10):
     """Get top entities of a specific type."""
-    query = f"""
+    query = """
     SELECT 
         e.entity_text, 
         COUNT(DISTINCT fe.figure_id) as figure_count,
@@ -39,19 +39,24 @@ def get_top_entities_by_type(conn, entity_type, limit=10):
     FROM entities e
     JOIN figure_entities fe ON e.entity_id = fe.entity_id
     JOIN figures f ON fe.figure_id = f.figure_id
-    WHERE e.entity_type = '{entity_type}'
+    WHERE e.entity_type = ?
     GROUP BY e.entity_text
     ORDER BY figure_count DESC
-    LIMIT {limit}
+    LIMIT ?
     """
-    return conn.execute(query).fetchdf()
+    return conn.execute(query, [entity_type, limit]).fetchdf()
 
 
 def get_entity_cooccurrences(conn, entity_text, limit=10):
-    """Get entities that co-occur with a specific entity."""
-    query = f"""
+    """
+    Get entities that co-occur with a specific entity.
+    
+    This aggregates the star schema at query time; the API serves the same
+    lookup from the precomputed index (GET /entities/{id}/cooccurrences).
+    """
+    query = """
     WITH target_entity AS (
-        SELECT entity_id FROM entities WHERE entity_text = '{entity_text}'
+        SELECT entity_id FROM entities WHERE entity_text = ?
     )
     SELECT 
         e2.entity_text, 
@@ -64,14 +69,14 @@ def get_entity_cooccurrences(conn, entity_text, limit=10):
     JOIN target_entity te ON e1.entity_id = te.entity_id
     GROUP BY e2.entity_text, e2.entity_type
     ORDER BY cooccurrence_count DESC
-    LIMIT {limit}
+    LIMIT ?
     """
-    return conn.execute(query).fetchdf()
+    return conn.execute(query, [entity_text, limit]).fetchdf()
 
 
 def get_figures_with_entities(conn, entity_types, limit=20):
     """Get figures containing specific entity types."""
-    entity_types_str = "', '".join(entity_types)
+    placeholders = ", ".join("?" for _ in entity_types)
     query = f"""
     SELECT 
         f.figure_id,
@@ -85,13 +90,13 @@ def get_figures_with_entities(conn, entity_types, limit=20):
     JOIN figure_entities fe ON f.figure_id = fe.figure_id
     JOIN entities e ON fe.entity_id = e.entity_id
     JOIN papers p ON f.paper_id = p.paper_id
-    WHERE e.entity_type IN ('{entity_types_str}')
+    WHERE e.entity_type IN ({placeholders})
     GROUP BY f.figure_id, f.paper_id, p.title, f.figure_number, f.caption
-    HAVING COUNT(DISTINCT e.entity_type) = {len(entity_types)}
+    HAVING COUNT(DISTINCT e.entity_type) = ?
     ORDER BY entity_count DESC
-    LIMIT {limit}
+    LIMIT ?
     """
-    return conn.execute(query).fetchdf()
+    return conn.execute(query, [*entity_types, len(entity_types), limit]).fetchdf()
 
 
 def get_entity_statistics(conn):
@@ -127,7 +132,7 @@ def export_figures_with_entities_to_csv(df, output_file):
 def main():
     """Main function."""
     # Connect to database
-    db_path = "tests/mocks/analytics.duckdb"
+    db_path = "data/analytics.duckdb"  # Populated by `admin sync-analytics`
     conn = connect_to_db(db_path)
     
     # Create output directory if it doesn't exist
@@ -141,7 +146,7 @@ def main():
     plot_entity_distribution(entity_distribution)
     
     # Get top genes
-    top_genes = get_top_entities_by_type(conn, "Gene", limit=5)
+    top_genes = get_top_entities_by_type(conn, "gene", limit=5)
     print("\nTop Genes:")
     print(top_genes)
     
@@ -151,7 +156,7 @@ def main():
     print(gata4_cooccurrences)
     
     # Get figures with both Gene and Disease entities
-    figures_with_gene_disease = get_figures_with_entities(conn, ["Gene", "Disease"], limit=10)
+    figures_with_gene_disease = get_figures_with_entities(conn, ["gene", "disease"], limit=10)
     print("\nFigures with both Gene and Disease entities:")
     print(figures_with_gene_disease)
     
@@ -1,16 +1,23 @@
+import hashlib
 import logging
 import os
+import uuid
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form, Query, Path
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form, Query, Path, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 
 from src.config.settings import settings
-from src.storage.models import Paper, Figure, Entity, Job, ProcessingStatus, JobType, EntityType
+from src.storage.models import Paper, Figure, FigurePage, FigureSearchResult, Entity, EntityPage, EntityCooccurrence, Job, JobPaperPage, ProcessingStatus, JobType, EntityType
 from src.storage import queries
+from src.storage.stats import get_system_stats, get_stats_cache_stats
+from src.storage.read_cache import read_cache
 from src.core.orchestrator import orchestrator
 from src.core.jobs import job_manager
+from src.core.response_cache import get_cache_stats
 from src.api.auth import verify_api_key
 
 # Set up logging
@@ -24,6 +31,32 @@ jobs_router = APIRouter(prefix="/jobs", tags=["jobs"])
 export_router = APIRouter(prefix="/export", tags=["export"])
 admin_router = APIRouter(prefix="/admin", tags=["admin"])
 
+# Bytes of an uploaded file read into memory at a time
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+def _conditional_response(request: Request, content: Any) -> Response:
+    """
+    Serialize a response with an ETag computed from its body, or answer
+    304 Not Modified if the client's If-None-Match already names that ETag.
+    """
+    response = JSONResponse(content=jsonable_encoder(content))
+    etag = f'"{hashlib.blake2b(response.body, digest_size=16).hexdigest()}"'
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # Weak comparison, as If-None-Match requires
+        client_etags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in client_etags or "*" in client_etags:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    
+    response.headers["ETag"] = etag
+    return response
+
+def _with_paper_ids(jobs: List[Job]) -> List[Job]:
+    """Copy jobs with their first paper IDs from job_papers, as clients expect in a job response."""
+    paper_ids = queries.get_job_paper_ids([job.id for job in jobs], settings.api.job_paper_ids_limit)
+    return [job.copy(update={"paper_ids": paper_ids[job.id]}) for job in jobs]
+
 # Papers endpoints
 @papers_router.post("", response_model=Job)
 async def submit_papers(
@@ -41,7 +74,7 @@ async def submit_papers(
     
     try:
         job = await orchestrator.process_papers(paper_ids)
-        return job
+        return _with_paper_ids([job])[0]
     except Exception as e:
         logger.error(f"Error submitting papers: {e}")
         raise HTTPException(
@@ -57,26 +90,32 @@ async def submit_papers_file(
     """
     Submit a file containing paper IDs for processing.
     """
+    # Unique name so concurrent uploads of the same file do not collide; the
+    # extension is kept because it tells CSV files apart
+    temp_file_path = os.path.join(
+        settings.temp_dir, f"{uuid.uuid4().hex}_{os.path.basename(file.filename or 'papers.txt')}"
+    )
     try:
-        # Save file to temp directory
-        temp_file_path = os.path.join(settings.temp_dir, file.filename)
+        # Save file to temp directory a chunk at a time, so large uploads are never held in memory
+        os.makedirs(settings.temp_dir, exist_ok=True)
         with open(temp_file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                f.write(chunk)
         
         # Process file
         job = await orchestrator.process_paper_file(temp_file_path)
         
-        # Clean up
-        os.remove(temp_file_path)
-        
-        return job
+        return _with_paper_ids([job])[0]
     except Exception as e:
         logger.error(f"Error submitting papers file: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error submitting papers file: {str(e)}"
         )
+    finally:
+        # Clean up
+        if os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
 
 @papers_router.get("", response_model=List[Paper])
 async def list_papers(
@@ -100,11 +139,12 @@ async def list_papers(
 
 @papers_router.get("/{paper_id}", response_model=Paper)
 async def get_paper(
+    request: Request,
     paper_id: str = Path(..., description="The ID of the paper"),
     api_key: str = Depends(verify_api_key)
-) -> Paper:
+) -> Response:
     """
-    Get details for a specific paper.
+    Get details for a specific paper. Supports If-None-Match with the returned ETag.
     """
     try:
         # Normalize paper ID
@@ -118,7 +158,9 @@ async def get_paper(
                 detail=f"Paper {paper_id} not found"
             )
         
-        return paper
+        return _conditional_response(request, paper)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting paper {paper_id}: {e}")
         raise HTTPException(
@@ -128,11 +170,12 @@ async def get_paper(
 
 @papers_router.get("/{paper_id}/figures", response_model=List[Figure])
 async def get_paper_figures(
+    request: Request,
     paper_id: str = Path(..., description="The ID of the paper"),
     api_key: str = Depends(verify_api_key)
-) -> List[Figure]:
+) -> Response:
     """
-    Get figures for a specific paper.
+    Get figures for a specific paper. Supports If-None-Match with the returned ETag.
     """
     try:
         # Normalize paper ID
@@ -148,7 +191,9 @@ async def get_paper_figures(
             )
         
         figures = queries.get_figures_for_paper(paper_id)
-        return figures
+        return _conditional_response(request, figures)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting figures for paper {paper_id}: {e}")
         raise HTTPException(
@@ -157,26 +202,36 @@ async def get_paper_figures(
         )
 
 # Figures endpoints
-@figures_router.get("", response_model=List[Figure])
+@figures_router.get("", response_model=FigurePage)
 async def list_figures(
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    paper_id: Optional[str] = Query(None, description="Only figures of this paper"),
+    entity_type: Optional[EntityType] = Query(None, description="Only figures mentioning this entity type"),
     api_key: str = Depends(verify_api_key)
-) -> List[Figure]:
+) -> FigurePage:
     """
     List all figures.
     """
     try:
-        # Get all papers
-        papers = queries.list_papers(limit=limit, offset=offset)
+        # Normalize paper ID
+        if paper_id is not None and not paper_id.startswith("PMC"):
+            paper_id = f"PMC{paper_id}"
+        
+        figures = queries.list_figures(
+            limit=limit + 1,
+            offset=offset,
+            after_id=cursor,
+            paper_id=paper_id,
+            has_entity_type=entity_type
+        )
         
-        # Get figures for each paper
-        figures = []
-        for paper in papers:
-            paper_figures = queries.get_figures_for_paper(paper.id)
-            figures.extend(paper_figures)
+        if len(figures) > limit:
+            figures = figures[:limit]
+            return FigurePage(items=figures, next_cursor=figures[-1].id)
         
-        return figures
+        return FigurePage(items=figures)
     except Exception as e:
         logger.error(f"Error listing figures: {e}")
         raise HTTPException(
@@ -184,6 +239,26 @@ async def list_figures(
             detail=f"Error listing figures: {str(e)}"
         )
 
+@figures_router.get("/search", response_model=List[FigureSearchResult])
+async def search_figures(
+    q: str = Query(..., min_length=1, description="Terms that must all appear in the caption"),
+    entity_type: Optional[List[EntityType]] = Query(None, description="Only figures mentioning these entity types"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    api_key: str = Depends(verify_api_key)
+) -> List[FigureSearchResult]:
+    """
+    Search figure captions, best match first.
+    """
+    try:
+        return queries.search_figures(q, entity_types=entity_type, limit=limit, offset=offset)
+    except Exception as e:
+        logger.error(f"Error searching figures for {q!r}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error searching figures: {str(e)}"
+        )
+
 @figures_router.get("/{figure_id}", response_model=Figure)
 async def get_figure(
     figure_id: str = Path(..., description="The ID of the figure"),
@@ -193,15 +268,9 @@ async def get_figure(
     Get details for a specific figure.
     """
     try:
-        # Get all papers
-        papers = queries.list_papers()
-        
-        # Get figures for each paper and find the one with matching ID
-        for paper in papers:
-            paper_figures = queries.get_figures_for_paper(paper.id)
-            for figure in paper_figures:
-                if figure.id == figure_id:
-                    return figure
+        figure = queries.get_figure(figure_id)
+        if figure is not None:
+            return figure
         
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -218,35 +287,24 @@ async def get_figure(
 
 @figures_router.get("/{figure_id}/entities", response_model=List[Entity])
 async def get_figure_entities(
+    request: Request,
     figure_id: str = Path(..., description="The ID of the figure"),
     api_key: str = Depends(verify_api_key)
-) -> List[Entity]:
+) -> Response:
     """
-    Get entities for a specific figure.
+    Get entities for a specific figure. Supports If-None-Match with the returned ETag.
     """
     try:
-        # Get all papers
-        papers = queries.list_papers()
-        
-        # Get figures for each paper and find the one with matching ID
-        figure_found = False
-        for paper in papers:
-            paper_figures = queries.get_figures_for_paper(paper.id)
-            for figure in paper_figures:
-                if figure.id == figure_id:
-                    figure_found = True
-                    break
-            if figure_found:
-                break
+        entities = queries.get_entities_for_figure(figure_id)
         
-        if not figure_found:
+        # Only a figure without entities needs checking, so cached lists skip the database
+        if not entities and queries.get_figure(figure_id) is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Figure {figure_id} not found"
             )
         
-        entities = queries.get_entities_for_figure(figure_id)
-        return entities
+        return _conditional_response(request, entities)
     except HTTPException:
         raise
     except Exception as e:
@@ -257,36 +315,27 @@ async def get_figure_entities(
         )
 
 # Entities endpoints
-@entities_router.get("", response_model=List[Entity])
+def _entity_page(entities: List[Entity], limit: int) -> EntityPage:
+    """Build a page from up to limit + 1 entities, using the extra row to detect a next page."""
+    if len(entities) > limit:
+        entities = entities[:limit]
+        return EntityPage(items=entities, next_cursor=entities[-1].id)
+    
+    return EntityPage(items=entities)
+
+@entities_router.get("", response_model=EntityPage)
 async def list_entities(
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     api_key: str = Depends(verify_api_key)
-) -> List[Entity]:
+) -> EntityPage:
     """
     List all entities.
     """
     try:
-        # Get all papers
-        papers = queries.list_papers()
-        
-        # Get figures for each paper
-        figures = []
-        for paper in papers:
-            paper_figures = queries.get_figures_for_paper(paper.id)
-            figures.extend(paper_figures)
-        
-        # Get entities for each figure
-        entities = []
-        for figure in figures:
-            figure_entities = queries.get_entities_for_figure(figure.id)
-            entities.extend(figure_entities)
-        
-        # Apply limit and offset
-        start = min(offset, len(entities))
-        end = min(offset + limit, len(entities))
-        
-        return entities[start:end]
+        entities = queries.list_entities(limit=limit + 1, offset=offset, after_id=cursor)
+        return _entity_page(entities, limit)
     except Exception as e:
         logger.error(f"Error listing entities: {e}")
         raise HTTPException(
@@ -294,39 +343,25 @@ async def list_entities(
             detail=f"Error listing entities: {str(e)}"
         )
 
-@entities_router.get("/{entity_type}", response_model=List[Entity])
+@entities_router.get("/{entity_type}", response_model=EntityPage)
 async def list_entities_by_type(
     entity_type: EntityType = Path(..., description="The type of entity"),
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     api_key: str = Depends(verify_api_key)
-) -> List[Entity]:
+) -> EntityPage:
     """
     List entities of a specific type.
     """
     try:
-        # Get all papers
-        papers = queries.list_papers()
-        
-        # Get figures for each paper
-        figures = []
-        for paper in papers:
-            paper_figures = queries.get_figures_for_paper(paper.id)
-            figures.extend(paper_figures)
-        
-        # Get entities for each figure and filter by type
-        entities = []
-        for figure in figures:
-            figure_entities = queries.get_entities_for_figure(figure.id)
-            for entity in figure_entities:
-                if entity.entity_type == entity_type:
-                    entities.append(entity)
-        
-        # Apply limit and offset
-        start = min(offset, len(entities))
-        end = min(offset + limit, len(entities))
-        
-        return entities[start:end]
+        entities = queries.list_entities(
+            entity_type=entity_type,
+            limit=limit + 1,
+            offset=offset,
+            after_id=cursor
+        )
+        return _entity_page(entities, limit)
     except Exception as e:
         logger.error(f"Error listing entities of type {entity_type}: {e}")
         raise HTTPException(
@@ -334,6 +369,36 @@ async def list_entities_by_type(
             detail=f"Error listing entities: {str(e)}"
         )
 
+@entities_router.get("/{entity_id}/cooccurrences", response_model=List[EntityCooccurrence])
+async def get_entity_cooccurrences(
+    entity_id: str = Path(..., description="An entity mention ID, or an entity key such as gene:7157"),
+    top_k: int = Query(10, ge=1, le=1000),
+    api_key: str = Depends(verify_api_key)
+) -> List[EntityCooccurrence]:
+    """
+    Get the entities that appear in the most figures together with an entity.
+    """
+    try:
+        entity = queries.get_entity(entity_id)
+        key = queries.entity_key(entity) if entity is not None else entity_id
+        
+        cooccurrences = queries.get_cooccurrences(key, top_k)
+        if entity is None and not cooccurrences:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Entity {entity_id} not found"
+            )
+        
+        return cooccurrences
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting co-occurrences for entity {entity_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error getting co-occurrences: {str(e)}"
+        )
+
 # Jobs endpoints
 @jobs_router.get("", response_model=List[Job])
 async def list_jobs(
@@ -348,7 +413,7 @@ async def list_jobs(
     """
     try:
         jobs = queries.list_jobs(limit=limit, offset=offset, status=status, job_type=job_type)
-        return jobs
+        return _with_paper_ids(jobs)
     except Exception as e:
         logger.error(f"Error listing jobs: {e}")
         raise HTTPException(
@@ -372,7 +437,7 @@ async def get_job(
                 detail=f"Job {job_id} not found"
             )
         
-        return job
+        return _with_paper_ids([job])[0]
     except HTTPException:
         raise
     except Exception as e:
@@ -382,6 +447,40 @@ async def get_job(
             detail=f"Error getting job: {str(e)}"
         )
 
+@jobs_router.get("/{job_id}/papers", response_model=JobPaperPage)
+async def list_job_papers(
+    job_id: str = Path(..., description="The ID of the job"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    paper_status: Optional[ProcessingStatus] = Query(None, alias="status"),
+    api_key: str = Depends(verify_api_key)
+) -> JobPaperPage:
+    """
+    List the papers of a job with their progress, one page at a time.
+    """
+    try:
+        if queries.get_job(job_id) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Job {job_id} not found"
+            )
+        
+        # One extra row tells whether there is a next page
+        papers = queries.list_job_papers(job_id, status=paper_status, limit=limit + 1, after=cursor)
+        if len(papers) > limit:
+            papers = papers[:limit]
+            return JobPaperPage(items=papers, next_cursor=papers[-1].paper_id)
+        
+        return JobPaperPage(items=papers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error listing papers of job {job_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error listing job papers: {str(e)}"
+        )
+
 @jobs_router.post("/{job_id}/cancel", response_model=Job)
 async def cancel_job(
     job_id: str = Path(..., description="The ID of the job"),
@@ -398,7 +497,7 @@ async def cancel_job(
                 detail=f"Job {job_id} not found"
             )
         
-        return job
+        return _with_paper_ids([job])[0]
     except HTTPException:
         raise
     except Exception as e:
@@ -408,40 +507,83 @@ async def cancel_job(
             detail=f"Error canceling job: {str(e)}"
         )
 
-# Export endpoints
-@export_router.get("/papers")
-async def export_papers(
-    format: str = Query("json", description="Export format (json or csv)"),
+@jobs_router.post("/{job_id}/resume", response_model=Job)
+async def resume_job(
+    job_id: str = Path(..., description="The ID of the job"),
     api_key: str = Depends(verify_api_key)
-):
+) -> Job:
     """
-    Export papers data.
+    Resume a stopped job. Papers it already completed are skipped.
     """
     try:
-        if format not in ["json", "csv"]:
+        job = await job_manager.resume_job(job_id)
+        if job is None:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid format: {format}. Must be 'json' or 'csv'."
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Job {job_id} not found"
             )
         
-        # Create export directory if it doesn't exist
+        return _with_paper_ids([job])[0]
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error resuming job {job_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error resuming job: {str(e)}"
+        )
+
+# Export endpoints
+EXPORT_MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file"
+}
+
+def _export_response(data_type: str, format: str):
+    """Return an export as a file download."""
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid format: {format}. Must be one of: {', '.join(EXPORT_MEDIA_TYPES)}."
+        )
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{data_type}_{timestamp}.{format}"
+    
+    if format in ("parquet", "arrow"):
+        # Binary formats are written by DuckDB to a temporary file, removed once sent
         export_dir = os.path.join(settings.temp_dir, "exports")
         os.makedirs(export_dir, exist_ok=True)
+        export_path = os.path.join(export_dir, f"{uuid.uuid4().hex}_{filename}")
+        orchestrator.export_data(data_type, format, export_path)
         
-        # Generate export file path
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"papers_{timestamp}.{format}"
-        export_path = os.path.join(export_dir, filename)
-        
-        # Export data
-        orchestrator.export_data("papers", format, export_path)
-        
-        # Return file
         return FileResponse(
             path=export_path,
             filename=filename,
-            media_type="application/json" if format == "json" else "text/csv"
+            media_type=EXPORT_MEDIA_TYPES[format],
+            background=BackgroundTask(os.remove, export_path)
         )
+    
+    # Rows are read and serialized as the response is sent
+    return StreamingResponse(
+        orchestrator.stream_export(data_type, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@export_router.get("/papers")
+async def export_papers(
+    format: str = Query("json", description="Export format (json, ndjson, csv, parquet or arrow)"),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Export papers data.
+    """
+    try:
+        return _export_response("papers", format)
     except HTTPException:
         raise
     except Exception as e:
@@ -453,37 +595,14 @@ async def export_papers(
 
 @export_router.get("/figures")
 async def export_figures(
-    format: str = Query("json", description="Export format (json or csv)"),
+    format: str = Query("json", description="Export format (json, ndjson, csv, parquet or arrow)"),
     api_key: str = Depends(verify_api_key)
 ):
     """
     Export figures data.
     """
     try:
-        if format not in ["json", "csv"]:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid format: {format}. Must be 'json' or 'csv'."
-            )
-        
-        # Create export directory if it doesn't exist
-        export_dir = os.path.join(settings.temp_dir, "exports")
-        os.makedirs(export_dir, exist_ok=True)
-        
-        # Generate export file path
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"figures_{timestamp}.{format}"
-        export_path = os.path.join(export_dir, filename)
-        
-        # Export data
-        orchestrator.export_data("figures", format, export_path)
-        
-        # Return file
-        return FileResponse(
-            path=export_path,
-            filename=filename,
-            media_type="application/json" if format == "json" else "text/csv"
-        )
+        return _export_response("figures", format)
     except HTTPException:
         raise
     except Exception as e:
@@ -495,37 +614,14 @@ async def export_figures(
 
 @export_router.get("/entities")
 async def export_entities(
-    format: str = Query("json", description="Export format (json or csv)"),
+    format: str = Query("json", description="Export format (json, ndjson, csv, parquet or arrow)"),
     api_key: str = Depends(verify_api_key)
 ):
     """
     Export entities data.
     """
     try:
-        if format not in ["json", "csv"]:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid format: {format}. Must be 'json' or 'csv'."
-            )
-        
-        # Create export directory if it doesn't exist
-        export_dir = os.path.join(settings.temp_dir, "exports")
-        os.makedirs(export_dir, exist_ok=True)
-        
-        # Generate export file path
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"entities_{timestamp}.{format}"
-        export_path = os.path.join(export_dir, filename)
-        
-        # Export data
-        orchestrator.export_data("entities", format, export_path)
-        
-        # Return file
-        return FileResponse(
-            path=export_path,
-            filename=filename,
-            media_type="application/json" if format == "json" else "text/csv"
-        )
+        return _export_response("entities", format)
     except HTTPException:
         raise
     except Exception as e:
@@ -564,12 +660,14 @@ async def get_config(
             "storage": {
                 "storage_type": settings.storage.storage_type,
                 "duckdb_path": settings.storage.duckdb_path,
+                "analytics_path": settings.storage.analytics_path,
                 "backup_enabled": settings.storage.backup_enabled,
                 "backup_interval": settings.storage.backup_interval
             },
             "processing": {
                 "extraction_workers": settings.processing.extraction_workers,
                 "entity_detection_workers": settings.processing.entity_detection_workers,
+                "pipeline_queue_size": settings.processing.pipeline_queue_size,
                 "batch_size": settings.processing.batch_size,
                 "retry_limit": settings.processing.retry_limit,
                 "retry_delay": settings.processing.retry_delay
@@ -583,7 +681,15 @@ async def get_config(
                 "bioc_pmc_url": settings.external_api.bioc_pmc_url,
                 "bioc_pmc_rate_limit": settings.external_api.bioc_pmc_rate_limit,
                 "pubtator3_url": settings.external_api.pubtator3_url,
-                "pubtator3_rate_limit": settings.external_api.pubtator3_rate_limit
+                "pubtator3_rate_limit": settings.external_api.pubtator3_rate_limit,
+                "http2": settings.external_api.http2,
+                "max_connections": settings.external_api.max_connections,
+                "max_keepalive_connections": settings.external_api.max_keepalive_connections
+            },
+            "cache": {
+                "enabled": settings.cache.enabled,
+                "ttl": settings.cache.ttl,
+                "max_size_mb": settings.cache.max_size_mb
             }
         }
         
@@ -597,72 +703,18 @@ async def get_config(
 
 @admin_router.get("/stats")
 async def get_stats(
+    refresh: bool = Query(False, description="Recompute instead of serving cached statistics"),
     api_key: str = Depends(verify_api_key)
 ):
     """
     Get system statistics.
     """
     try:
-        # Get counts from database
-        session = queries.db.get_session()
-        
-        try:
-            # Count papers by status
-            papers_by_status = {}
-            for status_value in ProcessingStatus:
-                count = session.query(queries.PaperModel).filter(
-                    queries.PaperModel.status == status_value
-                ).count()
-                papers_by_status[status_value.value] = count
-            
-            # Count figures
-            figure_count = session.query(queries.FigureModel).count()
-            
-            # Count entities by type
-            entities_by_type = {}
-            for entity_type in EntityType:
-                count = session.query(queries.EntityModel).filter(
-                    queries.EntityModel.entity_type == entity_type
-                ).count()
-                entities_by_type[entity_type.value] = count
-            
-            # Count jobs by status
-            jobs_by_status = {}
-            for status_value in ProcessingStatus:
-                count = session.query(queries.JobModel).filter(
-                    queries.JobModel.status == status_value
-                ).count()
-                jobs_by_status[status_value.value] = count
-            
-            # Get database file size
-            db_path = settings.storage.duckdb_path
-            db_size = os.path.getsize(db_path) if os.path.exists(db_path) else 0
-            
-            stats = {
-                "papers": {
-                    "total": sum(papers_by_status.values()),
-                    "by_status": papers_by_status
-                },
-                "figures": {
-                    "total": figure_count
-                },
-                "entities": {
-                    "total": sum(entities_by_type.values()),
-                    "by_type": entities_by_type
-                },
-                "jobs": {
-                    "total": sum(jobs_by_status.values()),
-                    "by_status": jobs_by_status
-                },
-                "database": {
-                    "size_bytes": db_size,
-                    "size_mb": round(db_size / (1024 * 1024), 2) if db_size > 0 else 0
-                }
-            }
-            
-            return stats
-        finally:
-            session.close()
+        stats = get_system_stats(refresh=refresh)
+        stats["stats_cache"] = get_stats_cache_stats()
+        stats["response_cache"] = get_cache_stats()
+        stats["read_cache"] = read_cache.get_stats()
+        return stats
     except Exception as e:
         logger.error(f"Error getting statistics: {e}")
         raise HTTPException(
@@ -6,6 +6,7 @@ from fastapi.responses import JSONResponse
 
 from src.config.settings import settings
 from src.storage.database import db
+from src.core.jobs import job_manager
 from src.api.endpoints import papers_router, figures_router, entities_router, jobs_router, export_router, admin_router
 
 # Set up logging
@@ -39,6 +40,12 @@ def create_app() -> FastAPI:
         logger.info(f"Response: {response.status_code}")
         return response
     
+    # Open the database file off the event loop before the handlers run their queries
+    @app.middleware("http")
+    async def hold_database(request: Request, call_next):
+        async with db.hold_open():
+            return await call_next(request)
+    
     # Add error handling middleware
     @app.exception_handler(Exception)
     async def global_exception_handler(request: Request, exc: Exception):
@@ -62,6 +69,18 @@ def create_app() -> FastAPI:
         logger.info("Initializing database...")
         db.initialize()
     
+    # Run queued jobs in this process unless dedicated `worker` processes do
+    @app.on_event("startup")
+    async def start_job_worker():
+        if settings.processing.run_jobs_in_process:
+            job_manager.start_worker()
+    
+    # Hand running jobs back to the queue and close the shared HTTP client on shutdown
+    @app.on_event("shutdown")
+    async def shutdown():
+        await job_manager.stop_worker()
+        await job_manager.close()
+    
     # Add health check endpoint
     @app.get("/health")
     async def health_check():
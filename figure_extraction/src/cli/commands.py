@@ -1,5 +1,7 @@
 import os
 import sys
+import signal
+import threading
 import logging
 import asyncio
 import json
@@ -14,8 +16,10 @@ from rich.logging import RichHandler
 
 from src.config.settings import settings, initialize_directories
 from src.storage.database import db
+from src.storage import queries, caption_index
+from src.storage.analytics import analytics_sync
 from src.storage.models import ProcessingStatus, JobType, EntityType
-from src.core.orchestrator import orchestrator
+from src.core.orchestrator import orchestrator, EXPORT_FORMATS
 from src.core.jobs import job_manager
 from src.watcher.folder_watcher import FolderWatcher
 from src.api.server import run_server
@@ -79,6 +83,41 @@ def serve(
     console.print(f"Starting API server on {host}:{port}...")
     run_server()
 
+@app.command("worker")
+def worker(
+    concurrency: int = typer.Option(settings.processing.worker_concurrency, help="Number of jobs to run at once"),
+    poll_interval: float = typer.Option(settings.processing.worker_poll_interval, help="Interval to check for queued jobs (seconds)")
+):
+    """
+    Run queued jobs until stopped. Start several workers to process more jobs at once.
+    """
+    settings.processing.worker_poll_interval = poll_interval
+    
+    if not settings.storage.duckdb_shared_access:
+        console.print(
+            "[yellow]Warning:[/yellow] STORAGE__DUCKDB_SHARED_ACCESS is off, so no other process "
+            "can open the database while this worker runs"
+        )
+    
+    console.print(f"Worker {job_manager.worker_id} running up to {concurrency} jobs at once")
+    console.print("Press Ctrl+C to stop")
+    
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    stop = asyncio.Event()
+    # Stop between jobs' steps and release running jobs instead of dying with their leases held
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, stop.set)
+    
+    try:
+        loop.run_until_complete(job_manager.run_worker(concurrency, stop))
+    except Exception as e:
+        console.print(f"[bold red]Error:[/bold red] {e}")
+        sys.exit(1)
+    finally:
+        loop.run_until_complete(job_manager.close())
+        console.print("Worker stopped")
+
 @app.command("watch")
 def watch(
     folders: List[str] = typer.Option(settings.watched_folder.watched_folders, help="Folders to watch"),
@@ -96,6 +135,16 @@ def watch(
     # Create and start watcher
     watcher = FolderWatcher()
     
+    worker_loop = None
+    if settings.processing.run_jobs_in_process:
+        # The watcher only queues jobs; run them here as well, on a loop of their own
+        worker_loop = asyncio.new_event_loop()
+        worker_stop = asyncio.Event()
+        worker_thread = threading.Thread(
+            target=worker_loop.run_until_complete, args=(job_manager.run_worker(stop=worker_stop),)
+        )
+        worker_thread.start()
+    
     console.print(f"Watching folders: {', '.join(folders)}")
     console.print(f"File patterns: {', '.join(patterns)}")
     console.print(f"Check interval: {interval} seconds")
@@ -109,6 +158,14 @@ def watch(
     except Exception as e:
         console.print(f"[bold red]Error:[/bold red] {e}")
         sys.exit(1)
+    finally:
+        if worker_loop is not None:
+            # Release the running jobs instead of leaving their leases to expire
+            console.print("Stopping job worker...")
+            worker_loop.call_soon_threadsafe(worker_stop.set)
+            worker_thread.join()
+            worker_loop.run_until_complete(job_manager.close())
+            worker_loop.close()
 
 @papers_app.command("process")
 def process_papers(
@@ -129,6 +186,9 @@ def process_papers(
         console.print(f"Processing {job.total_papers} papers...")
         
         if wait:
+            # Run the job here instead of leaving it to a worker process
+            job_manager.start_worker()
+            
             with Progress(
                 SpinnerColumn(),
                 TextColumn("[progress.description]{task.description}"),
@@ -146,7 +206,7 @@ def process_papers(
                     progress.update(task, completed=job.processed_papers + job.failed_papers)
                     
                     # Check if job is complete
-                    if job.status in [ProcessingStatus.COMPLETED, ProcessingStatus.FAILED]:
+                    if job.status in [ProcessingStatus.COMPLETED, ProcessingStatus.FAILED, ProcessingStatus.CANCELLED]:
                         break
                     
                     # Wait before checking again
@@ -155,8 +215,14 @@ def process_papers(
                 # Print final status
                 if job.status == ProcessingStatus.COMPLETED:
                     console.print(f"[bold green]Job completed:[/bold green] {job.processed_papers} papers processed")
+                elif job.status == ProcessingStatus.CANCELLED:
+                    console.print(f"[bold yellow]Job cancelled:[/bold yellow] {job.processed_papers} papers processed")
                 else:
                     console.print(f"[bold red]Job failed:[/bold red] {job.failed_papers} papers failed")
+            
+            loop.run_until_complete(job_manager.stop_worker())
+        else:
+            console.print("Queued; it runs in the API server or a `worker` process")
     except Exception as e:
         console.print(f"[bold red]Error:[/bold red] {e}")
         sys.exit(1)
@@ -185,6 +251,9 @@ def process_papers_file(
         console.print(f"Processing {job.total_papers} papers...")
         
         if wait:
+            # Run the job here instead of leaving it to a worker process
+            job_manager.start_worker()
+            
             with Progress(
                 SpinnerColumn(),
                 TextColumn("[progress.description]{task.description}"),
@@ -202,7 +271,7 @@ def process_papers_file(
                     progress.update(task, completed=job.processed_papers + job.failed_papers)
                     
                     # Check if job is complete
-                    if job.status in [ProcessingStatus.COMPLETED, ProcessingStatus.FAILED]:
+                    if job.status in [ProcessingStatus.COMPLETED, ProcessingStatus.FAILED, ProcessingStatus.CANCELLED]:
                         break
                     
                     # Wait before checking again
@@ -211,8 +280,14 @@ def process_papers_file(
                 # Print final status
                 if job.status == ProcessingStatus.COMPLETED:
                     console.print(f"[bold green]Job completed:[/bold green] {job.processed_papers} papers processed")
+                elif job.status == ProcessingStatus.CANCELLED:
+                    console.print(f"[bold yellow]Job cancelled:[/bold yellow] {job.processed_papers} papers processed")
                 else:
                     console.print(f"[bold red]Job failed:[/bold red] {job.failed_papers} papers failed")
+            
+            loop.run_until_complete(job_manager.stop_worker())
+        else:
+            console.print("Queued; it runs in the API server or a `worker` process")
     except Exception as e:
         console.print(f"[bold red]Error:[/bold red] {e}")
         sys.exit(1)
@@ -331,27 +406,35 @@ def show_paper(
 @figures_app.command("list")
 def list_figures(
     paper_id: Optional[str] = typer.Option(None, help="Filter by paper ID"),
-    limit: int = typer.Option(10, help="Maximum number of figures to list")
+    entity_type: Optional[EntityType] = typer.Option(None, help="Only figures mentioning this entity type"),
+    limit: int = typer.Option(10, help="Maximum number of figures to list"),
+    cursor: Optional[str] = typer.Option(None, help="Continue after this figure ID")
 ):
     """
     List figures.
     """
     try:
-        # Get figures from database
-        session = db.get_session()
-        query = session.query(db.FigureModel)
-        
         if paper_id:
             # Normalize paper ID
             if not paper_id.startswith("PMC"):
                 paper_id = f"PMC{paper_id}"
-            
-            query = query.filter(db.FigureModel.paper_id == paper_id)
         
-        figures = query.limit(limit).all()
+        # Get figures and their entity counts from database
+        session = db.get_session()
+        try:
+            figures = queries.list_figures(
+                limit=limit,
+                after_id=cursor,
+                paper_id=paper_id,
+                has_entity_type=entity_type,
+                session=session
+            )
+            entity_counts = queries.count_entities_for_figures([figure.id for figure in figures], session)
+        finally:
+            session.close()
         
         # Create table
-        table = Table(title=f"Figures (showing {len(figures)} of {query.count()})")
+        table = Table(title=f"Figures (showing {len(figures)})")
         table.add_column("ID", style="cyan")
         table.add_column("Paper ID", style="green")
         table.add_column("Figure #", style="magenta")
@@ -360,13 +443,49 @@ def list_figures(
         
         # Add rows
         for figure in figures:
-            entities = session.query(db.EntityModel).filter(db.EntityModel.figure_id == figure.id).count()
             table.add_row(
                 figure.id,
                 figure.paper_id,
                 str(figure.figure_number),
                 figure.caption[:50] + "..." if len(figure.caption) > 50 else figure.caption,
-                str(entities)
+                str(entity_counts[figure.id])
+            )
+        
+        console.print(table)
+        
+        if len(figures) == limit:
+            console.print(f"Next page: --cursor {figures[-1].id}")
+    except Exception as e:
+        console.print(f"[bold red]Error:[/bold red] {e}")
+        sys.exit(1)
+
+@figures_app.command("search")
+def search_figures(
+    query: str = typer.Argument(..., help="Terms that must all appear in the caption"),
+    entity_type: Optional[List[EntityType]] = typer.Option(None, help="Only figures mentioning this entity type (repeatable)"),
+    limit: int = typer.Option(10, help="Maximum number of figures to list")
+):
+    """
+    Search figure captions.
+    """
+    try:
+        results = queries.search_figures(query, entity_types=entity_type, limit=limit)
+        
+        # Create table
+        table = Table(title=f"Figures matching {query!r} (showing {len(results)})")
+        table.add_column("ID", style="cyan")
+        table.add_column("Paper ID", style="green")
+        table.add_column("Score", style="magenta")
+        table.add_column("Caption", style="yellow")
+        
+        # Add rows
+        for result in results:
+            caption = result.figure.caption
+            table.add_row(
+                result.figure.id,
+                result.figure.paper_id,
+                f"{result.score:.2f}",
+                caption[:50] + "..." if len(caption) > 50 else caption
             )
         
         console.print(table)
@@ -467,7 +586,8 @@ def list_jobs(
 
 @jobs_app.command("show")
 def show_job(
-    job_id: str = typer.Argument(..., help="Job ID to show")
+    job_id: str = typer.Argument(..., help="Job ID to show"),
+    papers: int = typer.Option(20, help="Number of the job's papers to list")
 ):
     """
     Show details for a specific job.
@@ -491,10 +611,21 @@ def show_job(
         
         console.print(f"[bold cyan]Progress:[/bold cyan] {job.processed_papers}/{job.total_papers} papers processed ({job.failed_papers} failed)")
         
-        # Print paper IDs
-        console.print(f"[bold cyan]Paper IDs:[/bold cyan]")
-        for i, paper_id in enumerate(job.paper_ids):
-            console.print(f"  {i+1}. {paper_id}")
+        # Print pipeline stage throughput (only known to the process that ran the job)
+        for name, stage in job.stages.items():
+            console.print(
+                f"[bold cyan]Stage {name}:[/bold cyan] {stage.processed} done, {stage.failed} failed, "
+                f"{stage.queued} queued, {stage.items_per_second:.2f} papers/s with {stage.workers} workers"
+            )
+        
+        # Print the first papers; large jobs have too many to list
+        console.print(f"[bold cyan]Papers:[/bold cyan]")
+        for i, job_paper in enumerate(queries.list_job_papers(job_id, limit=papers)):
+            error = f" ({job_paper.error_message})" if job_paper.error_message else ""
+            console.print(f"  {i+1}. {job_paper.paper_id}: {job_paper.status.value}{error}", markup=False)
+        
+        if job.total_papers > papers:
+            console.print(f"  ... and {job.total_papers - papers} more")
     except Exception as e:
         console.print(f"[bold red]Error:[/bold red] {e}")
         sys.exit(1)
@@ -522,21 +653,91 @@ def cancel_job(
         console.print(f"[bold red]Error:[/bold red] {e}")
         sys.exit(1)
 
+@jobs_app.command("resume")
+def resume_job(
+    job_id: str = typer.Argument(..., help="Job ID to resume"),
+    wait: bool = typer.Option(False, help="Wait for processing to complete")
+):
+    """
+    Resume a stopped job, skipping the papers it already completed.
+    """
+    try:
+        # Create event loop
+        loop = asyncio.get_event_loop()
+        
+        # Queue the job again
+        job = loop.run_until_complete(job_manager.resume_job(job_id))
+        
+        if job is None:
+            console.print(f"[bold red]Error:[/bold red] Job not found: {job_id}")
+            sys.exit(1)
+        
+        if job.status == ProcessingStatus.COMPLETED:
+            console.print(f"[bold green]Job already completed:[/bold green] {job.processed_papers} papers processed")
+            return
+        
+        console.print(f"[bold green]Job resumed:[/bold green] {job.id}")
+        console.print(f"{job.processed_papers}/{job.total_papers} papers were already processed")
+        
+        if wait:
+            # Run the job here instead of leaving it to a worker process
+            job_manager.start_worker()
+            
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                BarColumn(),
+                TaskProgressColumn(),
+                console=console
+            ) as progress:
+                task = progress.add_task(f"Processing job {job.id}", total=job.total_papers)
+                
+                while True:
+                    # Get job status
+                    job = job_manager.get_job_status(job.id)
+                    
+                    # Update progress
+                    progress.update(task, completed=job.processed_papers + job.failed_papers)
+                    
+                    # Check if job is complete
+                    if job.status in [ProcessingStatus.COMPLETED, ProcessingStatus.FAILED, ProcessingStatus.CANCELLED]:
+                        break
+                    
+                    # Wait before checking again
+                    loop.run_until_complete(asyncio.sleep(1))
+                
+                # Print final status
+                if job.status == ProcessingStatus.COMPLETED:
+                    console.print(f"[bold green]Job completed:[/bold green] {job.processed_papers} papers processed")
+                elif job.status == ProcessingStatus.CANCELLED:
+                    console.print(f"[bold yellow]Job cancelled:[/bold yellow] {job.processed_papers} papers processed")
+                else:
+                    console.print(f"[bold red]Job failed:[/bold red] {job.failed_papers} papers failed")
+            
+            loop.run_until_complete(job_manager.stop_worker())
+        else:
+            console.print("Queued; it runs in the API server or a `worker` process")
+    except Exception as e:
+        console.print(f"[bold red]Error:[/bold red] {e}")
+        sys.exit(1)
+
 @export_app.command("papers")
 def export_papers(
-    output_path: str = typer.Argument(..., help="Path to output file"),
-    format: str = typer.Option("json", help="Output format (json or csv)")
+    output_path: str = typer.Argument(..., help="Path to output file (a directory for partitioned Parquet)"),
+    format: str = typer.Option("json", help="Output format (json, ndjson, csv, parquet or arrow)"),
+    partition_by: Optional[str] = typer.Option(None, help="Partition Parquet output by paper_prefix"),
+    prefix_length: int = typer.Option(6, help="Paper ID characters used by the paper_prefix partition")
 ):
     """
     Export papers data.
     """
     try:
-        if format not in ["json", "csv"]:
-            console.print(f"[bold red]Error:[/bold red] Invalid format: {format}. Must be 'json' or 'csv'.")
+        if format not in EXPORT_FORMATS:
+            console.print(f"[bold red]Error:[/bold red] Invalid format: {format}. Must be one of: {', '.join(EXPORT_FORMATS)}.")
             sys.exit(1)
         
         # Export data
-        output_file = orchestrator.export_data("papers", format, output_path)
+        output_file = orchestrator.export_data("papers", format, output_path, partition_by, prefix_length)
         
         console.print(f"[bold green]Papers exported to:[/bold green] {output_file}")
     except Exception as e:
@@ -545,19 +746,21 @@ def export_papers(
 
 @export_app.command("figures")
 def export_figures(
-    output_path: str = typer.Argument(..., help="Path to output file"),
-    format: str = typer.Option("json", help="Output format (json or csv)")
+    output_path: str = typer.Argument(..., help="Path to output file (a directory for partitioned Parquet)"),
+    format: str = typer.Option("json", help="Output format (json, ndjson, csv, parquet or arrow)"),
+    partition_by: Optional[str] = typer.Option(None, help="Partition Parquet output by paper_prefix"),
+    prefix_length: int = typer.Option(6, help="Paper ID characters used by the paper_prefix partition")
 ):
     """
     Export figures data.
     """
     try:
-        if format not in ["json", "csv"]:
-            console.print(f"[bold red]Error:[/bold red] Invalid format: {format}. Must be 'json' or 'csv'.")
+        if format not in EXPORT_FORMATS:
+            console.print(f"[bold red]Error:[/bold red] Invalid format: {format}. Must be one of: {', '.join(EXPORT_FORMATS)}.")
             sys.exit(1)
         
         # Export data
-        output_file = orchestrator.export_data("figures", format, output_path)
+        output_file = orchestrator.export_data("figures", format, output_path, partition_by, prefix_length)
         
         console.print(f"[bold green]Figures exported to:[/bold green] {output_file}")
     except Exception as e:
@@ -566,25 +769,44 @@ def export_figures(
 
 @export_app.command("entities")
 def export_entities(
-    output_path: str = typer.Argument(..., help="Path to output file"),
-    format: str = typer.Option("json", help="Output format (json or csv)")
+    output_path: str = typer.Argument(..., help="Path to output file (a directory for partitioned Parquet)"),
+    format: str = typer.Option("json", help="Output format (json, ndjson, csv, parquet or arrow)"),
+    partition_by: Optional[str] = typer.Option(None, help="Partition Parquet output by entity_type or paper_prefix"),
+    prefix_length: int = typer.Option(6, help="Paper ID characters used by the paper_prefix partition")
 ):
     """
     Export entities data.
     """
     try:
-        if format not in ["json", "csv"]:
-            console.print(f"[bold red]Error:[/bold red] Invalid format: {format}. Must be 'json' or 'csv'.")
+        if format not in EXPORT_FORMATS:
+            console.print(f"[bold red]Error:[/bold red] Invalid format: {format}. Must be one of: {', '.join(EXPORT_FORMATS)}.")
             sys.exit(1)
         
         # Export data
-        output_file = orchestrator.export_data("entities", format, output_path)
+        output_file = orchestrator.export_data("entities", format, output_path, partition_by, prefix_length)
         
         console.print(f"[bold green]Entities exported to:[/bold green] {output_file}")
     except Exception as e:
         console.print(f"[bold red]Error:[/bold red] {e}")
         sys.exit(1)
 
+@export_app.command("snapshot")
+def export_snapshot(
+    output_dir: str = typer.Argument(..., help="Directory to write the snapshot to"),
+    partition_by: Optional[str] = typer.Option(None, help="Partition by entity_type (entities only) or paper_prefix"),
+    prefix_length: int = typer.Option(6, help="Paper ID characters used by the paper_prefix partition")
+):
+    """
+    Export papers, figures and entities as a Parquet snapshot.
+    """
+    try:
+        snapshot_dir = orchestrator.export_snapshot(output_dir, partition_by, prefix_length)
+        
+        console.print(f"[bold green]Snapshot exported to:[/bold green] {snapshot_dir}")
+    except Exception as e:
+        console.print(f"[bold red]Error:[/bold red] {e}")
+        sys.exit(1)
+
 @admin_app.command("backup")
 def backup_database():
     """
@@ -599,6 +821,74 @@ def backup_database():
         console.print(f"[bold red]Error:[/bold red] {e}")
         sys.exit(1)
 
+@admin_app.command("import-snapshot")
+def import_snapshot(
+    snapshot_dir: str = typer.Argument(..., help="Directory written by 'export snapshot'")
+):
+    """
+    Load a Parquet snapshot into a fresh database.
+    """
+    try:
+        counts = orchestrator.import_snapshot(snapshot_dir)
+        
+        console.print(
+            f"[bold green]Snapshot imported:[/bold green] {counts['papers']} papers, "
+            f"{counts['figures']} figures, {counts['entities']} entities"
+        )
+    except Exception as e:
+        console.print(f"[bold red]Error:[/bold red] {e}")
+        sys.exit(1)
+
+@admin_app.command("sync-analytics")
+def sync_analytics(
+    full: bool = typer.Option(False, help="Rebuild the analytics star schema from scratch")
+):
+    """
+    Sync changed papers into the analytics database.
+    """
+    try:
+        counts = analytics_sync.run(full=full)
+        
+        console.print(
+            f"[bold green]Analytics synced:[/bold green] {counts['papers_synced']} papers updated in "
+            f"{settings.storage.analytics_path}"
+        )
+        console.print(
+            f"  {counts['papers']} papers, {counts['figures']} figures, {counts['entities']} entities, "
+            f"{counts['entity_cooccurrences']} co-occurrences"
+        )
+    except Exception as e:
+        console.print(f"[bold red]Error:[/bold red] {e}")
+        sys.exit(1)
+
+@admin_app.command("rebuild-cooccurrences")
+def rebuild_cooccurrences():
+    """
+    Rebuild the entity co-occurrence index from the stored entities.
+    """
+    try:
+        pair_count = queries.rebuild_cooccurrences()
+        
+        console.print(f"[bold green]Co-occurrence index rebuilt:[/bold green] {pair_count} entity pairs")
+    except Exception as e:
+        console.print(f"[bold red]Error:[/bold red] {e}")
+        sys.exit(1)
+
+@admin_app.command("reindex-captions")
+def reindex_captions():
+    """
+    Rebuild the caption search index from the stored figures.
+    """
+    try:
+        counts = caption_index.rebuild_caption_index()
+        
+        console.print(
+            f"[bold green]Caption index rebuilt:[/bold green] {counts['captions']} captions, {counts['terms']} terms"
+        )
+    except Exception as e:
+        console.print(f"[bold red]Error:[/bold red] {e}")
+        sys.exit(1)
+
 @admin_app.command("config")
 def show_config():
     """
@@ -629,12 +919,14 @@ def show_config():
         console.print(f"\n[bold green]Storage:[/bold green]")
         console.print(f"  Storage Type: {settings.storage.storage_type}")
         console.print(f"  DuckDB Path: {settings.storage.duckdb_path}")
+        console.print(f"  Analytics Path: {settings.storage.analytics_path}")
         console.print(f"  Backup Enabled: {settings.storage.backup_enabled}")
         console.print(f"  Backup Interval: {settings.storage.backup_interval} hours")
         
         console.print(f"\n[bold green]Processing:[/bold green]")
         console.print(f"  Extraction Workers: {settings.processing.extraction_workers}")
         console.print(f"  Entity Detection Workers: {settings.processing.entity_detection_workers}")
+        console.print(f"  Pipeline Queue Size: {settings.processing.pipeline_queue_size}")
         console.print(f"  Batch Size: {settings.processing.batch_size}")
         console.print(f"  Retry Limit: {settings.processing.retry_limit}")
         console.print(f"  Retry Delay: {settings.processing.retry_delay} seconds")
@@ -8,6 +8,7 @@ class APISettings(BaseSettings):
     port: int = 8000
     workers: int = 4
     enable_docs: bool = True
+    job_paper_ids_limit: int = 1000  # paper IDs listed in a job response; /jobs/{id}/papers pages through all of them
 
 class SecuritySettings(BaseSettings):
     auth_enabled: bool = True
@@ -18,12 +19,31 @@ class SecuritySettings(BaseSettings):
 class StorageSettings(BaseSettings):
     storage_type: str = "duckdb"
     duckdb_path: str = "data/papers.duckdb"
+    # Open the DuckDB file per session so several processes (API, workers) can take turns
+    duckdb_shared_access: bool = False
+    duckdb_lock_timeout: float = 30.0  # seconds to wait for another process to release the file
+    queue_path: str = "data/job_queue.sqlite3"
+    analytics_path: str = "data/analytics.duckdb"
+    analytics_sync_after_jobs: bool = True
+    # Papers updated this many seconds before the watermark are synced again, so a
+    # write stamped before a sync but committed after it is not missed
+    analytics_sync_overlap: int = 300  # seconds
+    stats_cache_ttl: int = 10  # seconds
+    read_cache_size: int = 10000  # papers, figure lists and entity lists cached by the API; 0 disables it
+    read_cache_ttl: int = 60  # seconds
     backup_enabled: bool = True
     backup_interval: int = 24  # hours
 
 class ProcessingSettings(BaseSettings):
     extraction_workers: int = 2
     entity_detection_workers: int = 2
+    pipeline_queue_size: int = 20  # papers waiting for entity detection
+    ingest_chunk_size: int = 10000  # paper IDs read from a file, stored and queued at a time
+    run_jobs_in_process: bool = True  # the API and CLI run queued jobs themselves, not only `worker` processes
+    worker_concurrency: int = 1  # jobs run at once by one worker
+    worker_poll_interval: float = 2.0  # seconds
+    job_lease_seconds: int = 60
+    job_max_attempts: int = 3  # claims of a job before it is failed
     batch_size: int = 10
     retry_limit: int = 3
     retry_delay: int = 5  # seconds
@@ -32,12 +52,32 @@ class WatchedFolderSettings(BaseSettings):
     watched_folders: List[str] = ["data/input"]
     watch_interval: int = 30  # seconds
     file_patterns: List[str] = ["*.txt", "*.csv"]
+    use_native_events: bool = True  # inotify and the like, when watchdog is installed
+    stable_seconds: float = 2.0  # size and mtime unchanged this long mark a file as written
+    workers: int = 4  # files processed at once
+    max_in_flight: int = 16  # files submitted and not yet processed
+    ledger_path: str = "data/processed_files.sqlite3"  # hashes of processed file contents
+    ledger_retention_days: int = 30  # after this, the same contents are processed again
 
 class ExternalAPISettings(BaseSettings):
     bioc_pmc_url: str = "https://www.ncbi.nlm.nih.gov/research/bionlp/RESTful/pmcoa.cgi"
     bioc_pmc_rate_limit: int = 10  # requests per minute
+    bioc_pmc_burst: int = 1  # requests allowed back to back
     pubtator3_url: str = "https://www.ncbi.nlm.nih.gov/research/pubtator3/api/v1"
     pubtator3_rate_limit: int = 10  # requests per minute
+    pubtator3_burst: int = 1  # requests allowed back to back
+    pubtator3_batch_size: int = 50  # captions per request
+    pubtator3_batch_chars: int = 50000  # characters per request
+    http2: bool = True
+    request_timeout: float = 30.0  # seconds
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0  # seconds
+
+class CacheSettings(BaseSettings):
+    enabled: bool = True
+    ttl: int = 604800  # seconds
+    max_size_mb: int = 1024
 
 class Settings(BaseSettings):
     app_name: str = "Scientific Paper Extractor"
@@ -51,6 +91,7 @@ class Settings(BaseSettings):
     processing: ProcessingSettings = ProcessingSettings()
     watched_folder: WatchedFolderSettings = WatchedFolderSettings()
     external_api: ExternalAPISettings = ExternalAPISettings()
+    cache: CacheSettings = CacheSettings()
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,39 @@
+import logging
+import httpx
+
+from src.config.settings import settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+def _http2_available() -> bool:
+    """Check whether the optional h2 package needed for HTTP/2 is installed."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Create a connection-pooled, keep-alive HTTP client for the external APIs.
+    
+    The client is meant to be long-lived and shared; whoever creates it is
+    responsible for closing it with aclose().
+    """
+    api_settings = settings.external_api
+    
+    http2 = api_settings.http2
+    if http2 and not _http2_available():
+        logger.warning("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1")
+        http2 = False
+    
+    return httpx.AsyncClient(
+        http2=http2,
+        timeout=api_settings.request_timeout,
+        limits=httpx.Limits(
+            max_connections=api_settings.max_connections,
+            max_keepalive_connections=api_settings.max_keepalive_connections,
+            keepalive_expiry=api_settings.keepalive_expiry
+        )
+    )
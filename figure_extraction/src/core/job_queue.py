@@ -0,0 +1,285 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from src.config.settings import settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Queue entry states
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+
+# Results of JobQueue.heartbeat
+HEARTBEAT_OK = "ok"
+HEARTBEAT_CANCEL = "cancel"
+HEARTBEAT_LOST = "lost"
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS job_queue (
+    job_id TEXT PRIMARY KEY,
+    job_type TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT,
+    lease_expires_at REAL,
+    heartbeat_at REAL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    stages TEXT,
+    enqueued_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_job_queue_state ON job_queue (state, enqueued_at);
+"""
+
+# Oldest job that is waiting, or whose worker stopped renewing its lease
+CLAIMABLE_SQL = """
+SELECT job_id, attempts FROM job_queue
+WHERE state = 'queued' OR (state = 'leased' AND lease_expires_at < ?)
+ORDER BY enqueued_at
+LIMIT 1
+"""
+
+class JobQueue:
+    """
+    Durable queue of jobs waiting for a worker, stored in a SQLite file next to
+    the DuckDB database.
+    
+    DuckDB lets only one process open its file, while any number of processes can
+    share a SQLite file, so the API and every `worker` process claim jobs here.
+    A claimed job is leased to one worker until lease_expires_at; the worker
+    renews the lease with heartbeats while it runs the job. A job whose worker
+    died stops being renewed and is claimed again by another worker once the
+    lease expires.
+    
+    The job itself (papers, status, progress) stays in the DuckDB jobs table.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.storage.queue_path
+        self._local = threading.local()
+        self._initialized = False
+        self._init_lock = threading.Lock()
+    
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must stay in the thread that created them
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            # WAL lets readers in other processes proceed while a worker writes
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    connection.executescript(SCHEMA_SQL)
+                    self._initialized = True
+        
+        return connection
+    
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connection()
+        # IMMEDIATE takes the write lock up front, so two workers cannot both read
+        # the same claimable job before either marks it leased
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+    
+    def enqueue(self, job_id: str, job_type: str):
+        """
+        Add a job to the queue. Enqueuing a job that is already queued or leased
+        does nothing; a finished job is queued again with its attempts reset.
+        
+        Args:
+            job_id: ID of the job in the jobs table
+            job_type: The job's JobType value
+        """
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT INTO job_queue (job_id, job_type, state, enqueued_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (job_id) DO UPDATE SET state = excluded.state, attempts = 0, worker_id = NULL, "
+                "cancel_requested = 0, finished_at = NULL, enqueued_at = excluded.enqueued_at WHERE job_queue.state = 'done'",
+                (job_id, job_type, QUEUED, time.time())
+            )
+    
+    def claim(self, worker_id: str, lease_seconds: Optional[float] = None) -> Optional[Tuple[str, int]]:
+        """
+        Lease the oldest claimable job to a worker.
+        
+        Args:
+            worker_id: Unique ID of the claiming worker
+            lease_seconds: Lease length, defaults to settings.processing.job_lease_seconds
+        
+        Returns:
+            The ID of the claimed job and how many times it has been claimed,
+            or None if no job is waiting
+        """
+        lease_seconds = lease_seconds or settings.processing.job_lease_seconds
+        now = time.time()
+        
+        with self._transaction() as connection:
+            row = connection.execute(CLAIMABLE_SQL, (now,)).fetchone()
+            if row is None:
+                return None
+            
+            connection.execute(
+                "UPDATE job_queue SET state = ?, worker_id = ?, attempts = attempts + 1, "
+                "lease_expires_at = ?, heartbeat_at = ? WHERE job_id = ?",
+                (LEASED, worker_id, now + lease_seconds, now, row["job_id"])
+            )
+            return row["job_id"], row["attempts"] + 1
+    
+    def heartbeat(
+        self,
+        job_id: str,
+        worker_id: str,
+        stages: Optional[Dict[str, Any]] = None,
+        lease_seconds: Optional[float] = None
+    ) -> str:
+        """
+        Renew a worker's lease on a job.
+        
+        Args:
+            job_id: The leased job
+            worker_id: The worker holding the lease
+            stages: Pipeline stage counters to publish to other processes
+            lease_seconds: Lease length, defaults to settings.processing.job_lease_seconds
+        
+        Returns:
+            HEARTBEAT_OK, HEARTBEAT_CANCEL if cancellation was requested, or
+            HEARTBEAT_LOST if the lease expired and another worker took the job
+        """
+        lease_seconds = lease_seconds or settings.processing.job_lease_seconds
+        now = time.time()
+        
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT cancel_requested FROM job_queue WHERE job_id = ? AND state = ? AND worker_id = ?",
+                (job_id, LEASED, worker_id)
+            ).fetchone()
+            if row is None:
+                return HEARTBEAT_LOST
+            
+            connection.execute(
+                "UPDATE job_queue SET lease_expires_at = ?, heartbeat_at = ?, stages = coalesce(?, stages) WHERE job_id = ?",
+                (now + lease_seconds, now, json.dumps(stages) if stages is not None else None, job_id)
+            )
+            return HEARTBEAT_CANCEL if row["cancel_requested"] else HEARTBEAT_OK
+    
+    def finish(self, job_id: str, worker_id: str, stages: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Mark a leased job as done.
+        
+        Args:
+            job_id: The leased job
+            worker_id: The worker holding the lease
+            stages: Final pipeline stage counters
+        
+        Returns:
+            False if the worker no longer held the lease
+        """
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE job_queue SET state = ?, finished_at = ?, lease_expires_at = NULL, stages = coalesce(?, stages) "
+                "WHERE job_id = ? AND state = ? AND worker_id = ?",
+                (DONE, time.time(), json.dumps(stages) if stages is not None else None, job_id, LEASED, worker_id)
+            )
+            return cursor.rowcount == 1
+    
+    def release(self, job_id: str, worker_id: str):
+        """
+        Give a leased job back to the queue without counting the attempt, e.g.
+        when its worker shuts down, so another worker can claim it right away.
+        
+        Args:
+            job_id: The leased job
+            worker_id: The worker holding the lease
+        """
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE job_queue SET state = ?, worker_id = NULL, lease_expires_at = NULL, attempts = attempts - 1 "
+                "WHERE job_id = ? AND state = ? AND worker_id = ?",
+                (QUEUED, job_id, LEASED, worker_id)
+            )
+    
+    def request_cancel(self, job_id: str) -> Optional[str]:
+        """
+        Ask for a job to be cancelled.
+        
+        A job still waiting in the queue is removed from it directly; a leased job
+        is flagged, and its worker stops it at its next heartbeat.
+        
+        Args:
+            job_id: The job to cancel
+        
+        Returns:
+            The state the job was in, or None if it is not in the queue
+        """
+        with self._transaction() as connection:
+            row = connection.execute("SELECT state FROM job_queue WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            
+            if row["state"] == QUEUED:
+                connection.execute(
+                    "UPDATE job_queue SET state = ?, cancel_requested = 1, finished_at = ? WHERE job_id = ?",
+                    (DONE, time.time(), job_id)
+                )
+            elif row["state"] == LEASED:
+                connection.execute("UPDATE job_queue SET cancel_requested = 1 WHERE job_id = ?", (job_id,))
+            return row["state"]
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the queue entry of a job.
+        
+        Args:
+            job_id: The job
+        
+        Returns:
+            The entry as a dictionary, with stages decoded, or None
+        """
+        row = self._connection().execute("SELECT * FROM job_queue WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        
+        entry = dict(row)
+        entry["stages"] = json.loads(entry["stages"]) if entry["stages"] else {}
+        entry["cancel_requested"] = bool(entry["cancel_requested"])
+        return entry
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Count queue entries by state, plus leases that have expired."""
+        connection = self._connection()
+        counts = {QUEUED: 0, LEASED: 0, DONE: 0}
+        counts.update({
+            row["state"]: row["entries"]
+            for row in connection.execute("SELECT state, count(*) AS entries FROM job_queue GROUP BY state")
+        })
+        counts["expired_leases"] = connection.execute(
+            "SELECT count(*) FROM job_queue WHERE state = ? AND lease_expires_at < ?", (LEASED, time.time())
+        ).fetchone()[0]
+        return counts
+
+# Create singleton instance
+job_queue = JobQueue()
+
+def get_job_queue() -> JobQueue:
+    """Get job queue instance."""
+    return job_queue
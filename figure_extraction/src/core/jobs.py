@@ -1,29 +1,83 @@
+import os
 import logging
+import socket
+import time
 import uuid
 import asyncio
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple, Union
 
 from src.config.settings import settings
-from src.storage.models import Job, JobType, ProcessingStatus, Paper
+from src.storage.models import Job, JobType, ProcessingStatus, Paper, StageStats
 from src.storage import queries
+from src.core.http_client import create_http_client
 from src.extraction.extractor import PaperExtractor
-from src.entity.detector import EntityDetector
+from src.entity.detector import EntityDetector, EntityBatcher
+from src.storage.analytics import analytics_sync
+from src.core.job_queue import job_queue, DONE, HEARTBEAT_OK, HEARTBEAT_LOST
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+class PipelineStage:
+    """Throughput counters for one stage of the extraction pipeline."""
+    
+    def __init__(self, workers: int, queue: asyncio.Queue):
+        self.workers = workers
+        self.queue = queue
+        self.processed = 0
+        self.failed = 0
+        self.skipped = 0
+        # processed + failed when the job's progress was last stored
+        self.reported = 0
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+    
+    def finish(self):
+        if self.finished_at is None:
+            self.finished_at = time.monotonic()
+    
+    def snapshot(self) -> StageStats:
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return StageStats(
+            workers=self.workers,
+            processed=self.processed,
+            failed=self.failed,
+            skipped=self.skipped,
+            queued=self.queue.qsize(),
+            elapsed_seconds=round(elapsed, 3),
+            items_per_second=round(self.processed / elapsed, 3) if elapsed > 0 else 0.0
+        )
+
 class JobManager:
     """Manage extraction and processing jobs."""
     
     def __init__(self):
-        self.extractor = PaperExtractor()
-        self.entity_detector = EntityDetector()
+        # One pooled HTTP client shared by the BioC and PubTator clients
+        self.http_client = create_http_client()
+        self.extractor = PaperExtractor(self.http_client)
+        self.entity_detector = EntityDetector(self.http_client)
         self.running_jobs = {}
+        # Task running each job claimed by this process, so cancel_job can stop it
+        self.job_tasks: Dict[str, asyncio.Task] = {}
+        # Pipeline stage counters by job ID, kept after the job finishes
+        self.job_stages: Dict[str, Dict[str, PipelineStage]] = {}
+        # Identifies this process's leases in the job queue
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # Background queue worker of the API or CLI process, see start_worker
+        self._worker_task: Optional[asyncio.Task] = None
+        self._worker_stop: Optional[asyncio.Event] = None
+    
+    async def close(self):
+        """Release resources held by the job manager."""
+        await self.http_client.aclose()
     
     async def create_extraction_job(self, paper_ids: List[str]) -> Job:
         """
-        Create a new extraction job.
+        Create a new extraction job and queue it for the next free worker.
+        
+        As for files, a paper listed twice is processed once and papers already
+        COMPLETED are skipped.
         
         Args:
             paper_ids: List of paper IDs to process
@@ -31,102 +85,442 @@ class JobManager:
         Returns:
             The created Job object
         """
-        # Create a unique job ID
-        job_id = str(uuid.uuid4())
+        return await self.create_extraction_job_from_chunks([paper_ids])
+    
+    async def create_extraction_job_from_chunks(self, paper_id_chunks: Iterable[List[str]]) -> Job:
+        """
+        Create an extraction job from paper IDs that arrive in chunks, e.g. read
+        from a large file, and queue it once every chunk is stored.
+        
+        Each chunk goes straight to job_papers, so the IDs are never all held in
+        memory. IDs already in the job and papers already COMPLETED are skipped.
+        The chunks are consumed in a worker thread, so reading them (e.g. from a
+        file) and storing them does not block the event loop.
         
-        # Create the job
-        job = Job(
-            id=job_id,
+        Args:
+            paper_id_chunks: Lists of paper IDs to process
+            
+        Returns:
+            The created Job object
+        """
+        return await asyncio.to_thread(self._store_extraction_job_chunks, paper_id_chunks)
+    
+    def _store_extraction_job_chunks(self, paper_id_chunks: Iterable[List[str]]) -> Job:
+        """Store and queue an extraction job for create_extraction_job_from_chunks."""
+        job = queries.create_job(Job(
+            id=str(uuid.uuid4()),
             job_type=JobType.EXTRACTION,
             status=ProcessingStatus.PENDING,
-            paper_ids=paper_ids,
-            total_papers=len(paper_ids),
+            total_papers=0,
             processed_papers=0,
             failed_papers=0
-        )
+        ))
+        
+        for paper_ids in paper_id_chunks:
+            queries.add_job_papers(job.id, paper_ids)
+        
+        total_papers = sum(queries.count_job_papers(job.id).values())
+        if total_papers == 0:
+            # Every paper was extracted before
+            return queries.update_job_status(job.id, ProcessingStatus.COMPLETED, completed_at=datetime.now())
+        
+        job = queries.update_job_status(job.id, ProcessingStatus.PENDING, total_papers=total_papers)
+        # Queue the job; it survives restarts and runs in whichever worker claims it
+        job_queue.enqueue(job.id, job.job_type.value)
+        
+        return job
+    
+    def start_worker(self, concurrency: Optional[int] = None) -> asyncio.Task:
+        """
+        Work the job queue in the background of the current event loop, unless
+        this process already does.
+        
+        Args:
+            concurrency: Jobs to run at once, defaults to the processing settings
+            
+        Returns:
+            The worker task
+        """
+        if self._worker_task is None or self._worker_task.done():
+            self._worker_stop = asyncio.Event()
+            # ensure_future also works before the loop runs, as in the CLI
+            self._worker_task = asyncio.ensure_future(self.run_worker(concurrency, self._worker_stop))
+        return self._worker_task
+    
+    async def stop_worker(self):
+        """Stop the background worker, handing its unfinished jobs back to the queue."""
+        if self._worker_task is None:
+            return
         
-        # Store the job
-        stored_job = queries.create_job(job)
+        self._worker_stop.set()
+        await self._worker_task
+        self._worker_task = None
+    
+    async def run_worker(self, concurrency: Optional[int] = None, stop: Optional[asyncio.Event] = None):
+        """
+        Claim and run queued jobs until stop is set.
+        
+        Any number of processes can run a worker against the same queue. When the
+        worker stops, the jobs it is still running are cancelled and released, so
+        another worker takes them over without waiting for their leases to expire.
+        
+        Args:
+            concurrency: Jobs to run at once, defaults to the processing settings
+            stop: Event that ends the worker; runs until cancelled if not given
+        """
+        concurrency = max(1, concurrency or settings.processing.worker_concurrency)
+        stop = stop or asyncio.Event()
+        active: Set[asyncio.Task] = set()
+        
+        logger.info(f"Worker {self.worker_id} started, running up to {concurrency} jobs at once")
+        try:
+            while not stop.is_set():
+                claimed = None
+                if len(active) < concurrency:
+                    claimed = await asyncio.to_thread(job_queue.claim, self.worker_id)
+                
+                if claimed is not None:
+                    task = asyncio.create_task(self._run_claimed_job(*claimed))
+                    active.add(task)
+                    task.add_done_callback(active.discard)
+                    continue
+                
+                try:
+                    await asyncio.wait_for(stop.wait(), settings.processing.worker_poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in list(active):
+                task.cancel()
+            await asyncio.gather(*active, return_exceptions=True)
+            logger.info(f"Worker {self.worker_id} stopped")
+    
+    async def _run_claimed_job(self, job_id: str, attempt: int):
+        """Run a job leased from the queue, renewing the lease until it finishes."""
+        async with queries.db.hold_open():
+            job = queries.get_job(job_id)
+        
+        if job is None or job.status in [ProcessingStatus.COMPLETED, ProcessingStatus.FAILED, ProcessingStatus.CANCELLED]:
+            # Deleted or already finished, e.g. cancelled between claim and start
+            await asyncio.to_thread(job_queue.finish, job_id, self.worker_id)
+            return
+        
+        if attempt > settings.processing.job_max_attempts:
+            logger.error(f"Job {job_id} failed: its worker stopped {attempt - 1} times")
+            async with queries.db.hold_open():
+                queries.update_job_status(
+                    job_id,
+                    ProcessingStatus.FAILED,
+                    failed_papers=job.total_papers - job.processed_papers,
+                    completed_at=datetime.now()
+                )
+            await asyncio.to_thread(job_queue.finish, job_id, self.worker_id)
+            return
+        
+        if attempt > 1:
+            logger.info(f"Job {job_id} taken over by worker {self.worker_id} (attempt {attempt})")
+        
+        run = asyncio.create_task(self._run_extraction_job(job))
+        self.job_tasks[job_id] = run
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, run))
+        try:
+            await run
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                # The worker is stopping: give the job back to the queue
+                heartbeat.cancel()
+                await asyncio.shield(asyncio.to_thread(job_queue.release, job_id, self.worker_id))
+                raise
+            # Otherwise the job itself was cancelled and is finished below
+        finally:
+            heartbeat.cancel()
+            self.job_tasks.pop(job_id, None)
         
-        # Start the job asynchronously
-        asyncio.create_task(self._run_extraction_job(stored_job))
+        if heartbeat.done() and not heartbeat.cancelled() and heartbeat.result() == HEARTBEAT_LOST:
+            # Another worker owns the job now
+            return
         
-        return stored_job
+        await asyncio.to_thread(job_queue.finish, job_id, self.worker_id, self._stage_snapshots(job_id))
+    
+    async def _heartbeat(self, job_id: str, run: asyncio.Task) -> str:
+        """Renew the lease on a running job, stopping the job if it was cancelled or taken over."""
+        interval = settings.processing.job_lease_seconds / 3
+        while True:
+            await asyncio.sleep(interval)
+            outcome = await asyncio.to_thread(job_queue.heartbeat, job_id, self.worker_id, self._stage_snapshots(job_id))
+            if outcome != HEARTBEAT_OK:
+                if outcome == HEARTBEAT_LOST:
+                    logger.warning(f"Lost the lease on job {job_id}; stopping it here")
+                else:
+                    logger.info(f"Job {job_id} was cancelled; stopping it")
+                run.cancel()
+                return outcome
+    
+    def _stage_snapshots(self, job_id: str) -> Dict[str, Dict[str, Any]]:
+        stages = self.job_stages.get(job_id, {})
+        return {name: stage.snapshot().dict() for name, stage in stages.items()}
     
     async def _run_extraction_job(self, job: Job):
         """
-        Run an extraction job.
+        Run an extraction job as a two-stage pipeline.
+        
+        Extraction workers fetch and store papers and hand each stored paper to
+        the entity detection workers through a bounded queue, so both external
+        APIs are in use at the same time and extraction pauses whenever entity
+        detection falls behind.
+        
+        Each paper is checkpointed in job_papers once its entities are stored.
+        Papers COMPLETED by an earlier run of the job are skipped, so a job taken
+        over after a crash, or resumed, only processes the remaining papers.
         
         Args:
             job: The Job object to run
         """
         logger.info(f"Starting extraction job {job.id} with {job.total_papers} papers")
         
-        # Mark job as processing
-        job = queries.update_job_status(job.id, ProcessingStatus.PROCESSING)
+        # The database file is only held around each piece of database work, so
+        # processes sharing it get their turn while papers are fetched
+        async with queries.db.hold_open():
+            # Mark job as processing
+            job = queries.update_job_status(job.id, ProcessingStatus.PROCESSING)
+            skipped = queries.count_job_papers(job.id)[ProcessingStatus.COMPLETED]
         self.running_jobs[job.id] = job
         
-        processed_papers = 0
-        failed_papers = 0
+        # Filled page by page from job_papers, so large jobs are never all in memory
+        paper_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.processing.ingest_chunk_size)
+        detection_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.processing.pipeline_queue_size)
+        
+        stages = {
+            "extraction": PipelineStage(max(1, settings.processing.extraction_workers), paper_queue),
+            "entity_detection": PipelineStage(max(1, settings.processing.entity_detection_workers), detection_queue)
+        }
+        stages["extraction"].skipped = skipped
+        self.job_stages[job.id] = stages
+        if stages["extraction"].skipped:
+            logger.info(f"Job {job.id}: skipping {stages['extraction'].skipped} papers finished by an earlier run")
         
+        workers: List[asyncio.Task] = []
         try:
-            # Process papers in batches
-            batch_size = settings.processing.batch_size
-            for i in range(0, len(job.paper_ids), batch_size):
-                batch = job.paper_ids[i:i+batch_size]
-                
-                # Process batch concurrently
-                tasks = [self.extractor.extract_and_store_paper(paper_id) for paper_id in batch]
-                results = await asyncio.gather(*tasks, return_exceptions=True)
+            feeder = asyncio.create_task(self._feed_papers(job.id, paper_queue, stages["extraction"].workers))
+            extraction_workers = [
+                asyncio.create_task(self._extraction_worker(job.id, paper_queue, detection_queue, stages))
+                for _ in range(stages["extraction"].workers)
+            ]
+            entity_workers = [
+                asyncio.create_task(self._entity_worker(job.id, detection_queue, stages["entity_detection"]))
+                for _ in range(stages["entity_detection"].workers)
+            ]
+            workers = [feeder] + extraction_workers + entity_workers
+            
+            await asyncio.gather(feeder, *extraction_workers)
+            stages["extraction"].finish()
+            
+            # One sentinel per entity worker; each flushes its partial batch before exiting
+            for _ in entity_workers:
+                await detection_queue.put(None)
+            await asyncio.gather(*entity_workers)
+            stages["entity_detection"].finish()
+            
+            async with queries.db.hold_open():
+                paper_counts = queries.count_job_papers(job.id)
+                processed_papers = paper_counts[ProcessingStatus.COMPLETED]
+                failed_papers = job.total_papers - processed_papers
                 
-                # Count successes and failures
-                for result in results:
-                    if isinstance(result, Exception):
-                        failed_papers += 1
-                        logger.error(f"Paper extraction failed: {result}")
-                    else:
-                        processed_papers += 1
-                        # Process entities for the paper's figures
-                        try:
-                            await self.entity_detector.process_paper_figures(result.id)
-                        except Exception as e:
-                            logger.error(f"Entity detection failed for paper {result.id}: {e}")
+                if queries.get_job(job.id).status == ProcessingStatus.CANCELLED:
+                    # Cancelled from another process just as the job finished
+                    logger.info(f"Extraction job {job.id} was cancelled")
+                    return
                 
-                # Update job status
+                # Mark job as completed
+                final_status = ProcessingStatus.COMPLETED if failed_papers == 0 else ProcessingStatus.FAILED
                 job = queries.update_job_status(
                     job.id, 
-                    ProcessingStatus.PROCESSING,
+                    final_status,
                     processed_papers=processed_papers,
-                    failed_papers=failed_papers
+                    failed_papers=failed_papers,
+                    completed_at=datetime.now()
                 )
             
-            # Mark job as completed
-            final_status = ProcessingStatus.COMPLETED if failed_papers == 0 else ProcessingStatus.FAILED
-            job = queries.update_job_status(
-                job.id, 
-                final_status,
-                processed_papers=processed_papers,
-                failed_papers=failed_papers,
-                completed_at=datetime.now()
-            )
-            
             logger.info(f"Extraction job {job.id} completed: {processed_papers} processed, {failed_papers} failed")
             
+            if settings.storage.analytics_sync_after_jobs:
+                try:
+                    await self.sync_analytics()
+                except Exception as e:
+                    logger.error(f"Analytics sync after job {job.id} failed: {e}")
+            
         except Exception as e:
             logger.error(f"Error running extraction job {job.id}: {e}")
+            processed_papers = stages["extraction"].skipped + stages["extraction"].processed
             # Mark job as failed
-            job = queries.update_job_status(
-                job.id, 
-                ProcessingStatus.FAILED,
-                processed_papers=processed_papers,
-                failed_papers=failed_papers + (job.total_papers - processed_papers - failed_papers),
-                completed_at=datetime.now()
-            )
+            async with queries.db.hold_open():
+                job = queries.update_job_status(
+                    job.id, 
+                    ProcessingStatus.FAILED,
+                    processed_papers=processed_papers,
+                    failed_papers=job.total_papers - processed_papers,
+                    completed_at=datetime.now()
+                )
         finally:
+            for worker in workers:
+                if not worker.done():
+                    worker.cancel()
+            # Wait until cancelled workers have abandoned their HTTP requests
+            await asyncio.gather(*workers, return_exceptions=True)
+            for stage in stages.values():
+                stage.finish()
+            
             # Remove job from running jobs
             if job.id in self.running_jobs:
                 del self.running_jobs[job.id]
     
+    async def _feed_papers(self, job_id: str, paper_queue: asyncio.Queue, sentinels: int):
+        """Page the unfinished papers of a job into the paper queue, then add one None sentinel per extraction worker."""
+        page_size = settings.processing.ingest_chunk_size
+        after = None
+        while True:
+            async with queries.db.hold_open():
+                paper_ids = queries.get_unfinished_job_papers(job_id, after=after, limit=page_size)
+            for paper_id in paper_ids:
+                # Waits here while the paper queue is full
+                await paper_queue.put(paper_id)
+            
+            if len(paper_ids) < page_size:
+                break
+            after = paper_ids[-1]
+        
+        for _ in range(sentinels):
+            await paper_queue.put(None)
+    
+    async def _extraction_worker(
+        self,
+        job_id: str,
+        paper_queue: asyncio.Queue,
+        detection_queue: asyncio.Queue,
+        stages: Dict[str, "PipelineStage"]
+    ):
+        """Extract papers until a None sentinel arrives, handing each stored paper to entity detection."""
+        stage = stages["extraction"]
+        while True:
+            paper_id = await paper_queue.get()
+            if paper_id is None:
+                return
+            
+            try:
+                paper = await self.extractor.extract_and_store_paper(paper_id)
+            except Exception as e:
+                stage.failed += 1
+                logger.error(f"Paper extraction failed: {e}")
+                async with queries.db.hold_open():
+                    queries.update_job_papers(job_id, [paper_id], ProcessingStatus.FAILED, str(e))
+            else:
+                if paper.status == ProcessingStatus.FAILED:
+                    # The paper could not be fetched; it was stored with the error
+                    stage.failed += 1
+                    async with queries.db.hold_open():
+                        queries.update_job_papers(job_id, [paper_id], ProcessingStatus.FAILED, paper.error_message)
+                else:
+                    stage.processed += 1
+                    # Waits here while the entity detection queue is full
+                    await detection_queue.put(paper.id)
+            
+            # The counters are shared with the other workers, which may have moved
+            # them past a multiple of batch_size while this one was waiting
+            completed = stage.processed + stage.failed
+            if completed - stage.reported >= settings.processing.batch_size:
+                stage.reported = completed
+                async with queries.db.hold_open():
+                    self._update_progress(job_id, stages)
+    
+    async def _entity_worker(self, job_id: str, detection_queue: asyncio.Queue, stage: "PipelineStage"):
+        """
+        Detect entities for stored papers until a None sentinel arrives, marking
+        each paper COMPLETED once the batches holding its figures are stored.
+        """
+        # Captions from several papers share one PubTator request
+        batcher = EntityBatcher(self.entity_detector)
+        while True:
+            paper_id = await detection_queue.get()
+            if paper_id is None:
+                break
+            
+            async with queries.db.hold_open():
+                try:
+                    # Read once, right after extraction; caching it would only evict hot entries
+                    figures = queries.get_figures_for_paper(paper_id, use_cache=False)
+                except Exception as e:
+                    logger.error(f"Error reading the figures of paper {paper_id}: {e}")
+                    stage.failed += 1
+                    self._fail_papers(job_id, {paper_id: str(e)})
+                    continue
+            
+            try:
+                await batcher.add(figures, owner=paper_id)
+            except Exception as e:
+                # The papers in the failed batches are redone when the job is resumed
+                logger.error(f"Entity detection failed for a batch: {e}")
+            async with queries.db.hold_open():
+                self._finish_papers(job_id, batcher, stage)
+        
+        # Detect entities for the figures still waiting in a partial batch
+        try:
+            await batcher.flush()
+        except Exception as e:
+            logger.error(f"Entity detection failed for the final batch: {e}")
+        async with queries.db.hold_open():
+            self._finish_papers(job_id, batcher, stage)
+    
+    def _finish_papers(self, job_id: str, batcher: EntityBatcher, stage: "PipelineStage"):
+        """Store the outcome of the papers whose entity detection is done."""
+        completed, failed = batcher.take_finished()
+        stage.processed += len(completed)
+        stage.failed += len(failed)
+        queries.update_job_papers(job_id, completed, ProcessingStatus.COMPLETED)
+        # Only now are the papers skipped by later jobs
+        queries.update_papers_status(completed, ProcessingStatus.COMPLETED)
+        self._fail_papers(job_id, failed)
+    
+    def _fail_papers(self, job_id: str, errors: Dict[str, str]):
+        """
+        Mark papers whose entity detection failed as FAILED, in the job and in the
+        papers table, so neither resuming the job nor a new job skips them.
+        
+        Args:
+            job_id: The job
+            errors: The error of each failed paper
+        """
+        papers_by_error: Dict[str, List[str]] = {}
+        for paper_id, error_message in errors.items():
+            papers_by_error.setdefault(error_message, []).append(paper_id)
+        
+        for error_message, paper_ids in papers_by_error.items():
+            queries.update_job_papers(job_id, paper_ids, ProcessingStatus.FAILED, error_message)
+            queries.update_papers_status(paper_ids, ProcessingStatus.FAILED, error_message)
+    
+    def _update_progress(self, job_id: str, stages: Dict[str, "PipelineStage"]):
+        """Store the extraction counters of a running job."""
+        processed_papers = stages["extraction"].skipped + stages["extraction"].processed
+        failed_papers = stages["extraction"].failed
+        queries.update_job_progress(job_id, processed_papers, failed_papers)
+        
+        job = self.running_jobs.get(job_id)
+        if job is not None:
+            job.processed_papers = processed_papers
+            job.failed_papers = failed_papers
+    
+    async def sync_analytics(self, full: bool = False) -> Dict[str, int]:
+        """
+        Sync the analytics star schema with the papers changed since the last sync.
+        
+        Args:
+            full: Rebuild the star schema from scratch
+            
+        Returns:
+            The number of papers synced and the analytics row counts
+        """
+        # The sync is blocking DuckDB work, so keep it off the event loop
+        return await asyncio.to_thread(analytics_sync.run, full)
+    
     def get_job_status(self, job_id: str) -> Optional[Job]:
         """
         Get the status of a job.
@@ -137,16 +531,29 @@ class JobManager:
         Returns:
             The Job object or None if not found
         """
-        # Check running jobs first
-        if job_id in self.running_jobs:
-            return self.running_jobs[job_id]
+        # Check running jobs first, then the database
+        job = self.running_jobs.get(job_id) or queries.get_job(job_id)
+        
+        if job is None:
+            return None
+        
+        if job_id in self.job_stages:
+            job.stages = {name: stage.snapshot() for name, stage in self.job_stages[job_id].items()}
+        else:
+            # Run by another process, which publishes its counters with every heartbeat
+            entry = job_queue.get(job_id)
+            if entry is not None and entry["stages"]:
+                job.stages = {name: StageStats(**stage) for name, stage in entry["stages"].items()}
         
-        # Check database
-        return queries.get_job(job_id)
+        return job
     
     async def cancel_job(self, job_id: str) -> Optional[Job]:
         """
-        Cancel a running job.
+        Cancel a queued or running job.
+        
+        A job running in this process is stopped right away, abandoning the HTTP
+        requests it is waiting for. A job running in another process is stopped by
+        that process at its next heartbeat.
         
         Args:
             job_id: The ID of the job
@@ -154,27 +561,59 @@ class JobManager:
         Returns:
             The updated Job object or None if not found
         """
-        # Check if job is running
-        if job_id not in self.running_jobs:
-            # Check if job exists in database
-            job = queries.get_job(job_id)
-            if job is None:
-                return None
-            
-            # If job is already completed or failed, return it
-            if job.status in [ProcessingStatus.COMPLETED, ProcessingStatus.FAILED]:
-                return job
+        job = queries.get_job(job_id)
+        if job is None:
+            return None
+        
+        # If job is already finished, return it
+        if job.status in [ProcessingStatus.COMPLETED, ProcessingStatus.FAILED, ProcessingStatus.CANCELLED]:
+            return job
+        
+        # Drops a queued job from the queue and flags a running one for its worker
+        job_queue.request_cancel(job_id)
         
-        # Mark job as failed
         job = queries.update_job_status(
-            job_id, 
-            ProcessingStatus.FAILED,
+            job_id,
+            ProcessingStatus.CANCELLED,
+            processed_papers=queries.count_job_papers(job_id)[ProcessingStatus.COMPLETED],
             completed_at=datetime.now()
         )
         
+        task = self.job_tasks.get(job_id)
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.wait([task])
+        
         # Remove from running jobs
-        if job_id in self.running_jobs:
-            del self.running_jobs[job_id]
+        self.running_jobs.pop(job_id, None)
+        
+        return job
+    
+    async def resume_job(self, job_id: str) -> Optional[Job]:
+        """
+        Queue a stopped job again, to process the papers it has not completed.
+        
+        Args:
+            job_id: The ID of the job
+            
+        Returns:
+            The updated Job object or None if not found
+        """
+        job = queries.get_job(job_id)
+        if job is None:
+            return None
+        
+        entry = job_queue.get(job_id)
+        if entry is not None and entry["state"] != DONE:
+            # Already queued or running; a lease left by a dead worker expires on its own
+            return self.get_job_status(job_id)
+        
+        if job.status == ProcessingStatus.COMPLETED:
+            # Every paper is done
+            return job
+        
+        job = queries.update_job_status(job_id, ProcessingStatus.PENDING)
+        job_queue.enqueue(job.id, job.job_type.value)
         
         return job
 
@@ -1,10 +1,12 @@
 import logging
 import asyncio
 import csv
+import io
+import itertools
 import json
 import os
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Union, Set
+from typing import List, Dict, Any, Iterator, Optional, Union, Set
 
 from src.config.settings import settings
 from src.storage.models import Paper, Figure, Entity, Job, ProcessingStatus
@@ -14,12 +16,25 @@ from src.core.jobs import job_manager
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Formats accepted by the export commands
+EXPORT_FORMATS = ("json", "ndjson", "csv", "parquet", "arrow")
+# Formats serialized chunk by chunk in Python; Parquet and Arrow are written by DuckDB
+STREAMING_EXPORT_FORMATS = ("json", "ndjson", "csv")
+
 class Orchestrator:
     """Orchestrate the extraction and processing of papers."""
     
     def __init__(self):
         self.job_manager = job_manager
     
+    def _normalize_paper_id(self, paper_id: str) -> Optional[str]:
+        """Strip a paper ID and add the PMC prefix if missing; None for blank IDs."""
+        paper_id = paper_id.strip()
+        if not paper_id:
+            return None
+        
+        return paper_id if paper_id.startswith("PMC") else f"PMC{paper_id}"
+    
     async def process_papers(self, paper_ids: List[str]) -> Job:
         """
         Process a list of paper IDs.
@@ -31,134 +46,195 @@ class Orchestrator:
             The created Job object
         """
         # Normalize paper IDs
-        normalized_ids = []
-        for paper_id in paper_ids:
-            if paper_id.strip():
-                if not paper_id.startswith("PMC"):
-                    normalized_ids.append(f"PMC{paper_id}")
-                else:
-                    normalized_ids.append(paper_id)
+        normalized_ids = [
+            normalized for normalized in map(self._normalize_paper_id, paper_ids)
+            if normalized is not None
+        ]
         
         # Create and start extraction job
         job = await self.job_manager.create_extraction_job(normalized_ids)
         
         return job
     
+    def _read_paper_ids(self, file_path: str) -> Iterator[str]:
+        """Yield the normalized paper IDs of a file one at a time."""
+        with open(file_path, 'r') as f:
+            # Try to detect file format
+            if file_path.endswith('.csv'):
+                # CSV file, IDs in the first column
+                lines = (row[0] for row in csv.reader(f) if row)
+            else:
+                # Text file, one ID per line
+                lines = f
+            
+            for line in lines:
+                paper_id = self._normalize_paper_id(line)
+                if paper_id is not None:
+                    yield paper_id
+    
     async def process_paper_file(self, file_path: str) -> Job:
         """
         Process a file containing paper IDs.
         
+        The file is read and stored settings.processing.ingest_chunk_size IDs at
+        a time in a worker thread, so files with millions of IDs are never loaded
+        whole and do not block the event loop. Repeated IDs and papers that were
+        already extracted are skipped.
+        
         Args:
             file_path: Path to the file
             
         Returns:
             The created Job object
         """
-        paper_ids = []
-        
         try:
-            with open(file_path, 'r') as f:
-                # Try to detect file format
-                if file_path.endswith('.csv'):
-                    # CSV file
-                    reader = csv.reader(f)
-                    for row in reader:
-                        if row and row[0].strip():
-                            paper_ids.append(row[0].strip())
-                else:
-                    # Text file, one ID per line
-                    for line in f:
-                        line = line.strip()
-                        if line:
-                            paper_ids.append(line)
-            
-            # Process the papers
-            return await self.process_papers(paper_ids)
+            chunks = (
+                list(chunk)
+                for chunk in itertools.batched(self._read_paper_ids(file_path), settings.processing.ingest_chunk_size)
+            )
+            return await self.job_manager.create_extraction_job_from_chunks(chunks)
             
         except Exception as e:
             logger.error(f"Error processing paper file {file_path}: {e}")
             raise
     
-    def export_data(self, data_type: str, output_format: str, output_path: str) -> str:
+    def stream_export(self, data_type: str, output_format: str, chunk_size: int = 1000) -> Iterator[str]:
+        """
+        Stream an export chunk by chunk.
+        
+        Rows are read from the database chunk_size at a time and serialized as
+        they arrive, so memory use does not grow with the size of the export.
+        
+        Args:
+            data_type: Type of data to export ('papers', 'figures', 'entities')
+            output_format: Format of the output ('json', 'ndjson', 'csv')
+            chunk_size: Number of rows read and serialized at a time
+            
+        Returns:
+            An iterator of text chunks
+        """
+        if data_type not in queries.EXPORT_COLUMNS:
+            raise ValueError(f"Invalid data type: {data_type}")
+        if output_format not in STREAMING_EXPORT_FORMATS:
+            raise ValueError(f"Invalid output format for streaming: {output_format}")
+        
+        return self._serialize_rows(data_type, output_format, chunk_size)
+    
+    def _serialize_rows(self, data_type: str, output_format: str, chunk_size: int) -> Iterator[str]:
+        rows = queries.stream_rows(data_type, chunk_size)
+        
+        if output_format == 'csv':
+            _, fieldnames = queries.EXPORT_COLUMNS[data_type]
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+            writer.writeheader()
+            for chunk in rows:
+                writer.writerows(chunk)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+        elif output_format == 'ndjson':
+            for chunk in rows:
+                yield "".join(json.dumps(row, default=str) + "\n" for row in chunk)
+        else:
+            # A JSON array written incrementally
+            yield "["
+            separator = "\n"
+            for chunk in rows:
+                parts = []
+                for row in chunk:
+                    parts.append(separator + json.dumps(row, default=str))
+                    separator = ",\n"
+                yield "".join(parts)
+            yield "\n]\n"
+    
+    def export_data(
+        self,
+        data_type: str,
+        output_format: str,
+        output_path: str,
+        partition_by: Optional[str] = None,
+        prefix_length: int = 6
+    ) -> str:
         """
         Export data to a file.
         
         Args:
             data_type: Type of data to export ('papers', 'figures', 'entities')
-            output_format: Format of the output file ('json', 'csv')
-            output_path: Path to the output file
+            output_format: Format of the output file ('json', 'ndjson', 'csv', 'parquet', 'arrow')
+            output_path: Path to the output file (a directory for partitioned Parquet)
+            partition_by: Optional Parquet partition scheme ('entity_type' or 'paper_prefix')
+            prefix_length: Number of leading paper ID characters used by 'paper_prefix'
             
         Returns:
             Path to the exported file
         """
         try:
             # Create output directory if it doesn't exist
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            output_dir = os.path.dirname(output_path)
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
             
-            # Get data based on type
-            if data_type == 'papers':
-                data = queries.list_papers(limit=1000)
-            elif data_type == 'figures':
-                # Get all papers
-                papers = queries.list_papers(limit=1000)
-                
-                # Get figures for each paper
-                data = []
-                for paper in papers:
-                    figures = queries.get_figures_for_paper(paper.id)
-                    data.extend(figures)
-            elif data_type == 'entities':
-                # Get all papers
-                papers = queries.list_papers(limit=1000)
-                
-                # Get figures for each paper
-                figures = []
-                for paper in papers:
-                    paper_figures = queries.get_figures_for_paper(paper.id)
-                    figures.extend(paper_figures)
-                
-                # Get entities for each figure
-                data = []
-                for figure in figures:
-                    entities = queries.get_entities_for_figure(figure.id)
-                    data.extend(entities)
-            else:
-                raise ValueError(f"Invalid data type: {data_type}")
+            if output_format in ('parquet', 'arrow'):
+                return queries.export_to_file(data_type, output_path, output_format, partition_by, prefix_length)
             
-            # Export data based on format
-            if output_format == 'json':
-                with open(output_path, 'w') as f:
-                    json_data = [item.dict() for item in data]
-                    json.dump(json_data, f, indent=2, default=str)
-            elif output_format == 'csv':
-                if not data:
-                    # Create empty file with headers
-                    with open(output_path, 'w') as f:
-                        if data_type == 'papers':
-                            f.write("id,title,abstract,processed_date,source,status,error_message\n")
-                        elif data_type == 'figures':
-                            f.write("id,paper_id,figure_number,caption,url\n")
-                        elif data_type == 'entities':
-                            f.write("id,figure_id,entity_text,entity_type,start_position,end_position,external_id\n")
-                else:
-                    # Write data to CSV
-                    with open(output_path, 'w', newline='') as f:
-                        # Get field names from first item
-                        fieldnames = data[0].dict().keys()
-                        
-                        writer = csv.DictWriter(f, fieldnames=fieldnames)
-                        writer.writeheader()
-                        
-                        for item in data:
-                            writer.writerow(item.dict())
-            else:
-                raise ValueError(f"Invalid output format: {output_format}")
+            if partition_by is not None:
+                raise ValueError("Partitioning is only supported for Parquet exports")
+            
+            chunks = self.stream_export(data_type, output_format)
+            with open(output_path, 'w', newline='') as f:
+                for chunk in chunks:
+                    f.write(chunk)
             
             return output_path
             
         except Exception as e:
             logger.error(f"Error exporting {data_type} to {output_path}: {e}")
             raise
+    
+    def export_snapshot(self, output_dir: str, partition_by: Optional[str] = None, prefix_length: int = 6) -> str:
+        """
+        Export papers, figures and entities as a Parquet snapshot.
+        
+        The snapshot can be loaded into a fresh database with import_snapshot.
+        Partitioning by 'entity_type' applies to the entities only.
+        
+        Args:
+            output_dir: Directory to write the snapshot to
+            partition_by: Optional partition scheme ('entity_type' or 'paper_prefix')
+            prefix_length: Number of leading paper ID characters used by 'paper_prefix'
+            
+        Returns:
+            The snapshot directory
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        
+        for data_type in ('papers', 'figures', 'entities'):
+            table_partition = partition_by
+            if partition_by == 'entity_type' and data_type != 'entities':
+                table_partition = None
+            
+            if table_partition is None:
+                output_path = os.path.join(output_dir, f"{data_type}.parquet")
+            else:
+                output_path = os.path.join(output_dir, data_type)
+            
+            self.export_data(data_type, 'parquet', output_path, table_partition, prefix_length)
+        
+        return output_dir
+    
+    def import_snapshot(self, snapshot_dir: str) -> Dict[str, int]:
+        """
+        Load a Parquet snapshot into an empty database.
+        
+        Args:
+            snapshot_dir: Directory written by export_snapshot
+            
+        Returns:
+            The number of rows imported per table
+        """
+        return queries.import_parquet_snapshot(snapshot_dir)
 
 # Create singleton instance
 orchestrator = Orchestrator()
@@ -0,0 +1,127 @@
+import time
+import asyncio
+import logging
+import threading
+from urllib.parse import urlsplit
+from typing import Awaitable, Callable, Dict, Tuple
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """
+    Token bucket that refills at a fixed rate up to a burst capacity.
+    
+    acquire() reserves a token synchronously and then awaits until that token
+    is due, so waiting never blocks the event loop and concurrent callers are
+    served in arrival order. The clock and sleep functions are injectable.
+    """
+    
+    def __init__(
+        self,
+        rate: float,
+        capacity: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep
+    ):
+        """
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens (burst size)
+            clock: Monotonic clock returning seconds
+            sleep: Coroutine function used to wait
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated_at = clock()
+        # Guards the bucket state only; it is never held across an await
+        self._lock = threading.Lock()
+    
+    def _reserve(self, tokens: float) -> float:
+        """Take tokens from the bucket and return how long to wait until they are due."""
+        with self._lock:
+            now = self._clock()
+            elapsed = max(0.0, now - self._updated_at)
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self._updated_at = now
+            
+            # The balance may go negative: later callers queue up behind this reservation
+            self.tokens -= tokens
+            if self.tokens >= 0:
+                return 0.0
+            
+            return -self.tokens / self.rate
+    
+    def _refund(self, tokens: float):
+        """Return tokens that were reserved but not used."""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + tokens)
+    
+    async def acquire(self, tokens: float = 1):
+        """
+        Wait until the requested number of tokens is available.
+        
+        Args:
+            tokens: Number of tokens to take
+        """
+        wait_time = self._reserve(tokens)
+        if wait_time <= 0:
+            return
+        
+        logger.debug(f"Rate limiting: waiting {wait_time:.2f} seconds")
+        try:
+            await self._sleep(wait_time)
+        except asyncio.CancelledError:
+            self._refund(tokens)
+            raise
+
+class RateLimiter:
+    """Registry of token buckets, one per external service."""
+    
+    def __init__(self):
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+    
+    def _key(self, url: str) -> Tuple[str, str]:
+        # Host plus path, so services sharing a host keep their own limits
+        parts = urlsplit(url)
+        return parts.netloc.lower(), parts.path.rstrip("/")
+    
+    def get_bucket(self, url: str, requests_per_minute: int, burst: int = 1) -> TokenBucket:
+        """
+        Get the bucket for a service, creating it on first use.
+        
+        Args:
+            url: Base URL of the service
+            requests_per_minute: Sustained request rate
+            burst: Number of requests allowed back to back
+        
+        Returns:
+            The shared TokenBucket for the service
+        """
+        key = self._key(url)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(rate=requests_per_minute / 60.0, capacity=burst)
+                self._buckets[key] = bucket
+            return bucket
+    
+    async def acquire(self, url: str, requests_per_minute: int, burst: int = 1):
+        """Wait for permission to send one request to the service at url."""
+        await self.get_bucket(url, requests_per_minute, burst).acquire()
+
+# Create singleton instance
+rate_limiter = RateLimiter()
+
+def get_rate_limiter() -> RateLimiter:
+    """Get rate limiter instance."""
+    return rate_limiter
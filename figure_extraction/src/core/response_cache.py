@@ -0,0 +1,231 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from src.config.settings import settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """
+    On-disk cache for external API responses.
+    
+    Entries are JSON files named by the SHA-256 of their key, so the same PMC ID
+    or caption always maps to the same file no matter which job asks for it.
+    Entries older than the TTL are treated as misses, and once the cache grows
+    past its size limit the least recently read entries are evicted.
+    """
+    
+    def __init__(self, namespace: str, directory: Optional[str] = None, ttl: Optional[int] = None, max_size_bytes: Optional[int] = None):
+        """
+        Args:
+            namespace: Subdirectory that keeps one API's entries apart from another's
+            directory: Cache root, defaults to <temp_dir>/cache
+            ttl: Entry lifetime in seconds, defaults to the cache settings
+            max_size_bytes: Size limit for this namespace, defaults to the cache settings
+        """
+        cache_settings = settings.cache
+        self.namespace = namespace
+        self.enabled = cache_settings.enabled
+        self.directory = Path(directory or Path(settings.temp_dir) / "cache") / namespace
+        self.ttl = ttl if ttl is not None else cache_settings.ttl
+        self.max_size_bytes = max_size_bytes if max_size_bytes is not None else cache_settings.max_size_mb * 1024 * 1024
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Bytes on disk, computed on first write
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+    
+    def _path(self, key: str) -> Path:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        # Two-level fan-out keeps directories small for large corpora
+        return self.directory / digest[:2] / f"{digest}.json"
+    
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a cached response.
+        
+        Args:
+            key: The cache key (e.g. a PMC ID or a caption)
+        
+        Returns:
+            The cached value, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        
+        path = self._path(key)
+        try:
+            stat = path.stat()
+            now = time.time()
+            if self.ttl and now - stat.st_mtime > self.ttl:
+                self._remove(path, stat.st_size)
+                self._count_miss()
+                return None
+            
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            
+            # Record the read in atime for LRU eviction; mtime keeps the write time for the TTL
+            os.utime(path, (now, stat.st_mtime))
+        except FileNotFoundError:
+            self._count_miss()
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable cache entry {path}: {e}")
+            self._remove(path)
+            self._count_miss()
+            return None
+        
+        with self._lock:
+            self.hits += 1
+        return value
+    
+    def set(self, key: str, value: Any):
+        """
+        Store a response in the cache.
+        
+        Args:
+            key: The cache key
+            value: A JSON-serializable value
+        """
+        if not self.enabled:
+            return
+        
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            data = json.dumps(value).encode("utf-8")
+            
+            # Write to a temporary file and rename, so readers never see a partial entry
+            fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            
+            previous_size = path.stat().st_size if path.exists() else 0
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Failed to write cache entry {path}: {e}")
+            return
+        
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data) - previous_size
+            over_limit = self._size > self.max_size_bytes
+        
+        if over_limit:
+            self.evict()
+    
+    def _count_miss(self):
+        with self._lock:
+            self.misses += 1
+    
+    def _remove(self, path: Path, size: Optional[int] = None):
+        try:
+            if size is None:
+                size = path.stat().st_size
+            path.unlink()
+        except OSError:
+            return
+        
+        with self._lock:
+            self.evictions += 1
+            if self._size is not None:
+                self._size -= size
+    
+    def _entries(self):
+        if not self.directory.exists():
+            return []
+        return list(self.directory.glob("*/*.json"))
+    
+    def _scan_size(self) -> int:
+        size = 0
+        for path in self._entries():
+            try:
+                size += path.stat().st_size
+            except OSError:
+                continue
+        return size
+    
+    def evict(self):
+        """Remove expired entries, then the least recently read ones until the cache fits its size limit."""
+        now = time.time()
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            
+            if self.ttl and now - stat.st_mtime > self.ttl:
+                self._remove(path, stat.st_size)
+            else:
+                entries.append((stat.st_atime, stat.st_size, path))
+        
+        size = sum(entry_size for _, entry_size, _ in entries)
+        with self._lock:
+            self._size = size
+        
+        # Evict down to 90% of the limit so the next few writes don't trigger another scan
+        target = self.max_size_bytes * 0.9
+        entries.sort(key=lambda entry: entry[0])
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            self._remove(path, entry_size)
+            size -= entry_size
+    
+    def clear(self):
+        """Remove every entry in this namespace."""
+        for path in self._entries():
+            self._remove(path)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get hit/miss counters for this cache.
+        
+        Returns:
+            A dictionary of counters and the current size on disk
+        """
+        with self._lock:
+            if self._size is None and self.enabled:
+                self._size = self._scan_size()
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "size_bytes": self._size or 0
+            }
+
+# One cache per namespace, shared by every client in the process
+_caches: Dict[str, ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+def get_response_cache(namespace: str) -> ResponseCache:
+    """Get the shared cache for a namespace, creating it on first use."""
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache = ResponseCache(namespace)
+            _caches[namespace] = cache
+        return cache
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Get the counters of every cache created in this process."""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.namespace: cache.get_stats() for cache in caches}
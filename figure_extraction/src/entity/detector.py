@@ -1,7 +1,8 @@
 import logging
 import uuid
 import asyncio
-from typing import List, Dict, Any, Optional
+import httpx
+from typing import List, Dict, Any, Optional, Set, Tuple
 
 from src.config.settings import settings
 from src.entity.pubtator_client import PubTator3Client
@@ -14,8 +15,86 @@ logger = logging.getLogger(__name__)
 class EntityDetector:
     """Detect entities in figure captions."""
     
-    def __init__(self):
-        self.pubtator_client = PubTator3Client()
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        self.pubtator_client = PubTator3Client(http_client)
+    
+    def _build_entities(self, figure: Figure, entity_data: List[Dict[str, Any]]) -> List[Entity]:
+        """Create Entity objects for a figure from PubTator results."""
+        entities = []
+        for data in entity_data:
+            entity = Entity(
+                id=str(uuid.uuid4()),
+                figure_id=figure.id,
+                entity_text=data["entity_text"],
+                entity_type=data["entity_type"],
+                start_position=data["start_position"],
+                end_position=data["end_position"],
+                external_id=data["external_id"] if data["external_id"] else None
+            )
+            entities.append(entity)
+        
+        return entities
+    
+    def _pack_batches(self, figures: List[Figure]) -> List[List[Figure]]:
+        """
+        Split figures into PubTator batches bounded by the configured number of
+        captions and characters per request. A caption longer than the character
+        budget gets a batch of its own.
+        """
+        max_documents = settings.external_api.pubtator3_batch_size
+        max_chars = settings.external_api.pubtator3_batch_chars
+        
+        batches = []
+        batch: List[Figure] = []
+        batch_chars = 0
+        for figure in figures:
+            caption_chars = len(figure.caption)
+            if batch and (len(batch) >= max_documents or batch_chars + caption_chars > max_chars):
+                batches.append(batch)
+                batch = []
+                batch_chars = 0
+            
+            batch.append(figure)
+            batch_chars += caption_chars
+        
+        if batch:
+            batches.append(batch)
+        
+        return batches
+    
+    async def detect_entities_for_figures(self, figures: List[Figure]) -> Dict[str, List[Entity]]:
+        """
+        Detect entities in many captions, packing them into as few PubTator
+        requests as the batch limits allow.
+        
+        Args:
+            figures: The Figure objects containing the captions
+            
+        Returns:
+            A dictionary mapping figure IDs to detected Entity objects
+        
+        Raises:
+            Exception: A PubTator request failed. Nothing is returned for the
+                other batches either, so no figure is stored without entities
+                that were never detected.
+        """
+        results: Dict[str, List[Entity]] = {}
+        for batch in self._pack_batches(figures):
+            try:
+                logger.info(f"Detecting entities in {len(batch)} figures")
+                
+                # Get entities for the whole batch from PubTator3 API
+                batch_data = await self.pubtator_client.detect_entities_batch(
+                    [figure.caption for figure in batch]
+                )
+                
+                for figure, entity_data in zip(batch, batch_data):
+                    results[figure.id] = self._build_entities(figure, entity_data)
+            except Exception as e:
+                logger.error(f"Error detecting entities in batch of {len(batch)} figures: {e}")
+                raise
+        
+        return results
     
     async def detect_entities_in_caption(self, figure: Figure) -> List[Entity]:
         """
@@ -33,21 +112,7 @@ class EntityDetector:
             # Get entities from PubTator3 API
             entity_data = await self.pubtator_client.detect_entities(figure.caption)
             
-            # Create Entity objects
-            entities = []
-            for data in entity_data:
-                entity = Entity(
-                    id=str(uuid.uuid4()),
-                    figure_id=figure.id,
-                    entity_text=data["entity_text"],
-                    entity_type=data["entity_type"],
-                    start_position=data["start_position"],
-                    end_position=data["end_position"],
-                    external_id=data["external_id"] if data["external_id"] else None
-                )
-                entities.append(entity)
-            
-            return entities
+            return self._build_entities(figure, entity_data)
             
         except Exception as e:
             logger.error(f"Error detecting entities in figure {figure.id}: {e}")
@@ -67,16 +132,47 @@ class EntityDetector:
         entities = await self.detect_entities_in_caption(figure)
         
         # Store in database
+        async with queries.db.hold_open():
+            session = queries.db.get_session()
+            try:
+                queries.create_entities_bulk(entities, session)
+                
+                return entities
+            except Exception as e:
+                logger.error(f"Error storing entities for figure {figure.id}: {e}")
+                raise
+            finally:
+                session.close()
+    
+    async def process_figures(self, figures: List[Figure]) -> Dict[str, int]:
+        """
+        Detect entities for a set of figures, possibly from several papers, and
+        store them in the database.
+        
+        Args:
+            figures: The Figure objects to process
+            
+        Returns:
+            A dictionary with counts of processed figures and entities
+        """
+        entities_by_figure = await self.detect_entities_for_figures(figures)
+        entities = [entity for figure_entities in entities_by_figure.values() for entity in figure_entities]
+        
+        # Store in database, with the file opened off the event loop
+        async with queries.db.hold_open():
+            return self._store_entities(figures, entities)
+    
+    def _store_entities(self, figures: List[Figure], entities: List[Entity]) -> Dict[str, int]:
         session = queries.db.get_session()
         try:
-            stored_entities = []
-            for entity in entities:
-                stored_entity = queries.create_entity(entity, session)
-                stored_entities.append(stored_entity)
+            queries.create_entities_bulk(entities, session)
             
-            return stored_entities
+            return {
+                "processed_figures": len(figures),
+                "detected_entities": len(entities)
+            }
         except Exception as e:
-            logger.error(f"Error storing entities for figure {figure.id}: {e}")
+            logger.error(f"Error storing entities for {len(figures)} figures: {e}")
             raise
         finally:
             session.close()
@@ -91,23 +187,134 @@ class EntityDetector:
         Returns:
             A dictionary with counts of processed figures and entities
         """
-        session = queries.db.get_session()
         try:
             # Get all figures for the paper
-            figures = queries.get_figures_for_paper(paper_id, session)
+            async with queries.db.hold_open():
+                figures = queries.get_figures_for_paper(paper_id, use_cache=False)
             
-            entity_count = 0
-            for figure in figures:
-                # Detect and store entities
-                entities = await self.detect_and_store_entities(figure)
-                entity_count += len(entities)
-            
-            return {
-                "processed_figures": len(figures),
-                "detected_entities": entity_count
-            }
+            return await self.process_figures(figures)
         except Exception as e:
             logger.error(f"Error processing figures for paper {paper_id}: {e}")
             raise
-        finally:
-            session.close()
\ No newline at end of file
+
+class EntityBatcher:
+    """
+    Collect figures across the papers of a job and run entity detection once a
+    full PubTator batch is ready, so requests are filled regardless of how few
+    figures each paper has.
+    """
+    
+    def __init__(self, detector: EntityDetector):
+        self.detector = detector
+        self.pending: List[Figure] = []
+        self.processed_figures = 0
+        self.detected_entities = 0
+        # Figures of each owner whose entities are not stored yet, in the order the owners were added
+        self._remaining: Dict[Any, Set[str]] = {}
+        # Owner of each figure that is queued or being processed
+        self._figure_owners: Dict[str, Any] = {}
+        # Owners with a figure in a failed batch, with the error
+        self._failed: Dict[Any, str] = {}
+    
+    def _is_full(self, figures: List[Figure]) -> bool:
+        return (
+            len(figures) >= settings.external_api.pubtator3_batch_size
+            or sum(len(figure.caption) for figure in figures) >= settings.external_api.pubtator3_batch_chars
+        )
+    
+    async def _process(self, figures: List[Figure]):
+        # The owners are taken as the batch is sent, so a failure reaches all of
+        # them even if some of their figures are still queued
+        owners = {self._figure_owners.pop(figure.id) for figure in figures if figure.id in self._figure_owners}
+        try:
+            counts = await self.detector.process_figures(figures)
+        except Exception as e:
+            for owner in owners:
+                self._failed.setdefault(owner, str(e))
+            # Their other figures would be detected for nothing; the owners are redone as a whole
+            self.pending = [figure for figure in self.pending if self._figure_owners.get(figure.id) not in owners]
+            raise
+        
+        self.processed_figures += counts["processed_figures"]
+        self.detected_entities += counts["detected_entities"]
+        for owner in owners:
+            remaining = self._remaining.get(owner)
+            if remaining is not None:
+                remaining.difference_update(figure.id for figure in figures)
+    
+    async def _process_batches(self, batches: List[List[Figure]]):
+        """Process every batch, even after one fails, and raise the first error afterwards."""
+        error = None
+        for batch in batches:
+            # Figures of owners failed by an earlier batch need not be detected
+            batch = [figure for figure in batch if self._figure_owners.get(figure.id) not in self._failed]
+            if not batch:
+                continue
+            
+            try:
+                await self._process(batch)
+            except Exception as e:
+                error = error or e
+        
+        if error is not None:
+            raise error
+    
+    async def add(self, figures: List[Figure], owner: Any = None):
+        """
+        Queue figures for entity detection and process every batch that is full.
+        If a batch fails, the other batches are still processed and the error is
+        raised afterwards.
+        
+        Args:
+            figures: The Figure objects to queue
+            owner: Optional key for the figures, e.g. their paper ID, reported by
+                take_finished once all of them have been processed
+        """
+        if owner is not None:
+            self._remaining.setdefault(owner, set()).update(figure.id for figure in figures)
+            for figure in figures:
+                self._figure_owners[figure.id] = owner
+        
+        batches = self.detector._pack_batches(self.pending + figures)
+        if not batches:
+            return
+        
+        # The last batch keeps waiting for more figures unless it is already full
+        ready, self.pending = batches[:-1], batches[-1]
+        if self._is_full(self.pending):
+            ready.append(self.pending)
+            self.pending = []
+        
+        await self._process_batches(ready)
+    
+    async def flush(self):
+        """Process all queued figures."""
+        if not self.pending:
+            return
+        
+        figures = self.pending
+        self.pending = []
+        await self._process_batches([figures])
+    
+    def take_finished(self) -> Tuple[List[Any], Dict[Any, str]]:
+        """
+        Remove and return the owners that are done: those whose figures were all
+        processed, and those with a figure in a failed batch, whether or not
+        their other figures were processed.
+        
+        Returns:
+            The completed owners, in the order they were added, and the failed
+            owners with the error of their batch
+        """
+        completed = []
+        failed = {}
+        for owner, remaining in list(self._remaining.items()):
+            if owner in self._failed:
+                failed[owner] = self._failed.pop(owner)
+            elif not remaining:
+                completed.append(owner)
+            else:
+                continue
+            del self._remaining[owner]
+        
+        return completed, failed
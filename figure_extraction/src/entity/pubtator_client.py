@@ -1,37 +1,35 @@
 import logging
-import time
 import json
+import bisect
 import httpx
 from typing import Dict, List, Optional, Any
 
 from src.config.settings import settings
+from src.core.http_client import create_http_client
+from src.core.rate_limiter import rate_limiter
+from src.core.response_cache import get_response_cache
 from src.storage.models import EntityType
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Placed between texts packed into one batch request, so no entity spans two captions
+BATCH_SEPARATOR = "\n\n"
+
 class PubTator3Client:
     """Client for the PubTator3 API."""
     
-    def __init__(self):
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        self.http_client = http_client or create_http_client()
         self.base_url = settings.external_api.pubtator3_url
         self.rate_limit = settings.external_api.pubtator3_rate_limit
-        self.last_request_time = 0
-        
-    def _respect_rate_limit(self):
-        """Ensure we don't exceed the rate limit."""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        
-        # Calculate minimum time between requests based on rate limit
-        min_interval = 60.0 / self.rate_limit  # seconds
-        
-        if time_since_last_request < min_interval:
-            sleep_time = min_interval - time_since_last_request
-            logger.debug(f"Rate limiting: sleeping for {sleep_time:.2f} seconds")
-            time.sleep(sleep_time)
-        
-        self.last_request_time = time.time()
+        self.burst = settings.external_api.pubtator3_burst
+        # Keyed by caption text, so identical captions are only tagged once
+        self.cache = get_response_cache("pubtator")
+    
+    async def _respect_rate_limit(self):
+        """Wait until the shared rate limit allows another request."""
+        await rate_limiter.acquire(self.base_url, self.rate_limit, self.burst)
     
     async def detect_entities(self, text: str) -> List[Dict[str, Any]]:
         """
@@ -43,40 +41,108 @@ class PubTator3Client:
         Returns:
             A list of detected entities
         """
-        self._respect_rate_limit()
+        cached = self._get_cached(text)
+        if cached is not None:
+            return cached
+        
+        entities = await self._tag(text)
+        self._set_cached(text, entities)
+        return entities
+    
+    async def detect_entities_batch(self, texts: List[str]) -> List[List[Dict[str, Any]]]:
+        """
+        Detect entities in several texts with a single PubTator3 request.
+        
+        Texts found in the cache are not sent. The rest are sent as one document
+        joined by BATCH_SEPARATOR, and the returned offsets are mapped back to
+        the text they fall in. Entities that straddle a separator are dropped.
+        
+        Args:
+            texts: The texts to analyze
+            
+        Returns:
+            One list of detected entities per input text, with positions
+            relative to that text
+        """
+        results: List[Optional[List[Dict[str, Any]]]] = [self._get_cached(text) for text in texts]
+        missing = [index for index, cached in enumerate(results) if cached is None]
+        if missing:
+            tagged = await self._tag_batch([texts[index] for index in missing])
+            for index, entities in zip(missing, tagged):
+                self._set_cached(texts[index], entities)
+                results[index] = entities
+        
+        return results
+    
+    async def _tag_batch(self, texts: List[str]) -> List[List[Dict[str, Any]]]:
+        """Tag texts joined into one document and split the entities back per text."""
+        # Start offset of each text within the combined document
+        starts = []
+        offset = 0
+        for text in texts:
+            starts.append(offset)
+            offset += len(text) + len(BATCH_SEPARATOR)
+        
+        entities = await self._tag(BATCH_SEPARATOR.join(texts))
+        
+        results: List[List[Dict[str, Any]]] = [[] for _ in texts]
+        for entity in entities:
+            index = bisect.bisect_right(starts, entity["start_position"]) - 1
+            start = starts[index]
+            if entity["end_position"] > start + len(texts[index]):
+                continue
+            
+            results[index].append({
+                **entity,
+                "start_position": entity["start_position"] - start,
+                "end_position": entity["end_position"] - start
+            })
+        
+        return results
+    
+    def _get_cached(self, text: str) -> Optional[List[Dict[str, Any]]]:
+        cached = self.cache.get(text)
+        if cached is None:
+            return None
+        return [{**entity, "entity_type": EntityType(entity["entity_type"])} for entity in cached]
+    
+    def _set_cached(self, text: str, entities: List[Dict[str, Any]]):
+        self.cache.set(text, [{**entity, "entity_type": entity["entity_type"].value} for entity in entities])
+    
+    async def _tag(self, text: str) -> List[Dict[str, Any]]:
+        """Send text to the PubTator3 tagger and return the entities it found."""
+        await self._respect_rate_limit()
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/tag",
-                    json={
-                        "text": text,
-                        "concepts": ["gene", "disease", "chemical", "species", "mutation", "cellline"]
-                    },
-                    timeout=30.0
-                )
-                
-                response.raise_for_status()
-                
-                # Parse the JSON response
-                result = response.json()
-                
-                # Extract entities
-                entities = []
-                if "denotations" in result:
-                    for entity in result["denotations"]:
-                        entity_type = self._map_entity_type(entity.get("obj"))
-                        if entity_type:
-                            entities.append({
-                                "entity_text": entity.get("span", {}).get("text", ""),
-                                "entity_type": entity_type,
-                                "start_position": entity.get("span", {}).get("begin", 0),
-                                "end_position": entity.get("span", {}).get("end", 0),
-                                "external_id": entity.get("id", "")
-                            })
-                
-                return entities
-                
+            response = await self.http_client.post(
+                f"{self.base_url}/tag",
+                json={
+                    "text": text,
+                    "concepts": ["gene", "disease", "chemical", "species", "mutation", "cellline"]
+                }
+            )
+            
+            response.raise_for_status()
+            
+            # Parse the JSON response
+            result = response.json()
+            
+            # Extract entities
+            entities = []
+            if "denotations" in result:
+                for entity in result["denotations"]:
+                    entity_type = self._map_entity_type(entity.get("obj"))
+                    if entity_type:
+                        entities.append({
+                            "entity_text": entity.get("span", {}).get("text", ""),
+                            "entity_type": entity_type,
+                            "start_position": entity.get("span", {}).get("begin", 0),
+                            "end_position": entity.get("span", {}).get("end", 0),
+                            "external_id": entity.get("id", "")
+                        })
+            
+            return entities
+            
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP error detecting entities: {e}")
             raise
@@ -1,10 +1,12 @@
 import logging
-import time
 import httpx
 import xml.etree.ElementTree as ET
 from typing import Dict, List, Optional, Any, Tuple
 
 from src.config.settings import settings
+from src.core.http_client import create_http_client
+from src.core.rate_limiter import rate_limiter
+from src.core.response_cache import get_response_cache
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -12,25 +14,16 @@ logger = logging.getLogger(__name__)
 class BioCPMCClient:
     """Client for the BioC-PMC API."""
     
-    def __init__(self):
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        self.http_client = http_client or create_http_client()
         self.base_url = settings.external_api.bioc_pmc_url
         self.rate_limit = settings.external_api.bioc_pmc_rate_limit
-        self.last_request_time = 0
-        
-    def _respect_rate_limit(self):
-        """Ensure we don't exceed the rate limit."""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        
-        # Calculate minimum time between requests based on rate limit
-        min_interval = 60.0 / self.rate_limit  # seconds
-        
-        if time_since_last_request < min_interval:
-            sleep_time = min_interval - time_since_last_request
-            logger.debug(f"Rate limiting: sleeping for {sleep_time:.2f} seconds")
-            time.sleep(sleep_time)
-        
-        self.last_request_time = time.time()
+        self.burst = settings.external_api.bioc_pmc_burst
+        self.cache = get_response_cache("bioc")
+    
+    async def _respect_rate_limit(self):
+        """Wait until the shared rate limit allows another request."""
+        await rate_limiter.acquire(self.base_url, self.rate_limit, self.burst)
     
     async def get_paper_structure(self, paper_id: str) -> Dict[str, Any]:
         """
@@ -46,24 +39,32 @@ class BioCPMCClient:
         if not paper_id.startswith("PMC"):
             paper_id = f"PMC{paper_id}"
         
-        self._respect_rate_limit()
+        cached = self.cache.get(paper_id)
+        if cached is not None:
+            return cached
+        
+        await self._respect_rate_limit()
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/retrieve",
-                    params={
-                        "id": paper_id,
-                        "format": "xml"
-                    },
-                    timeout=30.0
-                )
-                
+            # Parse the XML as it arrives instead of buffering the whole document
+            async with self.http_client.stream(
+                "GET",
+                f"{self.base_url}/retrieve",
+                params={
+                    "id": paper_id,
+                    "format": "xml"
+                }
+            ) as response:
                 response.raise_for_status()
                 
-                # Parse the XML response
-                return self._parse_bioc_xml(response.text)
-                
+                parser = BioCStreamParser()
+                async for chunk in response.aiter_bytes():
+                    parser.feed(chunk)
+                structure = parser.close()
+            
+            self.cache.set(paper_id, structure)
+            return structure
+            
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP error for paper {paper_id}: {e}")
             if e.response.status_code == 404:
@@ -86,56 +87,101 @@ class BioCPMCClient:
         Returns:
             A dictionary containing the parsed paper structure
         """
+        parser = BioCStreamParser()
+        parser.feed(xml_text.encode("utf-8"))
+        return parser.close()
+
+class BioCStreamParser:
+    """
+    Incremental parser for BioC XML.
+    
+    Bytes are fed as they arrive and each passage is inspected when its end tag
+    is seen, then cleared, so only the title, abstract and figure captions are
+    kept instead of the whole document tree. Only the first document element
+    is read.
+    """
+    
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._result = {
+            "title": "",
+            "abstract": "",
+            "figures": []
+        }
+        self._abstract_texts: List[str] = []
+        self._title_found = False
+        self._document_state = "before"  # "before", "inside" or "done"
+    
+    def feed(self, data: bytes):
+        """
+        Parse the next chunk of the response.
+        
+        Args:
+            data: Raw bytes of the XML response
+        """
         try:
-            # Parse XML
-            root = ET.fromstring(xml_text)
-            
-            # Initialize result structure
-            result = {
-                "title": "",
-                "abstract": "",
-                "figures": []
-            }
-            
-            # Find document element
-            document = root.find(".//document")
-            if document is None:
-                raise ValueError("No document element found in XML")
-            
-            # Extract title
-            title_elem = document.find(".//passage[infon='title']/text")
-            if title_elem is not None:
-                result["title"] = title_elem.text
-            
-            # Extract abstract
-            abstract_passages = document.findall(".//passage[infon='abstract']/text")
-            abstract_texts = [p.text for p in abstract_passages if p.text]
-            result["abstract"] = " ".join(abstract_texts)
-            
-            # Extract figures
-            figure_num = 1
-            for fig_elem in document.findall(".//passage[infon='figure']"):
-                caption_elem = fig_elem.find("text")
-                if caption_elem is not None and caption_elem.text:
-                    figure = {
-                        "figure_number": figure_num,
-                        "caption": caption_elem.text,
-                        "url": None
-                    }
-                    
-                    # Try to find figure URL
-                    url_elem = fig_elem.find("infon[@key='url']")
-                    if url_elem is not None and url_elem.text:
-                        figure["url"] = url_elem.text
-                    
-                    result["figures"].append(figure)
-                    figure_num += 1
-            
-            return result
-            
+            self._parser.feed(data)
         except ET.ParseError as e:
             logger.error(f"XML parsing error: {e}")
             raise ValueError(f"Failed to parse XML response: {e}")
-        except Exception as e:
-            logger.error(f"Unexpected error parsing XML: {e}")
-            raise
\ No newline at end of file
+        self._handle_events()
+    
+    def close(self) -> Dict[str, Any]:
+        """
+        Finish parsing.
+        
+        Returns:
+            A dictionary containing the parsed paper structure
+        """
+        try:
+            self._parser.close()
+        except ET.ParseError as e:
+            logger.error(f"XML parsing error: {e}")
+            raise ValueError(f"Failed to parse XML response: {e}")
+        self._handle_events()
+        
+        if self._document_state == "before":
+            raise ValueError("No document element found in XML")
+        
+        self._result["abstract"] = " ".join(self._abstract_texts)
+        return self._result
+    
+    def _handle_events(self):
+        for event, elem in self._parser.read_events():
+            if elem.tag == "document":
+                if event == "start" and self._document_state == "before":
+                    self._document_state = "inside"
+                elif event == "end" and self._document_state == "inside":
+                    self._document_state = "done"
+                    elem.clear()
+            elif elem.tag == "passage" and event == "end":
+                if self._document_state == "inside":
+                    self._handle_passage(elem)
+                elem.clear()
+    
+    def _handle_passage(self, passage: ET.Element):
+        types = {infon.text for infon in passage.findall("infon")}
+        text_elem = passage.find("text")
+        if text_elem is None:
+            return
+        
+        if "title" in types and not self._title_found:
+            self._result["title"] = text_elem.text
+            self._title_found = True
+        
+        if "abstract" in types and text_elem.text:
+            self._abstract_texts.append(text_elem.text)
+        
+        if "figure" in types and text_elem.text:
+            figure = {
+                "figure_number": len(self._result["figures"]) + 1,
+                "caption": text_elem.text,
+                "url": None
+            }
+            
+            # Try to find figure URL
+            url_elem = passage.find("infon[@key='url']")
+            if url_elem is not None and url_elem.text:
+                figure["url"] = url_elem.text
+            
+            self._result["figures"].append(figure)
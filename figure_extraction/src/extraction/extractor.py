@@ -1,6 +1,7 @@
 import logging
 import uuid
 import asyncio
+import httpx
 from typing import List, Dict, Any, Optional, Tuple
 
 from src.config.settings import settings
@@ -14,8 +15,8 @@ logger = logging.getLogger(__name__)
 class PaperExtractor:
     """Extract paper metadata from PMC."""
     
-    def __init__(self):
-        self.bioc_client = BioCPMCClient()
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        self.bioc_client = BioCPMCClient(http_client)
     
     async def extract_paper(self, paper_id: str) -> Tuple[Paper, List[Figure]]:
         """
@@ -39,13 +40,14 @@ class PaperExtractor:
             # Get paper structure from BioC-PMC API
             paper_structure = await self.bioc_client.get_paper_structure(normalized_id)
             
-            # Create Paper object
+            # Create Paper object; it is COMPLETED once its entities are stored too,
+            # so a paper whose entity detection never ran is not skipped by later jobs
             paper = Paper(
                 id=normalized_id,
                 title=paper_structure["title"],
                 abstract=paper_structure["abstract"],
                 source="PMC",
-                status=ProcessingStatus.COMPLETED
+                status=ProcessingStatus.PROCESSING
             )
             
             # Create Figure objects
@@ -100,15 +102,30 @@ class PaperExtractor:
         # Extract paper and figures
         paper, figures = await self.extract_paper(paper_id)
         
-        # Store in database
+        # Store in database, with the file opened off the event loop
+        async with queries.db.hold_open():
+            return self._store_paper(paper_id, paper, figures)
+    
+    def _store_paper(self, paper_id: str, paper: Paper, figures: List[Figure]) -> Paper:
+        """Store an extracted paper, or only its failed status if nothing was extracted."""
         session = queries.db.get_session()
         try:
-            # Store paper
-            stored_paper = queries.create_paper(paper, session)
+            if paper.status == ProcessingStatus.FAILED:
+                # Nothing was extracted, so figures and entities stored by an earlier
+                # extraction are kept; only the paper is marked failed
+                stored_paper = queries.update_paper_status(
+                    paper.id,
+                    ProcessingStatus.FAILED,
+                    error_message=paper.error_message,
+                    session=session
+                )
+                if stored_paper is None:
+                    stored_paper = queries.create_paper(paper, session)
+                
+                return stored_paper
             
-            # Store figures
-            for figure in figures:
-                queries.create_figure(figure, session)
+            # Store paper and figures in a single transaction
+            stored_paper = queries.upsert_paper_with_children(paper, figures, session=session)
             
             return stored_paper
         except Exception as e:
@@ -0,0 +1,272 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.config.settings import settings
+from src.storage.database import db, Database
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Star schema created in the analytics database
+SCHEMA_PATH = Path(__file__).resolve().parents[2] / "duckdb_schema.sql"
+
+# Name of the watermark row in etl_state
+ETL_NAME = "star_schema"
+
+# Facts of the papers in etl_changed, with entities deduplicated into dimension keys.
+# An entity is identified by its type plus its external ID, or its lower-cased
+# text when PubTator gave no ID.
+CHANGED_ENTITIES_SQL = """
+CREATE TEMP TABLE etl_entities AS
+SELECT
+    e.figure_id,
+    f.paper_id,
+    e.start_position,
+    e.end_position,
+    e.entity_text,
+    lower(CAST(e.entity_type AS VARCHAR)) AS entity_type,
+    nullif(e.external_id, '') AS external_id,
+    md5(lower(CAST(e.entity_type AS VARCHAR)) || '|' || coalesce(nullif(e.external_id, ''), lower(e.entity_text))) AS entity_id
+FROM entities e
+JOIN figures f ON f.id = e.figure_id
+JOIN etl_changed c ON c.paper_id = f.paper_id
+"""
+
+STAR_SCHEMA_SQL = [
+    # Entities the changed papers referenced before this sync; only these can be
+    # left without facts, and only their types and the new ones need new statistics
+    """
+    CREATE TEMP TABLE etl_old_entities AS
+    SELECT DISTINCT fe.entity_id, e.entity_type
+    FROM analytics.figure_entities fe
+    JOIN analytics.figures f ON f.figure_id = fe.figure_id
+    JOIN analytics.entities e ON e.entity_id = fe.entity_id
+    WHERE f.paper_id IN (SELECT paper_id FROM etl_changed)
+    """,
+    """
+    CREATE TEMP TABLE etl_changed_types AS
+    SELECT entity_type FROM etl_old_entities
+    UNION
+    SELECT entity_type FROM etl_entities
+    """,
+    # Drop the facts of changed papers; their figures may have been replaced
+    """
+    DELETE FROM analytics.figure_entities WHERE figure_id IN (
+        SELECT figure_id FROM analytics.figures WHERE paper_id IN (SELECT paper_id FROM etl_changed)
+    )
+    """,
+    """
+    DELETE FROM analytics.entity_cooccurrences WHERE figure_id IN (
+        SELECT figure_id FROM analytics.figures WHERE paper_id IN (SELECT paper_id FROM etl_changed)
+    )
+    """,
+    "DELETE FROM analytics.paper_entities WHERE paper_id IN (SELECT paper_id FROM etl_changed)",
+    "DELETE FROM analytics.figures WHERE paper_id IN (SELECT paper_id FROM etl_changed)",
+    # Dimensions
+    """
+    INSERT OR REPLACE INTO analytics.papers
+    SELECT p.id, p.title, p.abstract, p.processed_date, p.source, lower(CAST(p.status AS VARCHAR))
+    FROM papers p JOIN etl_changed c ON c.paper_id = p.id
+    """,
+    """
+    INSERT INTO analytics.figures
+    SELECT f.id, f.paper_id, f.figure_number, f.caption, f.url
+    FROM figures f JOIN etl_changed c ON c.paper_id = f.paper_id
+    """,
+    """
+    INSERT INTO analytics.entities
+    SELECT entity_id, min(entity_text), any_value(entity_type), any_value(external_id)
+    FROM etl_entities
+    GROUP BY entity_id
+    ON CONFLICT DO NOTHING
+    """,
+    # Facts
+    """
+    INSERT INTO analytics.figure_entities
+    SELECT figure_id, entity_id, start_position, max(end_position)
+    FROM etl_entities
+    GROUP BY figure_id, entity_id, start_position
+    """,
+    # Distance is the number of characters between the closest pair of mentions, 0 when they overlap
+    """
+    INSERT INTO analytics.entity_cooccurrences
+    SELECT
+        a.figure_id,
+        a.entity_id,
+        b.entity_id,
+        any_value(a.entity_type),
+        any_value(b.entity_type),
+        min(greatest(0, greatest(a.start_position, b.start_position) - least(a.end_position, b.end_position)))
+    FROM etl_entities a
+    JOIN etl_entities b ON b.figure_id = a.figure_id AND b.entity_id <> a.entity_id
+    GROUP BY a.figure_id, a.entity_id, b.entity_id
+    """,
+    """
+    INSERT INTO analytics.paper_entities
+    SELECT paper_id, entity_id, count(*)
+    FROM etl_entities
+    GROUP BY paper_id, entity_id
+    """,
+    # Dimension rows no longer referenced by any fact
+    """
+    DELETE FROM analytics.entities
+    WHERE entity_id IN (SELECT entity_id FROM etl_old_entities)
+    AND entity_id NOT IN (
+        SELECT entity_id FROM analytics.figure_entities
+        WHERE entity_id IN (SELECT entity_id FROM etl_old_entities)
+    )
+    """,
+    # Statistics are aggregated from the facts, not from the raw entity table
+    "DELETE FROM analytics.entity_statistics WHERE entity_type IN (SELECT entity_type FROM etl_changed_types)",
+    """
+    INSERT INTO analytics.entity_statistics
+    WITH type_counts AS (
+        SELECT
+            e.entity_type,
+            count(DISTINCT e.entity_id) AS entity_count,
+            count(DISTINCT fe.figure_id) AS figure_count,
+            count(DISTINCT f.paper_id) AS paper_count
+        FROM analytics.figure_entities fe
+        JOIN analytics.entities e ON e.entity_id = fe.entity_id
+        JOIN analytics.figures f ON f.figure_id = fe.figure_id
+        WHERE e.entity_type IN (SELECT entity_type FROM etl_changed_types)
+        GROUP BY e.entity_type
+    ),
+    entity_figures AS (
+        SELECT e.entity_type, e.entity_text, count(DISTINCT fe.figure_id) AS figure_count
+        FROM analytics.figure_entities fe
+        JOIN analytics.entities e ON e.entity_id = fe.entity_id
+        WHERE e.entity_type IN (SELECT entity_type FROM etl_changed_types)
+        GROUP BY e.entity_type, e.entity_id, e.entity_text
+    ),
+    top_entities AS (
+        SELECT entity_type, CAST(to_json(list(entity_text ORDER BY figure_count DESC, entity_text)[1:10]) AS VARCHAR) AS top_entities
+        FROM entity_figures
+        GROUP BY entity_type
+    )
+    SELECT t.entity_type, t.entity_count, t.figure_count, t.paper_count, top.top_entities
+    FROM type_counts t JOIN top_entities top ON top.entity_type = t.entity_type
+    """,
+]
+
+# Emptied before a full rebuild
+STAR_SCHEMA_TABLES = [
+    "entity_statistics", "paper_entities", "entity_cooccurrences", "figure_entities", "entities", "figures", "papers"
+]
+
+class AnalyticsSync:
+    """
+    Incrementally sync the operational store into the analytics star schema.
+    
+    The analytics database (duckdb_schema.sql) is attached to the operational
+    connection, and every step runs as set-based SQL inside DuckDB. Only papers
+    whose updated_at is past the stored watermark are re-synced: their facts are
+    deleted and rebuilt, so re-extracted papers replace their old rows.
+    
+    updated_at is stamped when a paper is written, not when the write commits,
+    so papers within settings.storage.analytics_sync_overlap seconds before the
+    watermark are synced again. Rebuilding a paper's rows is idempotent, so this
+    only costs time. Orphaned entities and entity statistics are only
+    recomputed for the entities and entity types of the synced papers.
+    """
+    
+    def __init__(self, database: Optional[Database] = None, analytics_path: Optional[str] = None):
+        self.database = database or db
+        self.analytics_path = analytics_path or settings.storage.analytics_path
+        # One sync at a time: all of them attach the same file under the same alias
+        self._lock = threading.Lock()
+    
+    def _create_schema(self, connection):
+        operational = connection.execute("SELECT current_database()").fetchone()[0]
+        connection.execute("USE analytics")
+        try:
+            for statement in SCHEMA_PATH.read_text().split(";"):
+                if statement.strip():
+                    connection.execute(statement)
+        finally:
+            connection.execute(f'USE "{operational}"')
+    
+    def run(self, full: bool = False) -> Dict[str, int]:
+        """
+        Sync papers changed since the last watermark.
+        
+        Args:
+            full: Rebuild the star schema from scratch instead of syncing changes
+        
+        Returns:
+            The number of papers synced and the analytics row counts
+        """
+        with self._lock:
+            Path(self.analytics_path).parent.mkdir(parents=True, exist_ok=True)
+            
+            raw_connection = self.database.engine.raw_connection()
+            connection = raw_connection.driver_connection
+            escaped_path = self.analytics_path.replace("'", "''")
+            connection.execute(f"ATTACH '{escaped_path}' AS analytics")
+            try:
+                self._create_schema(connection)
+                return self._sync(connection, full)
+            finally:
+                for table in ("etl_changed_types", "etl_old_entities", "etl_entities"):
+                    connection.execute(f"DROP TABLE IF EXISTS {table}")
+                connection.execute("DROP TABLE IF EXISTS etl_changed")
+                connection.execute("DETACH analytics")
+                raw_connection.close()
+    
+    def _sync(self, connection, full: bool) -> Dict[str, int]:
+        connection.execute("BEGIN TRANSACTION")
+        try:
+            row = connection.execute(
+                "SELECT watermark FROM analytics.etl_state WHERE name = ?", [ETL_NAME]
+            ).fetchone()
+            watermark = None if full or row is None else row[0]
+            # Read in the sync's snapshot, so writes committed during the sync go to the next run
+            new_watermark = connection.execute("SELECT max(updated_at) FROM papers").fetchone()[0]
+            
+            if full:
+                for table in STAR_SCHEMA_TABLES:
+                    connection.execute(f"DELETE FROM analytics.{table}")
+            
+            if watermark is None:
+                connection.execute(
+                    "CREATE TEMP TABLE etl_changed AS SELECT id AS paper_id FROM papers WHERE updated_at <= ? OR updated_at IS NULL",
+                    [new_watermark]
+                )
+            else:
+                connection.execute(
+                    "CREATE TEMP TABLE etl_changed AS SELECT id AS paper_id FROM papers WHERE updated_at > ?",
+                    [watermark - timedelta(seconds=settings.storage.analytics_sync_overlap)]
+                )
+            changed_papers = connection.execute("SELECT count(*) FROM etl_changed").fetchone()[0]
+            
+            if changed_papers or full:
+                connection.execute(CHANGED_ENTITIES_SQL)
+                for statement in STAR_SCHEMA_SQL:
+                    connection.execute(statement)
+            
+            connection.execute(
+                "INSERT OR REPLACE INTO analytics.etl_state VALUES (?, ?, ?)",
+                [ETL_NAME, new_watermark if new_watermark is not None else watermark, datetime.now()]
+            )
+            connection.execute("COMMIT")
+        except Exception as e:
+            connection.execute("ROLLBACK")
+            logger.error(f"Analytics sync failed: {e}")
+            raise
+        
+        counts = {"papers_synced": changed_papers}
+        for table in ("papers", "figures", "entities", "figure_entities", "entity_cooccurrences", "paper_entities"):
+            counts[table] = connection.execute(f"SELECT count(*) FROM analytics.{table}").fetchone()[0]
+        
+        logger.info(f"Analytics sync: {changed_papers} papers synced into {self.analytics_path}")
+        return counts
+
+# Create singleton instance
+analytics_sync = AnalyticsSync()
+
+def get_analytics_sync() -> AnalyticsSync:
+    """Get analytics sync instance."""
+    return analytics_sync
@@ -0,0 +1,369 @@
+import re
+import math
+import time
+import logging
+import threading
+from typing import List, Dict, Optional, Tuple
+
+from sqlalchemy import text, bindparam
+from sqlalchemy.orm import Session
+
+from src.storage.database import db
+from src.storage.models import Figure, EntityType
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Captions are lower-cased and split on anything that is not a letter or digit,
+# the same way in SQL (indexing) and in Python (queries)
+TOKEN_SPLIT = "[^a-z0-9]+"
+
+# Terms too common to be worth a posting per caption
+STOPWORDS = (
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "it", "of", "on", "or", "that", "the", "this", "to", "was", "were", "with"
+)
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Seconds the caption count and average length are reused between searches;
+# BM25 scores barely move with a few more captions
+COLLECTION_STATS_TTL = 60
+
+# Bit of each entity type in caption_documents.entity_types
+ENTITY_TYPE_BITS = {entity_type: 1 << index for index, entity_type in enumerate(EntityType)}
+
+# DuckDB stores SQLAlchemy enums by member name
+ENTITY_TYPE_BIT_SQL = "CASE CAST(e.entity_type AS VARCHAR) " + " ".join(
+    f"WHEN '{entity_type.name}' THEN {bit}" for entity_type, bit in ENTITY_TYPE_BITS.items()
+) + " ELSE 0 END"
+
+CAPTION_TOKENS_SQL = """
+CREATE TEMP TABLE caption_tokens AS
+SELECT figure_id, term, count(*) AS term_frequency
+FROM (
+    SELECT f.id AS figure_id, unnest(regexp_split_to_array(lower(f.caption), '{split}')) AS term
+    FROM figures f
+    WHERE {figure_filter}
+)
+WHERE term <> '' AND term NOT IN ({stopwords})
+GROUP BY figure_id, term
+""".format(
+    split=TOKEN_SPLIT,
+    stopwords=", ".join(f"'{word}'" for word in STOPWORDS),
+    figure_filter="{figure_filter}"
+)
+
+INDEX_SQL = [
+    # New terms get the next free IDs; their frequencies are added below
+    """
+    INSERT INTO caption_terms (term, term_id, document_frequency)
+    SELECT term, (SELECT coalesce(max(term_id), 0) FROM caption_terms) + row_number() OVER (ORDER BY term), 0
+    FROM (SELECT DISTINCT term FROM caption_tokens)
+    WHERE term NOT IN (SELECT term FROM caption_terms)
+    """,
+    """
+    INSERT INTO caption_documents (figure_id, doc_id, length, entity_types)
+    SELECT
+        f.id,
+        (SELECT coalesce(max(doc_id), 0) FROM caption_documents) + row_number() OVER (ORDER BY f.id),
+        coalesce(l.length, 0),
+        coalesce(t.entity_types, 0)
+    FROM figures f
+    LEFT JOIN (SELECT figure_id, sum(term_frequency) AS length FROM caption_tokens GROUP BY figure_id) l
+        ON l.figure_id = f.id
+    LEFT JOIN (
+        SELECT e.figure_id, bit_or({entity_type_bit}) AS entity_types
+        FROM entities e
+        WHERE e.figure_id IN (SELECT f.id FROM figures f WHERE {figure_filter})
+        GROUP BY e.figure_id
+    ) t ON t.figure_id = f.id
+    WHERE {figure_filter}
+    ORDER BY f.id
+    """,
+    """
+    INSERT INTO caption_postings (term_id, doc_id, term_frequency, doc_length)
+    SELECT t.term_id, d.doc_id, k.term_frequency, d.length
+    FROM caption_tokens k
+    JOIN caption_terms t ON t.term = k.term
+    JOIN caption_documents d ON d.figure_id = k.figure_id
+    ORDER BY t.term_id, d.doc_id
+    """,
+    """
+    UPDATE caption_terms SET document_frequency = caption_terms.document_frequency + n.captions
+    FROM (SELECT term, count(*) AS captions FROM caption_tokens GROUP BY term) n
+    WHERE caption_terms.term = n.term
+    """,
+]
+
+UNINDEX_SQL = [
+    """
+    CREATE TEMP TABLE caption_removed AS
+    SELECT d.doc_id FROM caption_documents d JOIN figures f ON f.id = d.figure_id
+    WHERE {figure_filter}
+    """,
+    """
+    UPDATE caption_terms SET document_frequency = caption_terms.document_frequency - r.captions
+    FROM (
+        SELECT term_id, count(*) AS captions FROM caption_postings
+        WHERE doc_id IN (SELECT doc_id FROM caption_removed)
+        GROUP BY term_id
+    ) r
+    WHERE caption_terms.term_id = r.term_id
+    """,
+    "DELETE FROM caption_postings WHERE doc_id IN (SELECT doc_id FROM caption_removed)",
+    "DELETE FROM caption_documents WHERE doc_id IN (SELECT doc_id FROM caption_removed)",
+]
+
+ENTITY_TYPES_SQL = f"""
+UPDATE caption_documents SET entity_types = t.entity_types
+FROM (
+    SELECT e.figure_id, bit_or({ENTITY_TYPE_BIT_SQL}) AS entity_types
+    FROM entities e
+    WHERE e.figure_id IN :figure_ids
+    GROUP BY e.figure_id
+) t
+WHERE caption_documents.figure_id = t.figure_id
+"""
+
+# (expires at, caption count, average caption length)
+_collection_stats: Optional[Tuple[float, int, float]] = None
+_collection_stats_lock = threading.Lock()
+
+def _get_collection_stats(session: Session) -> Tuple[int, float]:
+    global _collection_stats
+    
+    with _collection_stats_lock:
+        if _collection_stats is not None and _collection_stats[0] > time.monotonic():
+            return _collection_stats[1], _collection_stats[2]
+    
+    caption_count, average_length = session.execute(
+        text("SELECT count(*), avg(length) FROM caption_documents")
+    ).one()
+    average_length = average_length or 1.0
+    
+    with _collection_stats_lock:
+        _collection_stats = (time.monotonic() + COLLECTION_STATS_TTL, caption_count, average_length)
+    return caption_count, average_length
+
+def tokenize(caption: str) -> List[str]:
+    """Split text into index terms, the same way captions are split when indexed."""
+    return [term for term in re.split(TOKEN_SPLIT, caption.lower()) if term and term not in STOPWORDS]
+
+def _figure_filter(figure_ids: Optional[List[str]] = None, paper_id: Optional[str] = None):
+    """Build the WHERE clause (on figures f) and parameters for some figures, one paper, or every figure."""
+    if paper_id is not None:
+        return "f.paper_id = :paper_id", {"paper_id": paper_id}
+    if figure_ids is not None:
+        return "f.id IN :figure_ids", {"figure_ids": list(figure_ids)}
+    return "true", {}
+
+def _execute(session: Session, sql: str, params: Dict):
+    statement = text(sql)
+    if "figure_ids" in params:
+        statement = statement.bindparams(bindparam("figure_ids", expanding=True))
+    session.execute(statement, params)
+
+def index_figures(session: Session, figure_ids: Optional[List[str]] = None, paper_id: Optional[str] = None):
+    """
+    Add captions to the search index within the session's transaction.
+    
+    Args:
+        figure_ids: Figures to index
+        paper_id: Index every figure of this paper instead
+    
+    With neither given, every figure is indexed; callers must make sure none
+    of them is indexed already.
+    """
+    if paper_id is None and figure_ids is not None and not figure_ids:
+        return
+    
+    figure_filter, params = _figure_filter(figure_ids, paper_id)
+    _execute(session, CAPTION_TOKENS_SQL.format(figure_filter=figure_filter), params)
+    try:
+        for statement in INDEX_SQL:
+            _execute(
+                session,
+                statement.format(figure_filter=figure_filter, entity_type_bit=ENTITY_TYPE_BIT_SQL),
+                params if "{figure_filter}" in statement else {}
+            )
+    finally:
+        session.execute(text("DROP TABLE IF EXISTS caption_tokens"))
+
+def unindex_figures(session: Session, figure_ids: Optional[List[str]] = None, paper_id: Optional[str] = None):
+    """
+    Remove captions from the search index within the session's transaction.
+    
+    Call before the figures themselves are deleted. Terms left with no
+    captions stay in caption_terms until the index is rebuilt.
+    """
+    if paper_id is None and not figure_ids:
+        return
+    
+    figure_filter, params = _figure_filter(figure_ids, paper_id)
+    try:
+        for statement in UNINDEX_SQL:
+            _execute(
+                session,
+                statement.format(figure_filter=figure_filter),
+                params if "{figure_filter}" in statement else {}
+            )
+    finally:
+        session.execute(text("DROP TABLE IF EXISTS caption_removed"))
+
+def update_entity_types(session: Session, figure_ids: List[str]):
+    """Recompute the entity type bits of indexed figures after their entities changed."""
+    if figure_ids:
+        _execute(session, ENTITY_TYPES_SQL, {"figure_ids": list(figure_ids)})
+
+def rebuild_caption_index(session: Optional[Session] = None) -> Dict[str, int]:
+    """
+    Rebuild the caption search index from every stored figure.
+    
+    A rebuild also compacts the index: incremental updates append postings in
+    small sorted runs, which DuckDB's zone maps skip less effectively.
+    
+    Returns:
+        The number of captions and distinct terms indexed
+    """
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        for table in ("caption_postings", "caption_documents", "caption_terms"):
+            session.execute(text(f"DELETE FROM {table}"))
+        session.commit()
+        
+        index_figures(session)
+        session.commit()
+        
+        captions = session.execute(text("SELECT count(*) FROM caption_documents")).scalar()
+        terms = session.execute(text("SELECT count(*) FROM caption_terms")).scalar()
+        return {"captions": captions, "terms": terms}
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error rebuilding caption index: {e}")
+        raise
+    finally:
+        if close_session:
+            session.close()
+
+def search_captions(
+    query: str,
+    entity_types: Optional[List[EntityType]] = None,
+    limit: int = 20,
+    offset: int = 0,
+    session: Optional[Session] = None
+) -> List[Tuple[Figure, float]]:
+    """
+    Rank captions containing every term of a query by BM25.
+    
+    Args:
+        query: Free text; it is tokenized like the captions
+        entity_types: Only figures mentioning all of these entity types
+        limit: Maximum number of results
+        offset: Number of results to skip
+    
+    Returns:
+        (figure, score) pairs, best match first
+    """
+    terms = sorted(set(tokenize(query)))
+    if not terms:
+        return []
+    
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        term_params = {f"term_{index}": term for index, term in enumerate(terms)}
+        term_rows = session.execute(
+            text(
+                "SELECT term_id, document_frequency FROM caption_terms WHERE "
+                + " OR ".join(f"term = :{name}" for name in term_params)
+            ),
+            term_params
+        ).fetchall()
+        # Every term must match, so one unknown term means no results
+        if len(term_rows) < len(terms) or any(row.document_frequency <= 0 for row in term_rows):
+            return []
+        
+        caption_count, average_length = _get_collection_stats(session)
+        
+        params = {
+            "k1": BM25_K1,
+            "b": BM25_B,
+            "average_length": average_length,
+            "term_count": len(term_rows),
+            "limit": limit,
+            "offset": offset
+        }
+        idf_cases = []
+        term_filters = []
+        for index, row in enumerate(term_rows):
+            params[f"term_id_{index}"] = row.term_id
+            params[f"idf_{index}"] = math.log(
+                1 + (caption_count - row.document_frequency + 0.5) / (row.document_frequency + 0.5)
+            )
+            idf_cases.append(f"WHEN :term_id_{index} THEN :idf_{index}")
+            # Equality predicates, unlike IN with a list parameter, let DuckDB prune row groups
+            term_filters.append(f"p.term_id = :term_id_{index}")
+        
+        scored_sql = f"""
+            WITH scored AS (
+                SELECT
+                    p.doc_id,
+                    sum(
+                        (CASE p.term_id {' '.join(idf_cases)} END) * p.term_frequency * (:k1 + 1)
+                        / (p.term_frequency + :k1 * (1 - :b + :b * p.doc_length / :average_length))
+                    ) AS score
+                FROM caption_postings p
+                WHERE {' OR '.join(term_filters)}
+                GROUP BY p.doc_id
+                HAVING count(*) = :term_count
+            )
+        """
+        
+        mask = 0
+        for entity_type in entity_types or []:
+            mask |= ENTITY_TYPE_BITS[entity_type]
+        
+        if mask:
+            params["mask"] = mask
+            candidates_sql = """
+                , candidates AS (
+                    SELECT s.doc_id, s.score
+                    FROM scored s JOIN caption_documents d ON d.doc_id = s.doc_id
+                    WHERE d.entity_types & :mask = :mask
+                )
+            """
+        else:
+            candidates_sql = ", candidates AS (SELECT doc_id, score FROM scored)"
+        
+        # Figures are loaded for the requested page only, through the doc_id and figure ID indexes
+        sql = scored_sql + candidates_sql + """
+            , page AS (
+                SELECT doc_id, score FROM candidates ORDER BY score DESC, doc_id LIMIT :limit OFFSET :offset
+            )
+            SELECT f.id, f.paper_id, f.figure_number, f.caption, f.url, page.score
+            FROM page
+            JOIN caption_documents d ON d.doc_id = page.doc_id
+            JOIN figures f ON f.id = d.figure_id
+            ORDER BY page.score DESC, page.doc_id
+        """
+        
+        return [
+            (
+                Figure(id=row.id, paper_id=row.paper_id, figure_number=row.figure_number, caption=row.caption, url=row.url),
+                row.score
+            )
+            for row in session.execute(text(sql), params)
+        ]
+    finally:
+        if close_session:
+            session.close()
@@ -1,16 +1,24 @@
 import os
+import time
 import uuid
+import asyncio
 import logging
+import threading
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Union, Type, TypeVar
+from typing import AsyncIterator, List, Dict, Any, Optional, Union, Type, TypeVar
 
 import duckdb
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, ForeignKey, Text, Enum
+from sqlalchemy import create_engine, event, text, Column, String, Integer, BigInteger, DateTime, ForeignKey, Text, Enum, Index
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship, Session
+from sqlalchemy.pool import NullPool
+from sqlalchemy.schema import CreateIndex
 
 from src.config.settings import settings
+from src.core.job_queue import job_queue
 from src.storage.models import Paper, Figure, Entity, Job, ProcessingStatus, JobType, EntityType
 
 # Set up logging
@@ -30,6 +38,10 @@ class PaperModel(Base):
     source = Column(String, default="PMC")
     status = Column(Enum(ProcessingStatus), default=ProcessingStatus.PENDING)
     error_message = Column(Text, nullable=True)
+    # Bumped whenever the paper, its figures or its entities change; the analytics
+    # sync uses it as its watermark. Not indexed: DuckDB rejects updates to indexed
+    # columns of rows that other tables reference.
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     
     figures = relationship("FigureModel", back_populates="paper", cascade="all, delete-orphan")
 
@@ -37,7 +49,7 @@ class FigureModel(Base):
     __tablename__ = "figures"
     
     id = Column(String, primary_key=True)
-    paper_id = Column(String, ForeignKey("papers.id"), nullable=False)
+    paper_id = Column(String, ForeignKey("papers.id"), nullable=False, index=True)
     figure_number = Column(Integer, nullable=False)
     caption = Column(Text, nullable=False)
     url = Column(String, nullable=True)
@@ -47,9 +59,13 @@ class FigureModel(Base):
 
 class EntityModel(Base):
     __tablename__ = "entities"
+    __table_args__ = (
+        # Serves the "figures with an entity of type X" semi-join in list_figures
+        Index("ix_entities_entity_type_figure_id", "entity_type", "figure_id"),
+    )
     
     id = Column(String, primary_key=True)
-    figure_id = Column(String, ForeignKey("figures.id"), nullable=False)
+    figure_id = Column(String, ForeignKey("figures.id"), nullable=False, index=True)
     entity_text = Column(String, nullable=False)
     entity_type = Column(Enum(EntityType), nullable=False)
     start_position = Column(Integer, nullable=False)
@@ -58,6 +74,72 @@ class EntityModel(Base):
     
     figure = relationship("FigureModel", back_populates="entities")
 
+class EntityCooccurrenceModel(Base):
+    """
+    Number of figures in which two entities appear together, kept up to date as
+    entities are stored. Each pair is stored in both directions so a lookup only
+    needs entity_a. Entities are identified by their entity key (see
+    queries.ENTITY_KEY_SQL).
+    """
+    __tablename__ = "entity_cooccurrence_counts"
+    __table_args__ = (
+        # Serves the top-K lookup for one entity
+        Index("ix_entity_cooccurrence_counts_entity_a", "entity_a"),
+    )
+    
+    entity_a = Column(String, primary_key=True)
+    entity_b = Column(String, primary_key=True)
+    entity_b_text = Column(String, nullable=False)
+    entity_b_type = Column(String, nullable=False)
+    cooccurrence_count = Column(Integer, nullable=False)
+    # Character gap between the closest mentions, over the figures counted
+    min_distance = Column(Integer, nullable=False)
+    total_distance = Column(BigInteger, nullable=False)
+
+class CaptionTermModel(Base):
+    """A term of the caption search index and the number of captions containing it."""
+    __tablename__ = "caption_terms"
+    __table_args__ = (
+        # New terms take the next IDs after max(term_id), so two indexers running
+        # at once would hand out the same IDs; this makes the second one fail
+        Index("ix_caption_terms_term_id", "term_id", unique=True),
+    )
+    
+    term = Column(String, primary_key=True)
+    term_id = Column(Integer, nullable=False)
+    document_frequency = Column(Integer, nullable=False)
+
+class CaptionDocumentModel(Base):
+    """A figure caption in the search index."""
+    __tablename__ = "caption_documents"
+    __table_args__ = (
+        # Resolves a page of search hits to figures with index lookups
+        Index("ix_caption_documents_doc_id", "doc_id", unique=True),
+    )
+    
+    figure_id = Column(String, primary_key=True)
+    doc_id = Column(Integer, nullable=False)
+    # Number of indexed terms in the caption
+    length = Column(Integer, nullable=False)
+    # Bit set of the entity types mentioned in the figure (see caption_index.ENTITY_TYPE_BITS)
+    entity_types = Column(Integer, nullable=False, default=0)
+
+class CaptionPostingModel(Base):
+    """
+    One term occurring in one caption. The caption length is repeated here so
+    BM25 scoring never has to join the documents table.
+    """
+    __tablename__ = "caption_postings"
+    # No key or index in the database: an ART over tens of millions of postings
+    # would have to fit in memory. Postings are written sorted by term_id, so
+    # DuckDB's zone maps skip straight to the row groups of the queried terms.
+    __mapper_args__ = {"primary_key": ["term_id", "doc_id"]}
+    
+    term_id = Column(Integer, nullable=False)
+    doc_id = Column(Integer, nullable=False)
+    term_frequency = Column(Integer, nullable=False)
+    doc_length = Column(Integer, nullable=False)
+
 class JobModel(Base):
     __tablename__ = "jobs"
     
@@ -66,18 +148,119 @@ class JobModel(Base):
     status = Column(Enum(ProcessingStatus), default=ProcessingStatus.PENDING)
     created_at = Column(DateTime, default=datetime.now)
     completed_at = Column(DateTime, nullable=True)
-    paper_ids = Column(Text, nullable=False)  # Stored as JSON
+    # The papers themselves are in job_papers, so reading a job costs the same whatever its size
     total_papers = Column(Integer, nullable=False)
     processed_papers = Column(Integer, default=0)
     failed_papers = Column(Integer, default=0)
 
+class JobPaperModel(Base):
+    """
+    The papers of a job and the progress of each. A paper is COMPLETED once its
+    figures and their entities are stored, so a job that stopped halfway resumes
+    with the papers that are not.
+    """
+    __tablename__ = "job_papers"
+    
+    job_id = Column(String, primary_key=True)
+    paper_id = Column(String, primary_key=True)
+    status = Column(Enum(ProcessingStatus), nullable=False, default=ProcessingStatus.PENDING)
+    error_message = Column(Text, nullable=True)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+# SQL expressions that fill columns added by _ensure_columns for existing rows
+COLUMN_BACKFILLS = {
+    ("papers", "updated_at"): "processed_date",
+}
+
+# Fills job_papers from the JSON paper_ids column of jobs created by older versions
+JOB_PAPER_IDS_MIGRATION_SQL = """
+INSERT OR IGNORE INTO job_papers (job_id, paper_id, status, updated_at)
+SELECT m.job_id, m.paper_id, CASE WHEN p.status = 'COMPLETED' THEN 'COMPLETED' ELSE 'PENDING' END, now()
+FROM (
+    SELECT j.id AS job_id, unnest(from_json(j.paper_ids, '["VARCHAR"]')) AS paper_id
+    FROM jobs j
+    WHERE NOT EXISTS (SELECT 1 FROM job_papers jp WHERE jp.job_id = j.id)
+) m
+LEFT JOIN papers p ON p.id = m.paper_id
+"""
+
+# Raised by DuckDB when another process holds the database file
+LOCK_CONFLICT_MESSAGE = "Could not set lock on file"
+
 class Database:
     def __init__(self):
         self.db_path = settings.storage.duckdb_path
         self._ensure_db_directory()
-        self.engine = create_engine(f"duckdb:///{self.db_path}")
+        
+        if settings.storage.duckdb_shared_access:
+            # DuckDB admits one process per file. Without a pool every session opens
+            # the file and closes it when done, so other processes get their turn.
+            self.engine = create_engine(f"duckdb:///{self.db_path}", poolclass=NullPool)
+            event.listen(self.engine, "do_connect", self._connect_when_unlocked)
+            # Connections are opened from worker threads too (see hold_open). DuckDB
+            # fails to open the file while another thread closes its last connection
+            # to it, so opening and closing take turns.
+            self._open_lock = threading.Lock()
+        else:
+            self.engine = create_engine(f"duckdb:///{self.db_path}")
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+    
+    def _connect_when_unlocked(self, dialect, connection_record, cargs, cparams):
+        """Open the database file, waiting while another process holds it."""
+        deadline = time.monotonic() + settings.storage.duckdb_lock_timeout
+        delay = 0.01
+        while True:
+            try:
+                with self._open_lock:
+                    # The dialect consumes its parameters, so give every attempt a fresh copy
+                    connection = dialect.connect(*cargs, **dict(cparams))
+                return self._close_with_lock(connection)
+            except duckdb.IOException as e:
+                if LOCK_CONFLICT_MESSAGE not in str(e) or time.monotonic() + delay > deadline:
+                    raise
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+    
+    def _close_with_lock(self, connection):
+        close = connection.close
         
+        def close_with_lock():
+            with self._open_lock:
+                close()
+        
+        connection.close = close_with_lock
+        return connection
+    
+    @asynccontextmanager
+    async def hold_open(self) -> AsyncIterator[None]:
+        """
+        Keep the database file open for the duration of a block of database work
+        in async code.
+        
+        With shared access, opening the file waits while another process holds
+        it, which would stall the event loop. The file is opened here in a worker
+        thread instead, and sessions opened inside the block connect right away,
+        since DuckDB shares an open file between the connections of a process.
+        """
+        if not settings.storage.duckdb_shared_access:
+            yield
+            return
+        
+        opening = asyncio.ensure_future(asyncio.to_thread(self.engine.raw_connection))
+        try:
+            connection = await asyncio.shield(opening)
+        except asyncio.CancelledError:
+            # Close the file once the thread has opened it, so it is not held forever
+            opening.add_done_callback(
+                lambda done: not done.cancelled() and done.exception() is None and done.result().close()
+            )
+            raise
+        
+        try:
+            yield
+        finally:
+            connection.close()
+    
     def _ensure_db_directory(self):
         """Ensure the database directory exists."""
         db_dir = Path(self.db_path).parent
@@ -86,8 +269,138 @@ class Database:
     def initialize(self):
         """Initialize the database schema."""
         Base.metadata.create_all(self.engine)
+        self._ensure_columns()
+        self._ensure_enum_members()
+        self._move_job_paper_ids()
+        self._build_missing_indexes()
+        self._ensure_indexes()
         logger.info(f"Database initialized at {self.db_path}")
     
+    def _ensure_columns(self):
+        """Add columns missing from databases created by older versions."""
+        with self.engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                # SQLAlchemy's PostgreSQL-flavoured reflection fails on DuckDB, so ask DuckDB directly
+                existing = set(conn.execute(
+                    text("SELECT column_name FROM duckdb_columns() WHERE database_name = current_database() AND table_name = :table"),
+                    {"table": table.name}
+                ).scalars())
+                for column in table.columns:
+                    if column.name in existing:
+                        continue
+                    
+                    column_type = column.type.compile(dialect=conn.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                    logger.info(f"Added column {table.name}.{column.name}")
+                    
+                    backfill = COLUMN_BACKFILLS.get((table.name, column.name))
+                    if backfill is not None:
+                        conn.execute(text(f"UPDATE {table.name} SET {column.name} = {backfill}"))
+    
+    def _ensure_enum_members(self):
+        """Add enum members missing from the ENUM columns of databases created by older versions."""
+        with self.engine.connect() as conn:
+            columns = conn.execute(text(
+                "SELECT table_name, column_name, data_type FROM duckdb_columns() "
+                "WHERE database_name = current_database() AND data_type LIKE 'ENUM(%'"
+            )).all()
+        
+        for table_name, column_name, data_type in columns:
+            table = Base.metadata.tables.get(table_name)
+            if table is None or column_name not in table.columns:
+                continue
+            
+            column = table.columns[column_name]
+            try:
+                with self.engine.begin() as conn:
+                    stored = set(conn.execute(text(f"SELECT unnest(enum_range(NULL::{data_type}))")).scalars())
+                    if stored >= set(column.type.enums):
+                        continue
+                    
+                    # The column's named type cannot gain values, so switch the column to
+                    # an inline ENUM with every member
+                    members = ", ".join(f"'{member}'" for member in column.type.enums)
+                    conn.execute(text(f"ALTER TABLE {table_name} ALTER COLUMN {column_name} TYPE ENUM({members})"))
+                    logger.info(f"Added members to enum column {table_name}.{column_name}")
+            except DBAPIError as e:
+                if not isinstance(e.orig, duckdb.DependencyException):
+                    raise
+                # DuckDB cannot alter tables referenced by foreign keys. This only
+                # matters if rows of the table take one of the new members, and
+                # papers, the one such table, never become CANCELLED.
+                logger.debug(f"Cannot add members to enum column {table_name}.{column_name}")
+    
+    def _move_job_paper_ids(self):
+        """
+        Move the paper IDs that older versions stored as a JSON list on each job
+        into job_papers, and drop the list. Those versions ran jobs without the
+        job queue, so their unfinished jobs are queued for the workers.
+        """
+        with self.engine.begin() as conn:
+            has_column = conn.execute(text(
+                "SELECT count(*) FROM duckdb_columns() WHERE database_name = current_database() "
+                "AND table_name = 'jobs' AND column_name = 'paper_ids'"
+            )).scalar()
+            if not has_column:
+                return
+            
+            # Jobs that already have job_papers rows were checkpointed there; for the
+            # others, papers already COMPLETED need not run again
+            moved = conn.execute(text(JOB_PAPER_IDS_MIGRATION_SQL)).scalar()
+            
+            # Queued before the column is dropped, so a failed migration is retried
+            # in full; enqueue ignores jobs that are already queued
+            unfinished = conn.execute(text(
+                "SELECT id, job_type FROM jobs WHERE status IN (:pending, :processing) ORDER BY created_at"
+            ), {"pending": ProcessingStatus.PENDING.name, "processing": ProcessingStatus.PROCESSING.name}).fetchall()
+            queued = 0
+            for job_id, job_type in unfinished:
+                if job_queue.get(job_id) is None:
+                    job_queue.enqueue(job_id, JobType[job_type].value)
+                    queued += 1
+            
+            conn.execute(text("ALTER TABLE jobs DROP COLUMN paper_ids"))
+            logger.info(f"Moved {moved or 0} job papers from jobs.paper_ids to job_papers and queued {queued} unfinished jobs")
+    
+    def _build_missing_indexes(self):
+        """
+        Build the derived search indexes for data stored by versions that did not
+        maintain them, or rebuild them where they are inconsistent.
+        """
+        # These modules use the db instance created below
+        from src.storage import caption_index, queries
+        
+        with self.engine.connect() as conn:
+            unindexed = conn.execute(text(
+                "SELECT EXISTS (SELECT 1 FROM figures) AND NOT EXISTS (SELECT 1 FROM caption_documents)"
+            )).scalar()
+            duplicate_term_ids = conn.execute(text(
+                "SELECT count(*) > count(DISTINCT term_id) FROM caption_terms"
+            )).scalar()
+            # Only figures with several entities make pairs, so an empty index is
+            # expected while there are none
+            uncounted = conn.execute(text(
+                "SELECT EXISTS (SELECT 1 FROM entities GROUP BY figure_id HAVING count(*) > 1)"
+                " AND NOT EXISTS (SELECT 1 FROM entity_cooccurrence_counts)"
+            )).scalar()
+        
+        if unindexed or duplicate_term_ids:
+            logger.info("Building the caption search index for existing figures")
+            counts = caption_index.rebuild_caption_index()
+            logger.info(f"Indexed {counts['captions']} captions with {counts['terms']} terms")
+        
+        if uncounted:
+            logger.info("Counting entity co-occurrences for existing entities")
+            pairs = queries.rebuild_cooccurrences()
+            logger.info(f"Counted {pairs} entity co-occurrence pairs")
+    
+    def _ensure_indexes(self):
+        """Create secondary indexes missing from databases created by older versions."""
+        with self.engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+    
     def get_session(self) -> Session:
         """Get a database session."""
         return self.SessionLocal()
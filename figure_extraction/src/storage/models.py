@@ -1,6 +1,6 @@
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
 class ProcessingStatus(str, Enum):
@@ -8,6 +8,7 @@ class ProcessingStatus(str, Enum):
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 class JobType(str, Enum):
     EXTRACTION = "extraction"
@@ -47,13 +48,57 @@ class Entity(BaseModel):
     end_position: int
     external_id: Optional[str] = None
 
+class EntityCooccurrence(BaseModel):
+    entity_key: str
+    entity_text: str
+    entity_type: EntityType
+    cooccurrence_count: int
+    min_distance: int
+    avg_distance: float
+
+class FigurePage(BaseModel):
+    items: List[Figure]
+    next_cursor: Optional[str] = None
+
+class FigureSearchResult(BaseModel):
+    figure: Figure
+    score: float
+
+class EntityPage(BaseModel):
+    items: List[Entity]
+    next_cursor: Optional[str] = None
+
+class StageStats(BaseModel):
+    workers: int
+    processed: int = 0
+    failed: int = 0
+    # Finished by an earlier run of the job
+    skipped: int = 0
+    queued: int = 0
+    elapsed_seconds: float = 0.0
+    items_per_second: float = 0.0
+
+class JobPaper(BaseModel):
+    paper_id: str
+    status: ProcessingStatus = ProcessingStatus.PENDING
+    error_message: Optional[str] = None
+    updated_at: Optional[datetime] = None
+
+class JobPaperPage(BaseModel):
+    items: List[JobPaper]
+    next_cursor: Optional[str] = None
+
 class Job(BaseModel):
     id: str
     job_type: JobType
     status: ProcessingStatus = ProcessingStatus.PENDING
     created_at: datetime = Field(default_factory=datetime.now)
     completed_at: Optional[datetime] = None
-    paper_ids: List[str]
+    # First settings.api.job_paper_ids_limit papers in ID order, filled in by
+    # the API; all of them are listed page by page, see JobPaperPage
+    paper_ids: List[str] = Field(default_factory=list)
     total_papers: int
     processed_papers: int = 0
-    failed_papers: int = 0
\ No newline at end of file
+    failed_papers: int = 0
+    # Per-stage pipeline throughput, kept in memory by the job manager only
+    stages: Dict[str, StageStats] = Field(default_factory=dict)
\ No newline at end of file
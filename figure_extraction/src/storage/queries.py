@@ -1,41 +1,88 @@
-import json
+import os
 import uuid
 import logging
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Union, Type, TypeVar
+from enum import Enum
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Union, Type, TypeVar
 
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, not_
+from sqlalchemy import event, and_, or_, not_, func, insert, select, update, text, bindparam, Enum as SQLEnum
 
-from src.storage.database import db, PaperModel, FigureModel, EntityModel, JobModel
-from src.storage.models import Paper, Figure, Entity, Job, ProcessingStatus, JobType, EntityType
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # Optional: enables the Arrow bulk-insert path and Arrow exports
+    pyarrow = None
+
+from src.storage.database import db, PaperModel, FigureModel, EntityModel, EntityCooccurrenceModel, JobModel, JobPaperModel
+from src.storage.models import Paper, Figure, FigureSearchResult, Entity, EntityCooccurrence, Job, JobPaper, ProcessingStatus, JobType, EntityType
+from src.storage import caption_index
+from src.storage.read_cache import read_cache, PAPER, PAPER_FIGURES, FIGURE_ENTITIES
+from src.storage.stats import mark_stats_changed
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
 # Generic type for Pydantic models
-T = TypeVar('T', Paper, Figure, Entity, Job)
+T = TypeVar('T', Paper, Figure, Entity, Job, JobPaper)
+
+def _model_columns(orm_model: Type[Any], response_model: Type[T]) -> List[Any]:
+    """Columns of orm_model that back the fields of response_model, in field order."""
+    table_columns = orm_model.__table__.columns
+    return [getattr(orm_model, name) for name in response_model.__fields__ if name in table_columns]
+
+# Columns selected by the read helpers
+PAPER_COLUMNS = _model_columns(PaperModel, Paper)
+FIGURE_COLUMNS = _model_columns(FigureModel, Figure)
+ENTITY_COLUMNS = _model_columns(EntityModel, Entity)
+JOB_COLUMNS = _model_columns(JobModel, Job)
+JOB_PAPER_COLUMNS = _model_columns(JobPaperModel, JobPaper)
+
+def _construct(
+    response_model: Type[T],
+    columns: List[Any],
+    rows: Iterable[Any]
+) -> List[T]:
+    """
+    Build response models from selected rows without validating them.
+    
+    Values come straight from typed columns, and enum columns are already decoded
+    to the models' enums, so validation would only re-check them. Skipping it with
+    construct() matters for long lists, where it dominated the read time.
+    
+    Args:
+        response_model: The Pydantic model to build
+        columns: The selected columns, in row order
+        rows: Result rows
+    
+    Returns:
+        One model per row
+    """
+    names = [column.key for column in columns]
+    return [response_model.construct(**dict(zip(names, row))) for row in rows]
 
 def create_paper(paper: Paper, session: Optional[Session] = None) -> Paper:
-    """Create a new paper record."""
+    """Create a paper record, or replace the fields of the paper with the same ID."""
     close_session = False
     if session is None:
         session = db.get_session()
         close_session = True
     
     try:
-        paper_model = PaperModel(
+        paper_model = session.merge(PaperModel(
             id=paper.id,
             title=paper.title,
             abstract=paper.abstract,
             processed_date=paper.processed_date,
             source=paper.source,
             status=paper.status,
-            error_message=paper.error_message
-        )
+            error_message=paper.error_message,
+            updated_at=datetime.now()
+        ))
         
-        session.add(paper_model)
         session.commit()
+        read_cache.invalidate(PAPER, [paper.id])
         session.refresh(paper_model)
         
         return Paper.parse_obj(paper_model.__dict__)
@@ -47,20 +94,23 @@ def create_paper(paper: Paper, session: Optional[Session] = None) -> Paper:
         if close_session:
             session.close()
 
-def get_paper(paper_id: str, session: Optional[Session] = None) -> Optional[Paper]:
-    """Get a paper by ID."""
+def get_paper(paper_id: str, session: Optional[Session] = None, use_cache: bool = True) -> Optional[Paper]:
+    """Get a paper by ID, from the read cache unless a session is given or use_cache is False."""
+    if session is None and use_cache:
+        return read_cache.get_or_load(PAPER, paper_id, lambda: get_paper(paper_id, use_cache=False))
+    
     close_session = False
     if session is None:
         session = db.get_session()
         close_session = True
     
     try:
-        paper_model = session.query(PaperModel).filter(PaperModel.id == paper_id).first()
+        row = session.execute(select(*PAPER_COLUMNS).where(PaperModel.id == paper_id)).first()
         
-        if paper_model is None:
+        if row is None:
             return None
         
-        return Paper.parse_obj(paper_model.__dict__)
+        return _construct(Paper, PAPER_COLUMNS, [row])[0]
     finally:
         if close_session:
             session.close()
@@ -78,14 +128,14 @@ def list_papers(
         close_session = True
     
     try:
-        query = session.query(PaperModel)
+        query = select(*PAPER_COLUMNS)
         
         if status is not None:
-            query = query.filter(PaperModel.status == status)
+            query = query.where(PaperModel.status == status)
         
-        paper_models = query.limit(limit).offset(offset).all()
+        rows = session.execute(query.limit(limit).offset(offset))
         
-        return [Paper.parse_obj(model.__dict__) for model in paper_models]
+        return _construct(Paper, PAPER_COLUMNS, rows)
     finally:
         if close_session:
             session.close()
@@ -113,6 +163,7 @@ def update_paper_status(
             paper_model.error_message = error_message
         
         session.commit()
+        read_cache.invalidate(PAPER, [paper_id])
         session.refresh(paper_model)
         
         return Paper.parse_obj(paper_model.__dict__)
@@ -124,24 +175,80 @@ def update_paper_status(
         if close_session:
             session.close()
 
+def update_papers_status(
+    paper_ids: List[str],
+    status: ProcessingStatus,
+    error_message: Optional[str] = None,
+    session: Optional[Session] = None
+) -> int:
+    """
+    Update the status of several papers in one statement, e.g. those a job finished.
+    
+    Args:
+        paper_ids: The papers to update
+        status: Their new status
+        error_message: Why they failed, kept as is if not given
+        session: Optional database session
+    
+    Returns:
+        The number of papers updated
+    """
+    if not paper_ids:
+        return 0
+    
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        values = {"status": status}
+        if error_message is not None:
+            values["error_message"] = error_message
+        
+        result = session.execute(
+            update(PaperModel).where(PaperModel.id.in_(paper_ids)).values(**values),
+            execution_options={"synchronize_session": False}
+        )
+        session.commit()
+        read_cache.invalidate(PAPER, paper_ids)
+        
+        return result.rowcount
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error updating the status of {len(paper_ids)} papers: {e}")
+        raise
+    finally:
+        if close_session:
+            session.close()
+
 def create_figure(figure: Figure, session: Optional[Session] = None) -> Figure:
-    """Create a new figure record."""
+    """Create a figure record, or replace the fields of the figure with the same ID."""
     close_session = False
     if session is None:
         session = db.get_session()
         close_session = True
     
     try:
-        figure_model = FigureModel(
+        changed_paper_ids = {figure.paper_id}
+        existing = session.get(FigureModel, figure.id)
+        if existing is not None:
+            # The caption may change, so its postings are rebuilt
+            caption_index.unindex_figures(session, [figure.id])
+            changed_paper_ids.add(existing.paper_id)
+        
+        figure_model = session.merge(FigureModel(
             id=figure.id,
             paper_id=figure.paper_id,
             figure_number=figure.figure_number,
             caption=figure.caption,
             url=figure.url
-        )
-        
-        session.add(figure_model)
+        ))
+        session.flush()
+        caption_index.index_figures(session, [figure.id])
+        _touch_papers(session, [figure.paper_id])
         session.commit()
+        read_cache.invalidate(PAPER_FIGURES, changed_paper_ids)
         session.refresh(figure_model)
         
         return Figure.parse_obj(figure_model.__dict__)
@@ -153,17 +260,159 @@ def create_figure(figure: Figure, session: Optional[Session] = None) -> Figure:
         if close_session:
             session.close()
 
-def get_figures_for_paper(paper_id: str, session: Optional[Session] = None) -> List[Figure]:
-    """Get all figures for a paper."""
+def get_figure(figure_id: str, session: Optional[Session] = None) -> Optional[Figure]:
+    """Get a figure by ID."""
     close_session = False
     if session is None:
         session = db.get_session()
         close_session = True
     
     try:
-        figure_models = session.query(FigureModel).filter(FigureModel.paper_id == paper_id).all()
+        row = session.execute(select(*FIGURE_COLUMNS).where(FigureModel.id == figure_id)).first()
+        
+        if row is None:
+            return None
         
-        return [Figure.parse_obj(model.__dict__) for model in figure_models]
+        return _construct(Figure, FIGURE_COLUMNS, [row])[0]
+    finally:
+        if close_session:
+            session.close()
+
+def get_figures_by_ids(figure_ids: List[str], session: Optional[Session] = None) -> List[Figure]:
+    """Get figures by ID, in the order requested. Unknown IDs are skipped."""
+    if not figure_ids:
+        return []
+    
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        rows = session.execute(select(*FIGURE_COLUMNS).where(FigureModel.id.in_(set(figure_ids))))
+        
+        figures_by_id = {figure.id: figure for figure in _construct(Figure, FIGURE_COLUMNS, rows)}
+        return [figures_by_id[figure_id] for figure_id in figure_ids if figure_id in figures_by_id]
+    finally:
+        if close_session:
+            session.close()
+
+def search_figures(
+    query: str,
+    entity_types: Optional[List[EntityType]] = None,
+    limit: int = 20,
+    offset: int = 0,
+    session: Optional[Session] = None
+) -> List[FigureSearchResult]:
+    """
+    Search figure captions, best BM25 match first.
+    
+    Args:
+        query: Free text; every term must appear in the caption
+        entity_types: Only figures mentioning all of these entity types
+        limit: Maximum number of results
+        offset: Number of results to skip
+    
+    Returns:
+        Matching figures with their scores
+    """
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        hits = caption_index.search_captions(query, entity_types, limit, offset, session)
+        
+        return [FigureSearchResult(figure=figure, score=round(score, 4)) for figure, score in hits]
+    finally:
+        if close_session:
+            session.close()
+
+def get_figures_for_paper(paper_id: str, session: Optional[Session] = None, use_cache: bool = True) -> List[Figure]:
+    """Get all figures for a paper, from the read cache unless a session is given or use_cache is False."""
+    if session is None and use_cache:
+        return read_cache.get_or_load(PAPER_FIGURES, paper_id, lambda: get_figures_for_paper(paper_id, use_cache=False))
+    
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        rows = session.execute(select(*FIGURE_COLUMNS).where(FigureModel.paper_id == paper_id))
+        
+        return _construct(Figure, FIGURE_COLUMNS, rows)
+    finally:
+        if close_session:
+            session.close()
+
+def list_figures(
+    limit: int = 100,
+    offset: int = 0,
+    after_id: Optional[str] = None,
+    paper_id: Optional[str] = None,
+    has_entity_type: Optional[EntityType] = None,
+    session: Optional[Session] = None
+) -> List[Figure]:
+    """
+    List figures ordered by ID, optionally restricted to one paper or to figures
+    that mention at least one entity of the given type.
+    
+    Pagination works like list_entities: after_id for keyset pages, offset otherwise.
+    """
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        query = select(*FIGURE_COLUMNS)
+        
+        if paper_id is not None:
+            query = query.where(FigureModel.paper_id == paper_id)
+        
+        if has_entity_type is not None:
+            query = query.where(
+                select(EntityModel.id).where(
+                    EntityModel.figure_id == FigureModel.id,
+                    EntityModel.entity_type == has_entity_type
+                ).exists()
+            )
+        
+        if after_id is not None:
+            query = query.where(FigureModel.id > after_id)
+        
+        query = query.order_by(FigureModel.id).limit(limit)
+        
+        if after_id is None and offset:
+            query = query.offset(offset)
+        
+        rows = session.execute(query)
+        
+        return _construct(Figure, FIGURE_COLUMNS, rows)
+    finally:
+        if close_session:
+            session.close()
+
+def count_entities_for_figures(figure_ids: List[str], session: Optional[Session] = None) -> Dict[str, int]:
+    """Count entities per figure in one query. Figures without entities map to 0."""
+    if not figure_ids:
+        return {}
+    
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        rows = session.query(EntityModel.figure_id, func.count(EntityModel.id)).filter(
+            EntityModel.figure_id.in_(set(figure_ids))
+        ).group_by(EntityModel.figure_id).all()
+        
+        counts = {figure_id: 0 for figure_id in figure_ids}
+        counts.update({figure_id: count for figure_id, count in rows})
+        return counts
     finally:
         if close_session:
             session.close()
@@ -186,8 +435,14 @@ def create_entity(entity: Entity, session: Optional[Session] = None) -> Entity:
             external_id=entity.external_id
         )
         
+        _remove_cooccurrences(session, [entity.figure_id])
         session.add(entity_model)
+        session.flush()
+        _add_cooccurrences(session, [entity.figure_id])
+        caption_index.update_entity_types(session, [entity.figure_id])
+        _touch_papers(session, select(FigureModel.paper_id).where(FigureModel.id == entity.figure_id))
         session.commit()
+        read_cache.invalidate(FIGURE_ENTITIES, [entity.figure_id])
         session.refresh(entity_model)
         
         return Entity.parse_obj(entity_model.__dict__)
@@ -199,23 +454,742 @@ def create_entity(entity: Entity, session: Optional[Session] = None) -> Entity:
         if close_session:
             session.close()
 
-def get_entities_for_figure(figure_id: str, session: Optional[Session] = None) -> List[Entity]:
-    """Get all entities for a figure."""
+def get_entity(entity_id: str, session: Optional[Session] = None) -> Optional[Entity]:
+    """Get an entity by ID."""
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        row = session.execute(select(*ENTITY_COLUMNS).where(EntityModel.id == entity_id)).first()
+        
+        if row is None:
+            return None
+        
+        return _construct(Entity, ENTITY_COLUMNS, [row])[0]
+    finally:
+        if close_session:
+            session.close()
+
+def get_entities_for_figure(figure_id: str, session: Optional[Session] = None, use_cache: bool = True) -> List[Entity]:
+    """Get all entities for a figure, from the read cache unless a session is given or use_cache is False."""
+    if session is None and use_cache:
+        return read_cache.get_or_load(FIGURE_ENTITIES, figure_id, lambda: get_entities_for_figure(figure_id, use_cache=False))
+    
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        rows = session.execute(select(*ENTITY_COLUMNS).where(EntityModel.figure_id == figure_id))
+        
+        return _construct(Entity, ENTITY_COLUMNS, rows)
+    finally:
+        if close_session:
+            session.close()
+
+def _touch_papers(session: Session, paper_ids: Any):
+    """Bump updated_at for papers whose figures or entities changed, so the analytics sync picks them up."""
+    # No session synchronization: it would add a RETURNING clause, and DuckDB treats an
+    # UPDATE ... RETURNING on a referenced row as a foreign key violation
+    session.execute(
+        update(PaperModel).where(PaperModel.id.in_(paper_ids)).values(updated_at=datetime.now()),
+        execution_options={"synchronize_session": False}
+    )
+
+def _figure_row(figure: Figure) -> Dict[str, Any]:
+    return {
+        "id": figure.id,
+        "paper_id": figure.paper_id,
+        "figure_number": figure.figure_number,
+        "caption": figure.caption,
+        "url": figure.url
+    }
+
+def _entity_row(entity: Entity) -> Dict[str, Any]:
+    return {
+        "id": entity.id,
+        "figure_id": entity.figure_id,
+        "entity_text": entity.entity_text,
+        "entity_type": entity.entity_type,
+        "start_position": entity.start_position,
+        "end_position": entity.end_position,
+        "external_id": entity.external_id
+    }
+
+def _bulk_insert(session: Session, model: Type[Any], rows: List[Dict[str, Any]]) -> int:
+    """
+    Insert rows into the model's table within the session's current transaction.
+    
+    With pyarrow installed the rows are handed to DuckDB as a single Arrow table;
+    otherwise they go through one executemany.
+    """
+    if not rows:
+        return 0
+    
+    if pyarrow is None:
+        session.execute(insert(model), rows)
+        return len(rows)
+    
+    # DuckDB stores SQLAlchemy enums by member name
+    columns = list(rows[0].keys())
+    arrow_rows = [
+        {key: value.name if isinstance(value, Enum) else value for key, value in row.items()}
+        for row in rows
+    ]
+    table = pyarrow.Table.from_pylist(arrow_rows)
+    
+    # The raw connection bypasses the session events the statistics cache follows
+    mark_stats_changed(session)
+    view_name = f"_bulk_{model.__tablename__}_{uuid.uuid4().hex}"
+    connection = session.connection().connection.driver_connection
+    connection.register(view_name, table)
+    try:
+        column_list = ", ".join(columns)
+        connection.execute(
+            f"INSERT INTO {model.__tablename__} ({column_list}) SELECT {column_list} FROM {view_name}"
+        )
+    finally:
+        connection.unregister(view_name)
+    
+    return len(rows)
+
+def create_figures_bulk(figures: List[Figure], session: Optional[Session] = None) -> int:
+    """Create many figure records with a single insert and commit. Returns the number created."""
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        count = _bulk_insert(session, FigureModel, [_figure_row(figure) for figure in figures])
+        if count:
+            caption_index.index_figures(session, [figure.id for figure in figures])
+            _touch_papers(session, list({figure.paper_id for figure in figures}))
+        session.commit()
+        read_cache.invalidate(PAPER_FIGURES, {figure.paper_id for figure in figures})
+        
+        return count
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error creating figures: {e}")
+        raise
+    finally:
+        if close_session:
+            session.close()
+
+def create_entities_bulk(entities: List[Entity], session: Optional[Session] = None) -> int:
+    """Create many entity records with a single insert and commit. Returns the number created."""
     close_session = False
     if session is None:
         session = db.get_session()
         close_session = True
     
     try:
-        entity_models = session.query(EntityModel).filter(EntityModel.figure_id == figure_id).all()
+        figure_ids = list({entity.figure_id for entity in entities})
+        _remove_cooccurrences(session, figure_ids)
+        count = _bulk_insert(session, EntityModel, [_entity_row(entity) for entity in entities])
+        if count:
+            _add_cooccurrences(session, figure_ids)
+            caption_index.update_entity_types(session, figure_ids)
+            _touch_papers(session, select(FigureModel.paper_id).where(FigureModel.id.in_(figure_ids)))
+        session.commit()
+        read_cache.invalidate(FIGURE_ENTITIES, figure_ids)
         
-        return [Entity.parse_obj(model.__dict__) for model in entity_models]
+        return count
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error creating entities: {e}")
+        raise
     finally:
         if close_session:
             session.close()
 
-def create_job(job: Job, session: Optional[Session] = None) -> Job:
-    """Create a new job record."""
+def upsert_paper_with_children(
+    paper: Paper,
+    figures: List[Figure],
+    entities: Optional[List[Entity]] = None,
+    session: Optional[Session] = None
+) -> Paper:
+    """
+    Insert or replace a paper together with its figures and entities in one transaction.
+    
+    Figures and entities previously stored for the paper are replaced, so
+    re-extracting a paper does not duplicate them. A figure keeps its ID when the
+    paper is re-extracted with a figure of the same number: its row is updated in
+    place, and entities given for the new figure are stored under the kept ID.
+    
+    DuckDB rejects deleting a row whose referencing rows were deleted in the same
+    transaction. A stored figure that is no longer extracted and still has
+    entities therefore loses its entities, and their co-occurrence counts, in a
+    separate transaction first. That transaction leaves the database consistent
+    on its own: if the upsert then fails, the paper keeps its old figures, with
+    no entities on the dropped ones.
+    """
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        stored_figures = {
+            figure_number: figure_id
+            for figure_id, figure_number in session.execute(
+                select(FigureModel.id, FigureModel.figure_number).where(FigureModel.paper_id == paper.id)
+            )
+        }
+        
+        stored_figure_ids = set(stored_figures.values())
+        # Keep the IDs of figures that are extracted again
+        figure_ids = {}
+        for figure in figures:
+            figure_ids[figure.id] = stored_figures.pop(figure.figure_number, figure.id)
+        dropped_figure_ids = list(stored_figures.values())
+        changed_figure_ids = set(figure_ids.values()) | set(dropped_figure_ids)
+        
+        if dropped_figure_ids:
+            referenced = session.query(EntityModel.figure_id).filter(EntityModel.figure_id.in_(dropped_figure_ids)).first()
+            if referenced is not None:
+                _remove_cooccurrences(session, dropped_figure_ids)
+                session.query(EntityModel).filter(
+                    EntityModel.figure_id.in_(dropped_figure_ids)
+                ).delete(synchronize_session=False)
+                _settle_cooccurrences(session)
+                caption_index.update_entity_types(session, dropped_figure_ids)
+                session.commit()
+                read_cache.invalidate(FIGURE_ENTITIES, dropped_figure_ids)
+        
+        _remove_cooccurrences(session, paper_id=paper.id)
+        caption_index.unindex_figures(session, paper_id=paper.id)
+        session.query(EntityModel).filter(
+            EntityModel.figure_id.in_(select(FigureModel.id).where(FigureModel.paper_id == paper.id))
+        ).delete(synchronize_session=False)
+        
+        if dropped_figure_ids:
+            session.query(FigureModel).filter(
+                FigureModel.id.in_(dropped_figure_ids)
+            ).delete(synchronize_session=False)
+        
+        paper_model = session.merge(PaperModel(
+            id=paper.id,
+            title=paper.title,
+            abstract=paper.abstract,
+            processed_date=paper.processed_date,
+            source=paper.source,
+            status=paper.status,
+            error_message=paper.error_message,
+            updated_at=datetime.now()
+        ))
+        session.flush()
+        
+        figure_rows = [{**_figure_row(figure), "id": figure_ids[figure.id]} for figure in figures]
+        kept_ids = set(figure_ids.values()) & stored_figure_ids
+        # Updated in place: their entities were deleted above, so they cannot be
+        # deleted too. paper_id is left out, as DuckDB turns an update of an
+        # indexed column into a delete.
+        kept_rows = [
+            {key: value for key, value in row.items() if key != "paper_id"}
+            for row in figure_rows if row["id"] in kept_ids
+        ]
+        if kept_rows:
+            session.execute(update(FigureModel), kept_rows)
+        _bulk_insert(session, FigureModel, [row for row in figure_rows if row["id"] not in kept_ids])
+        _bulk_insert(session, EntityModel, [
+            {**_entity_row(entity), "figure_id": figure_ids.get(entity.figure_id, entity.figure_id)}
+            for entity in entities or []
+        ])
+        _add_cooccurrences(session, paper_id=paper.id)
+        caption_index.index_figures(session, paper_id=paper.id)
+        
+        session.commit()
+        read_cache.invalidate(PAPER, [paper.id])
+        read_cache.invalidate(PAPER_FIGURES, [paper.id])
+        read_cache.invalidate(FIGURE_ENTITIES, changed_figure_ids)
+        session.refresh(paper_model)
+        
+        return Paper.parse_obj(paper_model.__dict__)
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error upserting paper {paper.id}: {e}")
+        raise
+    finally:
+        if close_session:
+            session.close()
+
+def list_entities(
+    entity_type: Optional[EntityType] = None,
+    limit: int = 100,
+    offset: int = 0,
+    after_id: Optional[str] = None,
+    session: Optional[Session] = None
+) -> List[Entity]:
+    """
+    List entities ordered by ID, with optional type filtering.
+    
+    Pass the ID of the last entity of the previous page as after_id for keyset
+    pagination; offset is only applied when after_id is not given.
+    """
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        query = select(*ENTITY_COLUMNS)
+        
+        if entity_type is not None:
+            query = query.where(EntityModel.entity_type == entity_type)
+        
+        if after_id is not None:
+            query = query.where(EntityModel.id > after_id)
+        
+        query = query.order_by(EntityModel.id).limit(limit)
+        
+        if after_id is None and offset:
+            query = query.offset(offset)
+        
+        rows = session.execute(query)
+        
+        return _construct(Entity, ENTITY_COLUMNS, rows)
+    finally:
+        if close_session:
+            session.close()
+
+# How an entity is identified across figures: its type plus its external ID, or its
+# lower-cased text when PubTator gave no ID (e.g. "gene:7157" or "disease:cancer")
+ENTITY_KEY_SQL = "lower(CAST(e.entity_type AS VARCHAR)) || ':' || coalesce(nullif(e.external_id, ''), lower(e.entity_text))"
+
+# Co-occurrence counts contributed by a set of figures, aggregated per ordered entity
+# pair. Distance is the number of characters between the closest pair of mentions
+# in a figure, 0 when they overlap.
+COOCCURRENCE_PAIRS_SQL = f"""
+WITH mentions AS (
+    SELECT
+        e.figure_id,
+        {ENTITY_KEY_SQL} AS entity_key,
+        e.entity_text,
+        lower(CAST(e.entity_type AS VARCHAR)) AS entity_type,
+        e.start_position,
+        e.end_position
+    FROM entities e
+    WHERE {{figure_filter}}
+),
+figure_pairs AS (
+    SELECT
+        a.entity_key AS entity_a,
+        b.entity_key AS entity_b,
+        min(b.entity_text) AS entity_b_text,
+        any_value(b.entity_type) AS entity_b_type,
+        min(greatest(0, greatest(a.start_position, b.start_position) - least(a.end_position, b.end_position))) AS distance
+    FROM mentions a
+    JOIN mentions b ON b.figure_id = a.figure_id AND b.entity_key <> a.entity_key
+    GROUP BY a.figure_id, a.entity_key, b.entity_key
+)
+SELECT
+    entity_a,
+    entity_b,
+    min(entity_b_text) AS entity_b_text,
+    any_value(entity_b_type) AS entity_b_type,
+    count(*) AS cooccurrence_count,
+    min(distance) AS min_distance,
+    sum(distance) AS total_distance
+FROM figure_pairs
+GROUP BY entity_a, entity_b
+"""
+
+# Top-K partners of one entity. The CTE keeps the equality filter on its own so DuckDB
+# answers it from the entity_a index; with ORDER BY ... LIMIT in the same query it
+# plans a full scan instead.
+COOCCURRENCE_TOP_K_SQL = """
+WITH partners AS MATERIALIZED (
+    SELECT * FROM entity_cooccurrence_counts WHERE entity_a = :entity_key
+)
+SELECT entity_b, entity_b_text, entity_b_type, cooccurrence_count, min_distance, total_distance
+FROM partners
+WHERE cooccurrence_count > 0
+ORDER BY cooccurrence_count DESC, entity_b
+LIMIT :top_k
+"""
+
+def entity_key(entity: Entity) -> str:
+    """Get the co-occurrence key of an entity mention; matches ENTITY_KEY_SQL."""
+    return f"{entity.entity_type.value}:{entity.external_id or entity.entity_text.lower()}"
+
+def _figure_filter(figure_ids: Optional[List[str]] = None, paper_id: Optional[str] = None):
+    """Build the WHERE clause and parameters selecting the mentions of some figures or of one paper."""
+    if paper_id is not None:
+        return "e.figure_id IN (SELECT id FROM figures WHERE paper_id = :paper_id)", {"paper_id": paper_id}
+    return "e.figure_id IN :figure_ids", {"figure_ids": list(figure_ids)}
+
+def _pairs_statement(sql: str, figure_ids: Optional[List[str]], paper_id: Optional[str]):
+    figure_filter, params = _figure_filter(figure_ids, paper_id)
+    pairs_sql = COOCCURRENCE_PAIRS_SQL.format(figure_filter=figure_filter)
+    statement = text(sql.format(pairs=pairs_sql))
+    if "figure_ids" in params:
+        statement = statement.bindparams(bindparam("figure_ids", expanding=True))
+    return statement, params
+
+# min_distance of the pairs _remove_cooccurrences subtracted from, until
+# _settle_cooccurrences recomputes it from the figures still sharing them
+STALE_MIN_DISTANCE = -1
+
+# Session.info key set while the transaction has pairs with a stale min_distance
+COOCCURRENCES_STALE = "cooccurrences_stale"
+
+@event.listens_for(Session, "after_rollback")
+def _forget_stale_cooccurrences(session: Session):
+    # The stale pairs were rolled back with the rest of the transaction
+    session.info.pop(COOCCURRENCES_STALE, None)
+
+def _add_cooccurrences(session: Session, figure_ids: Optional[List[str]] = None, paper_id: Optional[str] = None):
+    """Add the pairs found in the given figures (or paper) to the co-occurrence index."""
+    if paper_id is None and not figure_ids:
+        return
+    
+    # least() keeps a stale min_distance stale, so it is recomputed below
+    statement, params = _pairs_statement("""
+        INSERT INTO entity_cooccurrence_counts
+        {pairs}
+        ON CONFLICT (entity_a, entity_b) DO UPDATE SET
+            cooccurrence_count = entity_cooccurrence_counts.cooccurrence_count + excluded.cooccurrence_count,
+            min_distance = least(entity_cooccurrence_counts.min_distance, excluded.min_distance),
+            total_distance = entity_cooccurrence_counts.total_distance + excluded.total_distance
+    """, figure_ids, paper_id)
+    session.execute(statement, params)
+    _settle_cooccurrences(session)
+
+def _remove_cooccurrences(session: Session, figure_ids: Optional[List[str]] = None, paper_id: Optional[str] = None):
+    """
+    Subtract the pairs currently stored for the given figures (or paper) from the index.
+    
+    Call before their entities change, then _add_cooccurrences (or
+    _settle_cooccurrences if nothing is added) once they are stored. A minimum
+    cannot be subtracted, so min_distance of these pairs is marked stale and
+    recomputed then.
+    """
+    if paper_id is None and not figure_ids:
+        return
+    
+    statement, params = _pairs_statement(f"""
+        UPDATE entity_cooccurrence_counts AS c SET
+            cooccurrence_count = c.cooccurrence_count - p.cooccurrence_count,
+            min_distance = {STALE_MIN_DISTANCE},
+            total_distance = c.total_distance - p.total_distance
+        FROM ({{pairs}}) AS p
+        WHERE c.entity_a = p.entity_a AND c.entity_b = p.entity_b
+    """, figure_ids, paper_id)
+    session.execute(statement, params)
+    session.info[COOCCURRENCES_STALE] = True
+
+def _settle_cooccurrences(session: Session):
+    """Prune the pairs no figure shares any more and recompute the stale min_distance values."""
+    # Pruned here rather than in _remove_cooccurrences: DuckDB rejects re-inserting
+    # a key deleted earlier in the same transaction
+    session.execute(text("DELETE FROM entity_cooccurrence_counts WHERE cooccurrence_count <= 0"))
+    
+    if not session.info.pop(COOCCURRENCES_STALE, False):
+        return
+    
+    # Only the figures mentioning an entity of a stale pair can hold its minimum
+    figure_filter = (
+        f"e.figure_id IN (SELECT e.figure_id FROM entities e WHERE {ENTITY_KEY_SQL} IN "
+        f"(SELECT entity_a FROM entity_cooccurrence_counts WHERE min_distance = {STALE_MIN_DISTANCE}))"
+    )
+    session.execute(text(f"""
+        UPDATE entity_cooccurrence_counts AS c SET min_distance = p.min_distance
+        FROM ({COOCCURRENCE_PAIRS_SQL.format(figure_filter=figure_filter)}) AS p
+        WHERE c.min_distance = {STALE_MIN_DISTANCE} AND c.entity_a = p.entity_a AND c.entity_b = p.entity_b
+    """))
+
+def rebuild_cooccurrences(session: Optional[Session] = None) -> int:
+    """Rebuild the co-occurrence index from every stored entity. Returns the number of pairs."""
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        session.execute(text("DELETE FROM entity_cooccurrence_counts"))
+        session.commit()
+        
+        session.execute(text(
+            "INSERT INTO entity_cooccurrence_counts " + COOCCURRENCE_PAIRS_SQL.format(figure_filter="true")
+        ))
+        session.commit()
+        
+        return session.query(func.count(EntityCooccurrenceModel.entity_a)).scalar()
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error rebuilding entity co-occurrences: {e}")
+        raise
+    finally:
+        if close_session:
+            session.close()
+
+def get_cooccurrences(key: str, top_k: int = 10, session: Optional[Session] = None) -> List[EntityCooccurrence]:
+    """
+    Get the entities that appear in the most figures together with an entity.
+    
+    Args:
+        key: The entity key (see entity_key)
+        top_k: Maximum number of co-occurring entities to return
+    
+    Returns:
+        Co-occurring entities, most frequent first
+    """
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        rows = session.execute(text(COOCCURRENCE_TOP_K_SQL), {"entity_key": key, "top_k": top_k}).fetchall()
+        
+        return [
+            EntityCooccurrence(
+                entity_key=row.entity_b,
+                entity_text=row.entity_b_text,
+                entity_type=EntityType(row.entity_b_type),
+                cooccurrence_count=row.cooccurrence_count,
+                min_distance=row.min_distance,
+                avg_distance=round(row.total_distance / row.cooccurrence_count, 2)
+            )
+            for row in rows
+        ]
+    finally:
+        if close_session:
+            session.close()
+
+# Models and columns written by the export commands, in output order
+EXPORT_COLUMNS = {
+    "papers": (PaperModel, ["id", "title", "abstract", "processed_date", "source", "status", "error_message"]),
+    "figures": (FigureModel, ["id", "paper_id", "figure_number", "caption", "url"]),
+    "entities": (EntityModel, ["id", "figure_id", "entity_text", "entity_type", "start_position", "end_position", "external_id"])
+}
+
+def stream_rows(data_type: str, chunk_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Stream every row of a table in chunks, straight from the database cursor.
+    
+    Rows are fetched chunk_size at a time, so memory stays constant however
+    large the table is. Enum columns are returned as their values.
+    
+    Args:
+        data_type: Type of data to stream ('papers', 'figures', 'entities')
+        chunk_size: Number of rows per chunk
+        
+    Returns:
+        An iterator of lists of row dictionaries
+    """
+    if data_type not in EXPORT_COLUMNS:
+        raise ValueError(f"Invalid data type: {data_type}")
+    
+    model, column_names = EXPORT_COLUMNS[data_type]
+    columns = [getattr(model, name) for name in column_names]
+    
+    session = db.get_session()
+    try:
+        # No ORDER BY: sorting would make DuckDB materialize the whole result first
+        result = session.execute(select(*columns).execution_options(yield_per=chunk_size))
+        for partition in result.partitions():
+            yield [
+                {
+                    name: value.value if isinstance(value, Enum) else value
+                    for name, value in zip(column_names, row)
+                }
+                for row in partition
+            ]
+    except Exception as e:
+        logger.error(f"Error streaming {data_type}: {e}")
+        raise
+    finally:
+        session.close()
+
+# Partition schemes accepted by export_to_file for Parquet output
+PARTITION_SCHEMES = ("entity_type", "paper_prefix")
+
+def _sql_string(value: str) -> str:
+    """Quote a value as a SQL string literal, for statements that cannot take parameters."""
+    return "'" + value.replace("'", "''") + "'"
+
+def _export_select_sql(data_type: str, partition_by: Optional[str] = None, prefix_length: int = 6) -> str:
+    """Build the SELECT behind a file export, with enums as their lower-case values."""
+    model, column_names = EXPORT_COLUMNS[data_type]
+    table = model.__tablename__
+    
+    select_list = []
+    for name in column_names:
+        # DuckDB stores SQLAlchemy enums by member name; member names are the upper-cased values
+        if isinstance(model.__table__.c[name].type, SQLEnum):
+            select_list.append(f"lower(CAST(t.{name} AS VARCHAR)) AS {name}")
+        else:
+            select_list.append(f"t.{name}")
+    
+    from_clause = f"{table} t"
+    if partition_by == "entity_type":
+        if data_type != "entities":
+            raise ValueError("Partitioning by entity_type is only supported for entities")
+    elif partition_by == "paper_prefix":
+        paper_column = {"papers": "t.id", "figures": "t.paper_id", "entities": "f.paper_id"}[data_type]
+        select_list.append(f"substr({paper_column}, 1, {int(prefix_length)}) AS paper_prefix")
+        if data_type == "entities":
+            from_clause += " JOIN figures f ON f.id = t.figure_id"
+    elif partition_by is not None:
+        raise ValueError(f"Invalid partition scheme: {partition_by}")
+    
+    return f"SELECT {', '.join(select_list)} FROM {from_clause}"
+
+def export_to_file(
+    data_type: str,
+    output_path: str,
+    file_format: str,
+    partition_by: Optional[str] = None,
+    prefix_length: int = 6,
+    session: Optional[Session] = None
+) -> str:
+    """
+    Export a table to a Parquet or Arrow IPC file inside DuckDB.
+    
+    Parquet is written with COPY ... TO and Arrow from DuckDB record batches,
+    so no Python row objects are created. Partitioned Parquet output is a
+    directory of hive-style partitions (e.g. entity_type=gene/).
+    
+    Args:
+        data_type: Type of data to export ('papers', 'figures', 'entities')
+        output_path: Output file, or output directory when partitioning
+        file_format: 'parquet' or 'arrow'
+        partition_by: Optional partition scheme for Parquet ('entity_type' or 'paper_prefix')
+        prefix_length: Number of leading paper ID characters used by 'paper_prefix'
+        
+    Returns:
+        The output path
+    """
+    if data_type not in EXPORT_COLUMNS:
+        raise ValueError(f"Invalid data type: {data_type}")
+    
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        select_sql = _export_select_sql(data_type, partition_by, prefix_length)
+        
+        if file_format == "parquet":
+            options = "FORMAT PARQUET, COMPRESSION ZSTD"
+            if partition_by is not None:
+                options += f", PARTITION_BY ({partition_by}), OVERWRITE_OR_IGNORE TRUE"
+            session.connection().exec_driver_sql(f"COPY ({select_sql}) TO {_sql_string(output_path)} ({options})")
+        elif file_format == "arrow":
+            if partition_by is not None:
+                raise ValueError("Partitioning is only supported for Parquet exports")
+            if pyarrow is None:
+                raise ValueError("Arrow export requires the optional pyarrow package")
+            
+            connection = session.connection().connection.driver_connection
+            reader = connection.execute(select_sql).fetch_record_batch()
+            with pyarrow.ipc.new_file(output_path, reader.schema) as writer:
+                for batch in reader:
+                    writer.write_batch(batch)
+        else:
+            raise ValueError(f"Invalid file format: {file_format}")
+        
+        return output_path
+    except Exception as e:
+        logger.error(f"Error exporting {data_type} to {output_path}: {e}")
+        raise
+    finally:
+        if close_session:
+            session.close()
+
+def _parquet_source(snapshot_dir: str, data_type: str) -> str:
+    """Return the read_parquet() call for one table of a snapshot, plain or partitioned."""
+    single_file = os.path.join(snapshot_dir, f"{data_type}.parquet")
+    if os.path.isfile(single_file):
+        return f"read_parquet({_sql_string(single_file)})"
+    
+    partitioned = os.path.join(snapshot_dir, data_type)
+    if os.path.isdir(partitioned):
+        pattern = os.path.join(partitioned, "**", "*.parquet")
+        return f"read_parquet({_sql_string(pattern)}, hive_partitioning = true)"
+    
+    raise ValueError(f"No {data_type} data found in snapshot {snapshot_dir}")
+
+def import_parquet_snapshot(snapshot_dir: str, session: Optional[Session] = None) -> Dict[str, int]:
+    """
+    Load a Parquet snapshot written by export_to_file into an empty database.
+    
+    The snapshot directory holds papers, figures and entities, each either as
+    <type>.parquet or as a partitioned <type>/ directory. Rows are copied with
+    INSERT ... SELECT inside DuckDB in a single transaction.
+    
+    Args:
+        snapshot_dir: Directory containing the snapshot
+        
+    Returns:
+        The number of rows imported per table
+    """
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        if session.query(PaperModel.id).first() is not None:
+            raise ValueError("Snapshots can only be imported into an empty database")
+        
+        counts = {}
+        # Parents first, to satisfy the foreign keys
+        for data_type in ("papers", "figures", "entities"):
+            model, column_names = EXPORT_COLUMNS[data_type]
+            source = _parquet_source(snapshot_dir, data_type)
+            
+            select_list = []
+            for name in column_names:
+                if isinstance(model.__table__.c[name].type, SQLEnum):
+                    select_list.append(f"upper({name})")
+                else:
+                    select_list.append(name)
+            
+            # DuckDB answers an INSERT with a single row holding the inserted count
+            mark_stats_changed(session)
+            connection = session.connection().connection.driver_connection
+            counts[data_type] = connection.execute(
+                f"INSERT INTO {model.__tablename__} ({', '.join(column_names)}) "
+                f"SELECT {', '.join(select_list)} FROM {source}"
+            ).fetchone()[0]
+        
+        # Snapshots carry no co-occurrence or caption index; build them from the imported rows
+        session.execute(text(
+            "INSERT INTO entity_cooccurrence_counts " + COOCCURRENCE_PAIRS_SQL.format(figure_filter="true")
+        ))
+        caption_index.index_figures(session)
+        
+        session.commit()
+        read_cache.clear()
+        return counts
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error importing snapshot {snapshot_dir}: {e}")
+        raise
+    finally:
+        if close_session:
+            session.close()
+
+def create_job(job: Job, paper_ids: Iterable[str] = (), session: Optional[Session] = None) -> Job:
+    """
+    Create a new job record, with its papers as PENDING.
+    
+    Args:
+        job: The job
+        paper_ids: The job's paper IDs; more can be added later with add_job_papers
+        session: Optional database session
+    
+    Returns:
+        The stored job
+    """
     close_session = False
     if session is None:
         session = db.get_session()
@@ -228,21 +1202,18 @@ def create_job(job: Job, session: Optional[Session] = None) -> Job:
             status=job.status,
             created_at=job.created_at,
             completed_at=job.completed_at,
-            paper_ids=json.dumps(job.paper_ids),
             total_papers=job.total_papers,
             processed_papers=job.processed_papers,
             failed_papers=job.failed_papers
         )
         
         session.add(job_model)
+        session.flush()
+        _insert_job_papers(session, job.id, paper_ids)
         session.commit()
         session.refresh(job_model)
         
-        # Convert paper_ids back from JSON
-        job_dict = job_model.__dict__
-        job_dict['paper_ids'] = json.loads(job_dict['paper_ids'])
-        
-        return Job.parse_obj(job_dict)
+        return Job.parse_obj(job_model.__dict__)
     except Exception as e:
         session.rollback()
         logger.error(f"Error creating job: {e}")
@@ -259,16 +1230,12 @@ def get_job(job_id: str, session: Optional[Session] = None) -> Optional[Job]:
         close_session = True
     
     try:
-        job_model = session.query(JobModel).filter(JobModel.id == job_id).first()
+        row = session.execute(select(*JOB_COLUMNS).where(JobModel.id == job_id)).first()
         
-        if job_model is None:
+        if row is None:
             return None
         
-        # Convert paper_ids from JSON
-        job_dict = job_model.__dict__
-        job_dict['paper_ids'] = json.loads(job_dict['paper_ids'])
-        
-        return Job.parse_obj(job_dict)
+        return _construct(Job, JOB_COLUMNS, [row])[0]
     finally:
         if close_session:
             session.close()
@@ -279,6 +1246,7 @@ def update_job_status(
     processed_papers: Optional[int] = None,
     failed_papers: Optional[int] = None,
     completed_at: Optional[datetime] = None,
+    total_papers: Optional[int] = None,
     session: Optional[Session] = None
 ) -> Optional[Job]:
     """Update a job's status."""
@@ -301,19 +1269,21 @@ def update_job_status(
         if failed_papers is not None:
             job_model.failed_papers = failed_papers
         
+        if total_papers is not None:
+            job_model.total_papers = total_papers
+        
         if completed_at is not None:
             job_model.completed_at = completed_at
-        elif status == ProcessingStatus.COMPLETED or status == ProcessingStatus.FAILED:
+        elif status in (ProcessingStatus.COMPLETED, ProcessingStatus.FAILED, ProcessingStatus.CANCELLED):
             job_model.completed_at = datetime.now()
+        elif status == ProcessingStatus.PENDING:
+            # Queued again, e.g. resumed
+            job_model.completed_at = None
         
         session.commit()
         session.refresh(job_model)
         
-        # Convert paper_ids from JSON
-        job_dict = job_model.__dict__
-        job_dict['paper_ids'] = json.loads(job_dict['paper_ids'])
-        
-        return Job.parse_obj(job_dict)
+        return Job.parse_obj(job_model.__dict__)
     except Exception as e:
         session.rollback()
         logger.error(f"Error updating job status: {e}")
@@ -322,6 +1292,42 @@ def update_job_status(
         if close_session:
             session.close()
 
+def update_job_progress(
+    job_id: str,
+    processed_papers: int,
+    failed_papers: int,
+    session: Optional[Session] = None
+) -> bool:
+    """
+    Store the counters of a running job, unless the job is no longer PROCESSING,
+    so progress reported after a cancellation does not bring the job back.
+    
+    Returns:
+        Whether the job was updated
+    """
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        result = session.execute(
+            update(JobModel)
+            .where(JobModel.id == job_id, JobModel.status == ProcessingStatus.PROCESSING)
+            .values(processed_papers=processed_papers, failed_papers=failed_papers),
+            execution_options={"synchronize_session": False}
+        )
+        session.commit()
+        
+        return result.rowcount == 1
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error updating job progress: {e}")
+        raise
+    finally:
+        if close_session:
+            session.close()
+
 def list_jobs(
     limit: int = 100, 
     offset: int = 0, 
@@ -336,24 +1342,294 @@ def list_jobs(
         close_session = True
     
     try:
-        query = session.query(JobModel)
+        query = select(*JOB_COLUMNS)
         
         if status is not None:
-            query = query.filter(JobModel.status == status)
+            query = query.where(JobModel.status == status)
         
         if job_type is not None:
-            query = query.filter(JobModel.job_type == job_type)
+            query = query.where(JobModel.job_type == job_type)
+        
+        rows = session.execute(query.limit(limit).offset(offset))
+        
+        return _construct(Job, JOB_COLUMNS, rows)
+    finally:
+        if close_session:
+            session.close()
+
+def _insert_job_papers(session: Session, job_id: str, paper_ids: Iterable[str]) -> int:
+    now = datetime.now()
+    # A paper listed twice is still processed once
+    rows = [
+        {"job_id": job_id, "paper_id": paper_id, "status": ProcessingStatus.PENDING, "updated_at": now}
+        for paper_id in dict.fromkeys(paper_ids)
+    ]
+    return _bulk_insert(session, JobPaperModel, rows)
+
+@contextmanager
+def _staged_paper_ids(session: Session, paper_ids: List[str]) -> Iterator[str]:
+    """Make paper IDs queryable as a relation with a paper_id column, and yield its name."""
+    name = f"_paper_ids_{uuid.uuid4().hex}"
+    connection = session.connection().connection.driver_connection
+    
+    if pyarrow is not None:
+        connection.register(name, pyarrow.table({"paper_id": pyarrow.array(paper_ids, pyarrow.string())}))
+        try:
+            yield name
+        finally:
+            connection.unregister(name)
+        return
+    
+    connection.execute(f"CREATE TEMPORARY TABLE {name} (paper_id VARCHAR)")
+    try:
+        connection.executemany(f"INSERT INTO {name} VALUES (?)", [(paper_id,) for paper_id in paper_ids])
+        yield name
+    finally:
+        connection.execute(f"DROP TABLE IF EXISTS {name}")
+
+def add_job_papers(
+    job_id: str,
+    paper_ids: List[str],
+    skip_completed: bool = True,
+    session: Optional[Session] = None
+) -> int:
+    """
+    Add a chunk of papers to a job as PENDING, e.g. while streaming a large ID file.
+    
+    Papers the job already has are ignored, so duplicates within the file are
+    added once.
+    
+    Args:
+        job_id: The job
+        paper_ids: The chunk of paper IDs
+        skip_completed: Also ignore papers already COMPLETED in the papers table,
+            i.e. whose figures and entities are stored
+        session: Optional database session
+    
+    Returns:
+        The number of papers added
+    """
+    if not paper_ids:
+        return 0
+    
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        with _staged_paper_ids(session, paper_ids) as source:
+            sql = (
+                "INSERT OR IGNORE INTO job_papers (job_id, paper_id, status, updated_at) "
+                f"SELECT ?, paper_id, '{ProcessingStatus.PENDING.name}', now() FROM (SELECT DISTINCT paper_id FROM {source}) c"
+            )
+            if skip_completed:
+                sql += (
+                    " WHERE NOT EXISTS (SELECT 1 FROM papers p WHERE p.id = c.paper_id "
+                    f"AND p.status = '{ProcessingStatus.COMPLETED.name}')"
+                )
+            connection = session.connection().connection.driver_connection
+            count = connection.execute(sql, [job_id]).fetchone()[0]
+        session.commit()
+        
+        return count
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error adding papers to job {job_id}: {e}")
+        raise
+    finally:
+        if close_session:
+            session.close()
+
+def get_unfinished_job_papers(
+    job_id: str,
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    session: Optional[Session] = None
+) -> List[str]:
+    """
+    Get the IDs of the papers of a job that are not COMPLETED, in ID order.
+    
+    Args:
+        job_id: The job
+        after: Only IDs after this one, to page through large jobs
+        limit: Maximum number of IDs
+        session: Optional database session
+    
+    Returns:
+        The paper IDs
+    """
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        query = select(JobPaperModel.paper_id).where(
+            JobPaperModel.job_id == job_id, JobPaperModel.status != ProcessingStatus.COMPLETED
+        )
+        if after is not None:
+            query = query.where(JobPaperModel.paper_id > after)
+        
+        rows = session.execute(query.order_by(JobPaperModel.paper_id).limit(limit))
+        
+        return list(rows.scalars())
+    finally:
+        if close_session:
+            session.close()
+
+def list_job_papers(
+    job_id: str,
+    status: Optional[ProcessingStatus] = None,
+    limit: int = 100,
+    after: Optional[str] = None,
+    session: Optional[Session] = None
+) -> List[JobPaper]:
+    """
+    List the papers of a job with their progress, in ID order.
+    
+    Args:
+        job_id: The job
+        status: Only papers with this status
+        limit: Maximum number of papers
+        after: Only papers after this ID, i.e. the last ID of the previous page
+        session: Optional database session
+    
+    Returns:
+        The papers
+    """
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        query = select(*JOB_PAPER_COLUMNS).where(JobPaperModel.job_id == job_id)
         
-        job_models = query.limit(limit).offset(offset).all()
+        if status is not None:
+            query = query.where(JobPaperModel.status == status)
+        
+        if after is not None:
+            query = query.where(JobPaperModel.paper_id > after)
         
-        jobs = []
-        for model in job_models:
-            # Convert paper_ids from JSON
-            job_dict = model.__dict__
-            job_dict['paper_ids'] = json.loads(job_dict['paper_ids'])
-            jobs.append(Job.parse_obj(job_dict))
+        rows = session.execute(query.order_by(JobPaperModel.paper_id).limit(limit))
         
-        return jobs
+        return _construct(JobPaper, JOB_PAPER_COLUMNS, rows)
     finally:
         if close_session:
-            session.close()
\ No newline at end of file
+            session.close()
+
+def get_job_paper_ids(
+    job_ids: List[str],
+    limit: int,
+    session: Optional[Session] = None
+) -> Dict[str, List[str]]:
+    """
+    Get the first paper IDs of each job, in ID order.
+    
+    Args:
+        job_ids: The jobs
+        limit: Maximum number of paper IDs per job
+        session: Optional database session
+    
+    Returns:
+        Paper IDs by job ID, with an empty list for jobs without papers
+    """
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        paper_ids = {job_id: [] for job_id in job_ids}
+        if not job_ids or limit <= 0:
+            return paper_ids
+        
+        # One query for all jobs, numbering each job's papers to cut it at limit
+        numbered = select(
+            JobPaperModel.job_id,
+            JobPaperModel.paper_id,
+            func.row_number().over(
+                partition_by=JobPaperModel.job_id, order_by=JobPaperModel.paper_id
+            ).label("position")
+        ).where(JobPaperModel.job_id.in_(job_ids)).subquery()
+        
+        rows = session.execute(
+            select(numbered.c.job_id, numbered.c.paper_id)
+            .where(numbered.c.position <= limit)
+            .order_by(numbered.c.job_id, numbered.c.position)
+        )
+        for job_id, paper_id in rows:
+            paper_ids[job_id].append(paper_id)
+        
+        return paper_ids
+    finally:
+        if close_session:
+            session.close()
+
+def update_job_papers(
+    job_id: str,
+    paper_ids: List[str],
+    status: ProcessingStatus,
+    error_message: Optional[str] = None,
+    session: Optional[Session] = None
+) -> int:
+    """
+    Set the status of some papers of a job.
+    
+    Args:
+        job_id: The job
+        paper_ids: The papers to update
+        status: Their new status
+        error_message: Why they failed, cleared if not given
+        session: Optional database session
+    
+    Returns:
+        The number of papers updated
+    """
+    if not paper_ids:
+        return 0
+    
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        result = session.execute(
+            update(JobPaperModel)
+            .where(JobPaperModel.job_id == job_id, JobPaperModel.paper_id.in_(paper_ids))
+            .values(status=status, error_message=error_message, updated_at=datetime.now()),
+            execution_options={"synchronize_session": False}
+        )
+        session.commit()
+        
+        return result.rowcount
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error updating papers of job {job_id}: {e}")
+        raise
+    finally:
+        if close_session:
+            session.close()
+
+def count_job_papers(job_id: str, session: Optional[Session] = None) -> Dict[ProcessingStatus, int]:
+    """Count the papers of a job by status, including statuses with no papers."""
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        counts = {status: 0 for status in ProcessingStatus}
+        rows = session.execute(
+            select(JobPaperModel.status, func.count())
+            .where(JobPaperModel.job_id == job_id)
+            .group_by(JobPaperModel.status)
+        )
+        counts.update(dict(rows.all()))
+        
+        return counts
+    finally:
+        if close_session:
+            session.close()
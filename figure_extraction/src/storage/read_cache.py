@@ -0,0 +1,179 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from pydantic import BaseModel
+
+from src.config.settings import settings
+
+# Kinds of cached reads, each keyed by one ID
+PAPER = "paper"
+PAPER_FIGURES = "paper_figures"
+FIGURE_ENTITIES = "figure_entities"
+
+def _copy(value: Any) -> Any:
+    """Copy a model or a list of models, so callers cannot change cached values."""
+    if isinstance(value, BaseModel):
+        return value.copy()
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+class ReadCache:
+    """
+    Process-local LRU cache of hot reads: papers, the figures of a paper and the
+    entities of a figure.
+    
+    Entries expire after settings.storage.read_cache_ttl seconds, and the least
+    recently used ones are evicted beyond settings.storage.read_cache_size. The
+    write helpers in queries invalidate the entries they change. Writes made by
+    other processes (e.g. `worker` processes) are only seen once entries expire.
+    
+    As in the statistics cache, every invalidation bumps a generation counter,
+    and a value is only stored if no invalidation happened while it was being
+    read, so a read racing with a write cannot put stale data back.
+    """
+    
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        """
+        Args:
+            max_entries: Size limit, defaults to settings.storage.read_cache_size; 0 disables the cache
+            ttl: Entry lifetime in seconds, defaults to settings.storage.read_cache_ttl
+        """
+        self.max_entries = max_entries if max_entries is not None else settings.storage.read_cache_size
+        self.ttl = ttl if ttl is not None else settings.storage.read_cache_ttl
+        # (kind, ID) -> (value, expiry), least recently used first
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Any, float]]" = OrderedDict()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+    
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        """
+        Look up a cached value.
+        
+        Args:
+            kind: PAPER, PAPER_FIGURES or FIGURE_ENTITIES
+            key: The paper or figure ID
+        
+        Returns:
+            A copy of the cached value, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get((kind, key))
+            if entry is not None and entry[1] <= time.monotonic():
+                del self._entries[(kind, key)]
+                self.evictions += 1
+                entry = None
+            
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end((kind, key))
+            self.hits += 1
+            value = entry[0]
+        
+        return _copy(value)
+    
+    def put(self, kind: str, key: str, value: Any, generation: int):
+        """
+        Store a value read while the cache was at the given generation.
+        
+        Args:
+            kind: PAPER, PAPER_FIGURES or FIGURE_ENTITIES
+            key: The paper or figure ID
+            value: A model or a list of models
+            generation: The generation before the value was read
+        """
+        value = _copy(value)
+        with self._lock:
+            if generation != self.generation:
+                return
+            
+            self._entries[(kind, key)] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end((kind, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def get_or_load(self, kind: str, key: str, load: Callable[[], Any]) -> Any:
+        """
+        Get a value from the cache, or load and store it. None is not stored, so
+        a paper or figure created later is found right away.
+        
+        Args:
+            kind: PAPER, PAPER_FIGURES or FIGURE_ENTITIES
+            key: The paper or figure ID
+            load: Reads the value from the database
+        
+        Returns:
+            The value
+        """
+        if not self.enabled:
+            return load()
+        
+        value = self.get(kind, key)
+        if value is not None:
+            return value
+        
+        with self._lock:
+            generation = self.generation
+        
+        value = load()
+        if value is not None:
+            self.put(kind, key, value, generation)
+        return value
+    
+    def invalidate(self, kind: str, keys: Iterable[str]):
+        """
+        Drop the entries of changed papers or figures. Call this after the change
+        is committed.
+        
+        Args:
+            kind: PAPER, PAPER_FIGURES or FIGURE_ENTITIES
+            keys: The paper or figure IDs
+        """
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                if self._entries.pop((kind, key), None) is not None:
+                    self.invalidations += 1
+    
+    def clear(self):
+        """Drop every entry, e.g. after a bulk import."""
+        with self._lock:
+            self.generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and the size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl
+            }
+
+# Create singleton instance
+read_cache = ReadCache()
+
+def get_read_cache() -> ReadCache:
+    """Get read cache instance."""
+    return read_cache
@@ -0,0 +1,230 @@
+import os
+import time
+import itertools
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, func, inspect, text
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from src.config.settings import settings
+from src.storage.database import db, PaperModel, FigureModel, EntityModel, JobModel
+from src.storage.models import ProcessingStatus, EntityType
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Row counts of every table in the operational database. estimated_size is read
+# from table metadata, so this does not scan any data.
+TABLE_ROWS_SQL = """
+SELECT table_name, estimated_size FROM duckdb_tables()
+WHERE database_name = current_database() AND NOT temporary
+ORDER BY table_name
+"""
+
+# Memory held by the buffer manager, by component
+MEMORY_SQL = """
+SELECT tag, memory_usage_bytes, temporary_storage_bytes FROM duckdb_memory()
+WHERE memory_usage_bytes > 0 OR temporary_storage_bytes > 0
+ORDER BY tag
+"""
+
+class _StatsCache:
+    """
+    Last computed statistics, valid until their TTL expires or a session commits
+    a change to the counted rows.
+    
+    Every invalidation bumps a generation counter, and a result is only stored
+    if no such commit happened while it was being computed, so a slow computation
+    racing with a write cannot put stale counts back into the cache.
+    """
+    
+    def __init__(self):
+        self.value: Optional[Dict[str, Any]] = None
+        self.expires_at = 0.0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+    
+    def get(self) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            if self.value is not None and self.expires_at > time.monotonic():
+                self.hits += 1
+                return self.value
+            self.misses += 1
+            return None
+    
+    def put(self, value: Dict[str, Any], generation: int, ttl: float):
+        with self.lock:
+            if generation == self.generation:
+                self.value = value
+                self.expires_at = time.monotonic() + ttl
+    
+    def invalidate(self):
+        with self.lock:
+            self.generation += 1
+            self.value = None
+
+_cache = _StatsCache()
+
+# session.info key set once a transaction wrote rows the statistics count
+STATS_CHANGED = "stats_changed"
+
+# Tables whose rows are counted. Jobs only count on insert, delete or a status
+# change, so the per-paper progress and job_papers writes keep the cache.
+_COUNTED_MODELS = (PaperModel, FigureModel, EntityModel)
+_COUNTED_TABLES = frozenset(model.__tablename__ for model in _COUNTED_MODELS)
+
+def mark_stats_changed(session: Session):
+    """Drop the cached statistics when this session commits, e.g. after writing through a raw connection."""
+    session.info[STATS_CHANGED] = True
+
+def _changes_counts(session: Session, instance: Any) -> bool:
+    if isinstance(instance, _COUNTED_MODELS):
+        return True
+    if isinstance(instance, JobModel):
+        return (
+            instance in session.new
+            or instance in session.deleted
+            or inspect(instance).attrs.status.history.has_changes()
+        )
+    return False
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session: Session, flush_context):
+    # new, dirty and deleted still describe the flushed changes at this point
+    if not session.info.get(STATS_CHANGED) and any(
+        _changes_counts(session, instance)
+        for instance in itertools.chain(session.new, session.dirty, session.deleted)
+    ):
+        mark_stats_changed(session)
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_statement(state: ORMExecuteState):
+    if (state.is_insert or state.is_update or state.is_delete) and state.statement.table.name in _COUNTED_TABLES:
+        mark_stats_changed(state.session)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session):
+    if session.info.pop(STATS_CHANGED, False):
+        _cache.invalidate()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session):
+    session.info.pop(STATS_CHANGED, None)
+
+def invalidate_stats():
+    """Drop the cached statistics right away."""
+    _cache.invalidate()
+
+def _count_by(session: Session, column, members) -> Dict[str, int]:
+    """Count rows per enum member with one GROUP BY, including members with no rows."""
+    counts = {member.value: 0 for member in members}
+    for value, count in session.query(column, func.count()).group_by(column):
+        if value is not None:
+            counts[value.value] = count
+    return counts
+
+def _database_stats(session: Session) -> Dict[str, Any]:
+    db_path = settings.storage.duckdb_path
+    db_size = os.path.getsize(db_path) if os.path.exists(db_path) else 0
+    wal_path = f"{db_path}.wal"
+    wal_size = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+    
+    memory = {
+        tag: {"memory_bytes": memory_bytes, "temporary_storage_bytes": temporary_bytes}
+        for tag, memory_bytes, temporary_bytes in session.execute(text(MEMORY_SQL))
+    }
+    memory_limit = session.execute(text("SELECT current_setting('memory_limit')")).scalar()
+    table_rows = dict(session.execute(text(TABLE_ROWS_SQL)).all())
+    
+    return {
+        "size_bytes": db_size,
+        "size_mb": round(db_size / (1024 * 1024), 2) if db_size > 0 else 0,
+        "wal_size_bytes": wal_size,
+        "memory": {
+            "usage_bytes": sum(entry["memory_bytes"] for entry in memory.values()),
+            "temporary_storage_bytes": sum(entry["temporary_storage_bytes"] for entry in memory.values()),
+            "limit": memory_limit,
+            "by_tag": memory
+        },
+        "table_rows": table_rows
+    }
+
+def _compute_stats(session: Session) -> Dict[str, Any]:
+    papers_by_status = _count_by(session, PaperModel.status, ProcessingStatus)
+    entities_by_type = _count_by(session, EntityModel.entity_type, EntityType)
+    jobs_by_status = _count_by(session, JobModel.status, ProcessingStatus)
+    figure_count = session.query(func.count(FigureModel.id)).scalar()
+    
+    return {
+        "papers": {
+            "total": sum(papers_by_status.values()),
+            "by_status": papers_by_status
+        },
+        "figures": {
+            "total": figure_count
+        },
+        "entities": {
+            "total": sum(entities_by_type.values()),
+            "by_type": entities_by_type
+        },
+        "jobs": {
+            "total": sum(jobs_by_status.values()),
+            "by_status": jobs_by_status
+        },
+        "database": _database_stats(session),
+        "computed_at": datetime.now().isoformat()
+    }
+
+def get_system_stats(refresh: bool = False, session: Optional[Session] = None) -> Dict[str, Any]:
+    """
+    Get paper, figure, entity and job counts plus database health figures.
+    
+    Results are cached in-process for settings.storage.stats_cache_ttl seconds
+    and dropped whenever a session commits paper, figure or entity rows or a
+    job status change, so frequent polling costs a few
+    GROUP BY queries per TTL window at most.
+    
+    Args:
+        refresh: Recompute even if a cached result is available
+        session: Optional database session
+    
+    Returns:
+        The statistics, with "cached" telling whether they came from the cache
+    """
+    if not refresh:
+        cached = _cache.get()
+        if cached is not None:
+            return {**cached, "cached": True}
+    
+    with _cache.lock:
+        generation = _cache.generation
+    
+    close_session = False
+    if session is None:
+        session = db.get_session()
+        close_session = True
+    
+    try:
+        stats = _compute_stats(session)
+    finally:
+        if close_session:
+            session.close()
+    
+    _cache.put(stats, generation, settings.storage.stats_cache_ttl)
+    return {**stats, "cached": False}
+
+def get_stats_cache_stats() -> Dict[str, Any]:
+    """Get hit/miss counters of the statistics cache."""
+    with _cache.lock:
+        lookups = _cache.hits + _cache.misses
+        return {
+            "hits": _cache.hits,
+            "misses": _cache.misses,
+            "hit_rate": round(_cache.hits / lookups, 4) if lookups else 0.0,
+            "ttl_seconds": settings.storage.stats_cache_ttl
+        }
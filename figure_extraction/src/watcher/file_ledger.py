@@ -0,0 +1,185 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from src.config.settings import settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Ledger entry states
+PROCESSING = "processing"
+DONE = "done"
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS processed_files (
+    content_hash TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    job_id TEXT,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_processed_files_recorded_at ON processed_files (recorded_at);
+"""
+
+def hash_file(file_path: str) -> str:
+    """
+    Hash the contents of a file.
+    
+    Args:
+        file_path: Path to the file
+    
+    Returns:
+        The SHA-256 hex digest
+    """
+    with open(file_path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+class FileLedger:
+    """
+    Persistent record of the files the folder watcher has processed, keyed by
+    the hash of their contents and stored in a SQLite file next to the DuckDB
+    database.
+    
+    A file whose contents were processed before is a duplicate, whatever its
+    name. Entries are kept for settings.watched_folder.ledger_retention_days;
+    after that, the same contents are processed again.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.watched_folder.ledger_path
+        self._local = threading.local()
+        self._initialized = False
+        self._init_lock = threading.Lock()
+    
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must stay in the thread that created them
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    connection.executescript(SCHEMA_SQL)
+                    self._initialized = True
+        
+        return connection
+    
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+    
+    def claim(self, content_hash: str, file_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Claim contents for processing, unless they were processed or are being
+        processed already.
+        
+        Args:
+            content_hash: Hash of the file contents
+            file_name: Name of the file, for the record
+        
+        Returns:
+            None if the contents were claimed, otherwise the existing entry
+        """
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT * FROM processed_files WHERE content_hash = ?", (content_hash,)
+            ).fetchone()
+            if row is not None:
+                return dict(row)
+            
+            connection.execute(
+                "INSERT INTO processed_files (content_hash, state, file_name, recorded_at) VALUES (?, ?, ?, ?)",
+                (content_hash, PROCESSING, file_name, time.time())
+            )
+            return None
+    
+    def complete(self, content_hash: str, job_id: str):
+        """
+        Record that claimed contents were processed.
+        
+        Args:
+            content_hash: Hash of the file contents
+            job_id: ID of the job created for them
+        """
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE processed_files SET state = ?, job_id = ?, recorded_at = ? WHERE content_hash = ?",
+                (DONE, job_id, time.time(), content_hash)
+            )
+    
+    def release(self, content_hash: str):
+        """
+        Drop a claim whose processing failed, so the contents can be tried again.
+        
+        Args:
+            content_hash: Hash of the file contents
+        """
+        with self._transaction() as connection:
+            connection.execute(
+                "DELETE FROM processed_files WHERE content_hash = ? AND state = ?", (content_hash, PROCESSING)
+            )
+    
+    def release_unfinished(self) -> int:
+        """
+        Drop every claim still being processed, e.g. left by a watcher that
+        crashed. Only call this while no other watcher uses the ledger.
+        
+        Returns:
+            The number of claims dropped
+        """
+        with self._transaction() as connection:
+            return connection.execute("DELETE FROM processed_files WHERE state = ?", (PROCESSING,)).rowcount
+    
+    def prune(self, retention_days: Optional[float] = None) -> int:
+        """
+        Remove entries older than the retention period.
+        
+        Args:
+            retention_days: Defaults to settings.watched_folder.ledger_retention_days
+        
+        Returns:
+            The number of entries removed
+        """
+        if retention_days is None:
+            retention_days = settings.watched_folder.ledger_retention_days
+        cutoff = time.time() - retention_days * 86400
+        
+        with self._transaction() as connection:
+            return connection.execute(
+                "DELETE FROM processed_files WHERE state = ? AND recorded_at < ?", (DONE, cutoff)
+            ).rowcount
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Count ledger entries by state."""
+        counts = {PROCESSING: 0, DONE: 0}
+        counts.update({
+            row["state"]: row["entries"]
+            for row in self._connection().execute("SELECT state, count(*) AS entries FROM processed_files GROUP BY state")
+        })
+        return counts
+
+# Create singleton instance
+file_ledger = FileLedger()
+
+def get_file_ledger() -> FileLedger:
+    """Get file ledger instance."""
+    return file_ledger
@@ -1,28 +1,87 @@
 import os
 import time
+import fnmatch
 import logging
 import asyncio
 import threading
-from pathlib import Path
-from typing import List, Dict, Any, Set
+from concurrent.futures import Future
+from typing import List, Dict, Any, Optional, Set, Tuple
 
 from src.config.settings import settings
 from src.core.orchestrator import orchestrator
+from src.watcher.file_ledger import file_ledger, hash_file
+
+try:
+    from watchdog.observers import Observer
+except ImportError:  # Optional: native file system events (inotify on Linux); without it folders are polled
+    Observer = None
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Seconds between removals of expired ledger entries
+LEDGER_PRUNE_INTERVAL = 3600
+
+class _EventHandler:
+    """Forward watchdog events for files to the watcher."""
+    
+    def __init__(self, watcher: "FolderWatcher"):
+        self.watcher = watcher
+    
+    def dispatch(self, event: Any):
+        if event.is_directory:
+            return
+        
+        if event.event_type == "moved":
+            # Renaming a finished file into the folder is an atomic drop
+            self.watcher._notify(os.fsdecode(event.dest_path), complete=True)
+        elif event.event_type == "closed":
+            # Closed after writing (IN_CLOSE_WRITE)
+            self.watcher._notify(os.fsdecode(event.src_path), complete=True)
+        elif event.event_type in ("created", "modified"):
+            self.watcher._notify(os.fsdecode(event.src_path), complete=False)
+
 class FolderWatcher:
-    """Watch folders for files to process."""
+    """
+    Watch folders for files to process.
+    
+    New files are reported by native file system events when watchdog is
+    installed, and found by listing the folders every watch_interval seconds
+    either way. A file is submitted once it is fully written: when it was closed
+    after writing or renamed into the folder, or when its size and modification
+    time have not changed for stable_seconds.
+    
+    Submitted files are processed by a fixed number of workers on one event
+    loop, with at most max_in_flight files submitted and not yet finished; the
+    rest wait in the folder.
+    """
     
     def __init__(self):
         self.folders = settings.watched_folder.watched_folders
         self.interval = settings.watched_folder.watch_interval
         self.patterns = settings.watched_folder.file_patterns
-        self.processed_files = set()
+        self.stable_seconds = settings.watched_folder.stable_seconds
+        self.workers = max(1, settings.watched_folder.workers)
+        self.max_in_flight = max(self.workers, settings.watched_folder.max_in_flight)
         self.running = False
         self.thread = None
         self.loop = None
+        self.loop_thread = None
+        self.observer = None
+        # Files not yet submitted: path -> (size, mtime, when they last changed)
+        self._candidates: Dict[str, Tuple[int, int, float]] = {}
+        # Files reported as fully written by a file system event
+        self._complete: Set[str] = set()
+        # Files written to since they were last closed, tracked where the
+        # observer reports closes; they wait for the close however long it takes
+        self._writing: Set[str] = set()
+        self._close_events = False
+        # Files submitted and not yet processed
+        self._in_flight: Set[str] = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers_done: Optional[Future] = None
     
     def _match_pattern(self, filename: str) -> bool:
         """
@@ -30,7 +89,7 @@ class FolderWatcher:
         
         Args:
             filename: The filename to check
-            
+        
         Returns:
             True if the filename matches any pattern, False otherwise
         """
@@ -42,7 +101,6 @@ class FolderWatcher:
                     return True
             elif "*" in pattern:
                 # Other wildcard pattern
-                import fnmatch
                 if fnmatch.fnmatch(filename, pattern):
                     return True
             else:
@@ -52,75 +110,227 @@ class FolderWatcher:
         
         return False
     
-    def _process_file(self, file_path: str):
+    def _is_watched(self, file_path: str) -> bool:
+        """Check that a path is a matching file directly inside a watched folder."""
+        folder = os.path.dirname(file_path)
+        return (
+            any(folder == os.path.abspath(watched) for watched in self.folders)
+            and self._match_pattern(os.path.basename(file_path))
+        )
+    
+    def _notify(self, file_path: str, complete: bool):
         """
-        Process a file.
+        Record a file reported by a file system event.
         
         Args:
             file_path: Path to the file
+            complete: Whether the file is known to be fully written
+        """
+        file_path = os.path.abspath(file_path)
+        if not self._is_watched(file_path):
+            return
+        
+        with self._lock:
+            if file_path in self._in_flight:
+                return
+            self._candidates.setdefault(file_path, (-1, -1, time.monotonic()))
+            if complete:
+                self._complete.add(file_path)
+                self._writing.discard(file_path)
+            elif self._close_events:
+                self._writing.add(file_path)
+        self._wakeup.set()
+    
+    def _scan_folders(self):
+        """List the watched folders and record the matching files."""
+        for folder in self.folders:
+            # Check if folder exists
+            if not os.path.exists(folder):
+                logger.warning(f"Folder does not exist: {folder}")
+                continue
+            
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if not entry.is_file() or not self._match_pattern(entry.name):
+                        continue
+                    
+                    file_path = os.path.abspath(entry.path)
+                    with self._lock:
+                        if file_path not in self._in_flight:
+                            self._candidates.setdefault(file_path, (-1, -1, time.monotonic()))
+    
+    def _take_ready_files(self) -> List[str]:
+        """
+        Remove and return the candidates that are fully written, as far as the
+        in-flight limit allows.
+        """
+        now = time.monotonic()
+        ready = []
+        
+        with self._lock:
+            for file_path, (size, mtime, changed_at) in list(self._candidates.items()):
+                if len(self._in_flight) + len(ready) >= self.max_in_flight:
+                    break
+                
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    # Moved away or deleted before it was submitted
+                    del self._candidates[file_path]
+                    self._complete.discard(file_path)
+                    self._writing.discard(file_path)
+                    continue
+                
+                if file_path in self._complete:
+                    ready.append(file_path)
+                elif file_path in self._writing:
+                    continue
+                elif (stat.st_size, stat.st_mtime_ns) != (size, mtime):
+                    # Still being written, or seen for the first time
+                    self._candidates[file_path] = (stat.st_size, stat.st_mtime_ns, now)
+                elif now - changed_at >= self.stable_seconds:
+                    ready.append(file_path)
+            
+            for file_path in ready:
+                del self._candidates[file_path]
+                self._complete.discard(file_path)
+                self._in_flight.add(file_path)
+        
+        return ready
+    
+    def _move(self, file_path: str, folder_name: str) -> str:
+        """Move a file into a subfolder of its folder and return its new path."""
+        target_dir = os.path.join(os.path.dirname(file_path), folder_name)
+        os.makedirs(target_dir, exist_ok=True)
+        
+        target_path = os.path.join(target_dir, os.path.basename(file_path))
+        os.rename(file_path, target_path)
+        return target_path
+    
+    async def _process_file(self, file_path: str):
         """
+        Process a file, unless a file with the same contents was processed before.
+        
+        Args:
+            file_path: Path to the file
+        """
+        content_hash = None
         try:
-            logger.info(f"Processing file: {file_path}")
+            content_hash = await asyncio.to_thread(hash_file, file_path)
+            existing = file_ledger.claim(content_hash, os.path.basename(file_path))
+            if existing is not None:
+                logger.info(
+                    f"File {file_path} has the same contents as {existing['file_name']} "
+                    f"(job {existing['job_id'] or 'in progress'}); skipping it"
+                )
+                duplicate_path = self._move(file_path, "duplicates")
+                logger.info(f"File moved to: {duplicate_path}")
+                return
             
-            # Create a new event loop for this thread
-            asyncio.set_event_loop(asyncio.new_event_loop())
-            loop = asyncio.get_event_loop()
+            logger.info(f"Processing file: {file_path}")
             
             # Process the file
-            job = loop.run_until_complete(orchestrator.process_paper_file(file_path))
+            job = await orchestrator.process_paper_file(file_path)
             
             logger.info(f"File {file_path} processed. Job ID: {job.id}")
             
-            # Add to processed files
-            self.processed_files.add(file_path)
+            # Record the contents as processed
+            file_ledger.complete(content_hash, job.id)
+            content_hash = None
             
             # Move file to processed folder
-            processed_dir = os.path.join(os.path.dirname(file_path), "processed")
-            os.makedirs(processed_dir, exist_ok=True)
-            
-            processed_path = os.path.join(processed_dir, os.path.basename(file_path))
-            os.rename(file_path, processed_path)
+            processed_path = self._move(file_path, "processed")
             
             logger.info(f"File moved to: {processed_path}")
         except Exception as e:
             logger.error(f"Error processing file {file_path}: {e}")
             
-            # Move file to failed folder
-            failed_dir = os.path.join(os.path.dirname(file_path), "failed")
-            os.makedirs(failed_dir, exist_ok=True)
+            if content_hash is not None:
+                # Let the same contents be tried again
+                file_ledger.release(content_hash)
             
-            failed_path = os.path.join(failed_dir, os.path.basename(file_path))
-            os.rename(file_path, failed_path)
+            # Move file to failed folder
+            failed_path = self._move(file_path, "failed")
             
             logger.error(f"File moved to: {failed_path}")
     
+    async def _worker(self):
+        """Process submitted files until a None sentinel arrives."""
+        while True:
+            file_path = await self._queue.get()
+            if file_path is None:
+                return
+            
+            try:
+                await self._process_file(file_path)
+            except Exception as e:
+                logger.error(f"Error handling file {file_path}: {e}")
+            finally:
+                with self._lock:
+                    self._in_flight.discard(file_path)
+                # Room for another file
+                self._wakeup.set()
+    
+    async def _run_workers(self):
+        await asyncio.gather(*(self._worker() for _ in range(self.workers)))
+    
+    def _submit(self, file_path: str):
+        """Hand a file to the workers on the event loop."""
+        self.loop.call_soon_threadsafe(self._queue.put_nowait, file_path)
+    
+    def _start_observer(self):
+        """Subscribe to file system events of the watched folders, if watchdog is installed."""
+        if Observer is None or not settings.watched_folder.use_native_events:
+            logger.info("Polling watched folders for new files")
+            return
+        
+        observer = Observer()
+        handler = _EventHandler(self)
+        for folder in self.folders:
+            if os.path.isdir(folder):
+                observer.schedule(handler, folder, recursive=False)
+        observer.daemon = True
+        observer.start()
+        self.observer = observer
+        # Only inotify reports files closed after writing; elsewhere files
+        # are submitted once their size settles
+        self._close_events = type(observer).__name__ == "InotifyObserver"
+        logger.info("Watching folders with native file system events")
+    
     def _watch_folders(self):
         """Watch folders for new files."""
         logger.info(f"Starting folder watcher. Watching folders: {', '.join(self.folders)}")
         
+        # Re-check files being written often enough to notice when they settle
+        settle_interval = max(0.1, self.stable_seconds / 2)
+        next_scan = 0.0
+        next_prune = 0.0
+        
         while self.running:
             try:
-                for folder in self.folders:
-                    # Check if folder exists
-                    if not os.path.exists(folder):
-                        logger.warning(f"Folder does not exist: {folder}")
-                        continue
-                    
-                    # Get all files in folder
-                    for filename in os.listdir(folder):
-                        file_path = os.path.join(folder, filename)
-                        
-                        # Skip directories and already processed files
-                        if os.path.isdir(file_path) or file_path in self.processed_files:
-                            continue
-                        
-                        # Check if file matches pattern
-                        if self._match_pattern(filename):
-                            # Process file in a separate thread
-                            threading.Thread(target=self._process_file, args=(file_path,)).start()
+                if time.monotonic() >= next_prune:
+                    pruned = file_ledger.prune()
+                    if pruned:
+                        logger.info(f"Removed {pruned} expired entries from the processed file ledger")
+                    next_prune = time.monotonic() + LEDGER_PRUNE_INTERVAL
                 
-                # Sleep before checking again
-                time.sleep(self.interval)
+                # Folders are also listed when events are available, to catch
+                # files present at startup and events the OS dropped
+                if time.monotonic() >= next_scan:
+                    self._scan_folders()
+                    next_scan = time.monotonic() + self.interval
+                
+                for file_path in self._take_ready_files():
+                    self._submit(file_path)
+                
+                with self._lock:
+                    waiting = bool(self._candidates)
+                timeout = next_scan - time.monotonic()
+                if waiting:
+                    timeout = min(timeout, settle_interval)
+                
+                self._wakeup.wait(max(0.0, timeout))
+                self._wakeup.clear()
             except Exception as e:
                 logger.error(f"Error watching folders: {e}")
                 time.sleep(self.interval)
@@ -132,6 +342,19 @@ class FolderWatcher:
             return
         
         self.running = True
+        
+        # Claims left by a watcher that stopped mid-file; their files are still in the folder
+        file_ledger.release_unfinished()
+        
+        # One event loop shared by all workers
+        self.loop = asyncio.new_event_loop()
+        self._queue = asyncio.Queue()
+        self.loop_thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.loop_thread.start()
+        self._workers_done = asyncio.run_coroutine_threadsafe(self._run_workers(), self.loop)
+        
+        self._start_observer()
+        
         self.thread = threading.Thread(target=self._watch_folders)
         self.thread.daemon = True
         self.thread.start()
@@ -144,9 +367,26 @@ class FolderWatcher:
             self.stop()
     
     def stop(self):
-        """Stop the folder watcher."""
+        """Stop the folder watcher, letting the workers finish their current files."""
         logger.info("Stopping folder watcher")
         self.running = False
+        self._wakeup.set()
+        
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join(timeout=5.0)
+            self.observer = None
         
         if self.thread and self.thread.is_alive():
-            self.thread.join(timeout=5.0)
\ No newline at end of file
+            self.thread.join(timeout=5.0)
+        
+        if self.loop is not None and self.loop.is_running():
+            # Workers finish the files already submitted, then exit
+            for _ in range(self.workers):
+                self.loop.call_soon_threadsafe(self._queue.put_nowait, None)
+            try:
+                self._workers_done.result(timeout=30.0)
+            except Exception as e:
+                logger.error(f"Folder watcher workers did not stop cleanly: {e}")
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.loop_thread.join(timeout=5.0)
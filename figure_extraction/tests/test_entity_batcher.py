@@ -0,0 +1,94 @@
+import pytest
+from unittest.mock import patch
+
+from src.config.settings import settings
+from src.entity.detector import EntityDetector, EntityBatcher
+from src.storage.models import Figure
+
+
+class FakeDetector(EntityDetector):
+    """Detector that records its batches instead of calling PubTator, failing the ones asked to."""
+
+    def __init__(self, failing_figure_ids=()):
+        self.batches = []
+        self.failing_figure_ids = set(failing_figure_ids)
+
+    async def process_figures(self, figures):
+        self.batches.append([figure.id for figure in figures])
+        if self.failing_figure_ids & {figure.id for figure in figures}:
+            raise RuntimeError("PubTator unavailable")
+        return {"processed_figures": len(figures), "detected_entities": 0}
+
+
+def make_figures(paper_id, count):
+    return [
+        Figure(id=f"{paper_id}{number}", paper_id=paper_id, figure_number=number, caption="TP53 western blot")
+        for number in range(1, count + 1)
+    ]
+
+
+@pytest.fixture(autouse=True)
+def small_batches():
+    """Two captions per PubTator request."""
+    with patch.object(settings.external_api, "pubtator3_batch_size", 2):
+        yield
+
+
+class TestEntityBatcher:
+    @pytest.mark.asyncio
+    async def test_owners_complete_once_all_figures_are_processed(self):
+        """Test that an owner is only reported once its last figure was processed."""
+        detector = FakeDetector()
+        batcher = EntityBatcher(detector)
+
+        await batcher.add(make_figures("A", 1), owner="A")
+        await batcher.add(make_figures("B", 2), owner="B")
+        assert batcher.take_finished() == (["A"], {})
+
+        await batcher.flush()
+        assert batcher.take_finished() == (["B"], {})
+        assert detector.batches == [["A1", "B1"], ["B2"]]
+
+    @pytest.mark.asyncio
+    async def test_owner_with_queued_figures_fails_with_its_batch(self):
+        """Test that a failed batch fails every owner in it, even one with figures still queued."""
+        detector = FakeDetector(failing_figure_ids={"A1"})
+        batcher = EntityBatcher(detector)
+
+        await batcher.add(make_figures("A", 1), owner="A")
+        with pytest.raises(RuntimeError):
+            await batcher.add(make_figures("B", 2), owner="B")
+
+        completed, failed = batcher.take_finished()
+        assert completed == []
+        assert set(failed) == {"A", "B"}
+
+        # B2 belongs to a failed owner, so it is not sent and B is not completed later
+        await batcher.flush()
+        assert batcher.take_finished() == ([], {})
+        assert detector.batches == [["A1", "B1"]]
+
+    @pytest.mark.asyncio
+    async def test_owner_without_figures_completes(self):
+        """Test that an owner without figures is completed right away."""
+        batcher = EntityBatcher(FakeDetector())
+
+        await batcher.add([], owner="A")
+
+        assert batcher.take_finished() == (["A"], {})
+
+    @pytest.mark.asyncio
+    async def test_batches_after_a_failed_one_are_processed(self):
+        """Test that the ready batches after a failed one are processed, not dropped."""
+        detector = FakeDetector(failing_figure_ids={"A1"})
+        batcher = EntityBatcher(detector)
+
+        # Room for one caption per request, so A1 is sent alone ahead of B1
+        with patch.object(settings.external_api, "pubtator3_batch_chars", 30):
+            await batcher.add(make_figures("A", 1), owner="A")
+            with pytest.raises(RuntimeError):
+                await batcher.add(make_figures("B", 2), owner="B")
+            await batcher.flush()
+
+        assert detector.batches == [["A1"], ["B1"], ["B2"]]
+        assert batcher.take_finished() == (["B"], {"A": "PubTator unavailable"})
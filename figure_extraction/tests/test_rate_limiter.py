@@ -0,0 +1,181 @@
+import asyncio
+import time
+import httpx
+import pytest
+from unittest.mock import patch
+
+from src.config.settings import settings
+from src.core.rate_limiter import TokenBucket, RateLimiter
+from src.extraction.bioc_client import BioCPMCClient
+
+EMPTY_BIOC_DOCUMENT = b"<collection><document><id>1</id></document></collection>"
+
+
+class FakeClock:
+    """Monotonic clock that only moves when told to, or when sleep() is awaited."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+    async def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    """Fake clock and sleep for token buckets."""
+    return FakeClock()
+
+
+def make_bucket(clock, rate=1.0, capacity=1):
+    return TokenBucket(rate=rate, capacity=capacity, clock=clock, sleep=clock.sleep)
+
+
+class TestTokenBucket:
+    def test_invalid_arguments(self, clock):
+        """Test that a bucket needs a positive rate and room for one token."""
+        with pytest.raises(ValueError):
+            make_bucket(clock, rate=0)
+        with pytest.raises(ValueError):
+            make_bucket(clock, capacity=0)
+
+    @pytest.mark.asyncio
+    async def test_burst(self, clock):
+        """Test that a full bucket serves its capacity back to back, then waits."""
+        bucket = make_bucket(clock, rate=2.0, capacity=3)
+
+        for _ in range(3):
+            await bucket.acquire()
+        assert clock.sleeps == []
+
+        await bucket.acquire()
+        assert clock.sleeps == [pytest.approx(0.5)]
+
+    @pytest.mark.asyncio
+    async def test_refill(self, clock):
+        """Test that tokens come back at the configured rate."""
+        bucket = make_bucket(clock, rate=1.0, capacity=3)
+        for _ in range(3):
+            await bucket.acquire()
+
+        clock.advance(2.0)
+        await bucket.acquire()
+        await bucket.acquire()
+        assert clock.sleeps == []
+
+        await bucket.acquire()
+        assert clock.sleeps == [pytest.approx(1.0)]
+
+    @pytest.mark.asyncio
+    async def test_refill_stops_at_capacity(self, clock):
+        """Test that an idle bucket does not save up more than its capacity."""
+        bucket = make_bucket(clock, rate=1.0, capacity=2)
+        clock.advance(3600.0)
+
+        for _ in range(3):
+            await bucket.acquire()
+
+        assert clock.sleeps == [pytest.approx(1.0)]
+
+    @pytest.mark.asyncio
+    async def test_reservations_queue_in_order(self, clock):
+        """Test that concurrent callers reserve successive tokens instead of racing."""
+        waits = []
+
+        async def record_sleep(seconds):
+            waits.append(seconds)
+            await asyncio.sleep(0)
+
+        bucket = TokenBucket(rate=1.0, capacity=1, clock=clock, sleep=record_sleep)
+        await asyncio.gather(*(bucket.acquire() for _ in range(4)))
+
+        assert waits == [pytest.approx(1.0), pytest.approx(2.0), pytest.approx(3.0)]
+
+    @pytest.mark.asyncio
+    async def test_refund_on_cancel(self, clock):
+        """Test that a cancelled wait gives its token back to later callers."""
+        started = asyncio.Event()
+
+        async def wait_forever(seconds):
+            clock.sleeps.append(seconds)
+            started.set()
+            await asyncio.Event().wait()
+
+        bucket = TokenBucket(rate=1.0, capacity=1, clock=clock, sleep=wait_forever)
+        await bucket.acquire()
+
+        waiter = asyncio.create_task(bucket.acquire())
+        await started.wait()
+        assert bucket.tokens == pytest.approx(-1.0)
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert bucket.tokens == pytest.approx(0.0)
+
+        # Without the refund the next caller would wait for the cancelled token too
+        bucket._sleep = clock.sleep
+        await bucket.acquire()
+        assert clock.sleeps == [pytest.approx(1.0), pytest.approx(1.0)]
+
+
+class TestRateLimiter:
+    def test_buckets_per_service(self):
+        """Test that services get their own bucket even when they share a host."""
+        limiter = RateLimiter()
+
+        bucket = limiter.get_bucket("https://example.com/pubtator/", 60)
+        assert limiter.get_bucket("https://EXAMPLE.com/pubtator", 60) is bucket
+        assert limiter.get_bucket("https://example.com/bioc", 60) is not bucket
+        assert bucket.rate == pytest.approx(1.0)
+
+
+class TestBioCRequestRate:
+    @pytest.mark.asyncio
+    async def test_requests_follow_configured_rate_without_blocking(self):
+        """Test that concurrent BioC requests go out at bioc_pmc_rate_limit while the event loop keeps running."""
+        requests_per_minute = 600
+        request_count = 6
+        sent_at = []
+
+        def handler(request):
+            sent_at.append(time.monotonic())
+            return httpx.Response(200, content=EMPTY_BIOC_DOCUMENT)
+
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        with patch.object(settings.external_api, "bioc_pmc_rate_limit", requests_per_minute), \
+                patch.object(settings.external_api, "bioc_pmc_burst", 1), \
+                patch("src.extraction.bioc_client.rate_limiter", RateLimiter()):
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http_client:
+                client = BioCPMCClient(http_client)
+                ticking = asyncio.create_task(ticker())
+                with patch.object(client.cache, "enabled", False):
+                    start = time.monotonic()
+                    await asyncio.gather(*(client.get_paper_structure(f"PMC{number}") for number in range(request_count)))
+                    elapsed = time.monotonic() - start
+                ticking.cancel()
+
+        # The first request uses the burst token, each later one waits 1 / rate
+        interval = 60.0 / requests_per_minute
+        assert elapsed == pytest.approx((request_count - 1) * interval, abs=0.05)
+        gaps = [later - earlier for earlier, later in zip(sent_at, sent_at[1:])]
+        assert min(gaps) >= interval * 0.9
+
+        # The waits are asyncio sleeps, so other tasks kept running throughout
+        assert len(ticks) >= elapsed / 0.01 * 0.5
+        assert max(later - earlier for earlier, later in zip(ticks, ticks[1:])) < 0.05